@@ -0,0 +1,203 @@
+# analytics.py
+"""Billing and appointment trends computed with NumPy.
+
+Daily totals are read from the stats_* summary tables (migration 2) in one query per table and
+laid out as dense per-day arrays, so every figure below is a whole-array operation whatever the
+number of bills or appointments behind it. numpy is imported by this module; screens import it
+on a worker thread, where matplotlib has usually loaded numpy already.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+AVERAGE_MONTHS = 3     # Window of the rolling monthly averages
+FORECAST_MONTHS = 3    # Months forecast after the last one in a report
+FORECAST_FIT_MONTHS = 6   # Complete months the forecast trend line is fitted to
+
+# date(day) = day skips any day not stored as YYYY-MM-DD, which numpy could not parse
+DAILY_BILLING_QUERY = '''
+    SELECT day, billed_amount, paid_amount, bill_count
+    FROM stats_daily_billing
+    WHERE day BETWEEN ? AND ? AND bill_count > 0 AND date(day) = day
+'''
+
+DAILY_APPOINTMENTS_QUERY = '''
+    SELECT day, SUM(appointment_count),
+           SUM(CASE WHEN status = 'Completed' THEN appointment_count ELSE 0 END),
+           SUM(CASE WHEN status = 'Cancelled' THEN appointment_count ELSE 0 END)
+    FROM stats_daily_appointments
+    WHERE day BETWEEN ? AND ? AND date(day) = day
+    GROUP BY day
+'''
+
+
+@dataclass
+class DailyTotals:
+    """One value per calendar day from `first` to the end date; days without data are 0."""
+    first: np.datetime64
+    billed: np.ndarray
+    paid: np.ndarray
+    bills: np.ndarray
+    appointments: np.ndarray
+    completed: np.ndarray
+    cancelled: np.ndarray
+
+    @property
+    def days(self):
+        return self.first + np.arange(len(self.billed))
+
+
+def _daily_columns(rows, first, day_count, width):
+    # Each query returns at most one row per day, so plain fancy-index assignment places them
+    columns = np.zeros((width, day_count))
+    if rows:
+        days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        columns[:, (days - first).astype(np.int64)] = np.array([row[1:] for row in rows], dtype=np.float64).T
+    return columns
+
+
+def load_daily_totals(conn, start_date, end_date):
+    """Reads the daily billing and appointment totals from start_date to end_date (YYYY-MM-DD) into a DailyTotals."""
+    first = np.datetime64(start_date, 'D')
+    day_count = max(int((np.datetime64(end_date, 'D') - first).astype(np.int64)) + 1, 0)
+    billed, paid, bills = _daily_columns(
+        conn.execute(DAILY_BILLING_QUERY, (start_date, end_date)).fetchall(), first, day_count, 3)
+    appointments, completed, cancelled = _daily_columns(
+        conn.execute(DAILY_APPOINTMENTS_QUERY, (start_date, end_date)).fetchall(), first, day_count, 3)
+    return DailyTotals(first, billed, paid, bills, appointments, completed, cancelled)
+
+
+def month_index(daily):
+    """Returns (months, index): the calendar months covered, and each day's position in them."""
+    day_months = daily.days.astype('datetime64[M]')
+    if not len(day_months):
+        return day_months, np.zeros(0, dtype=np.int64)
+    months = np.arange(day_months[0], day_months[-1] + 1)
+    return months, (day_months - months[0]).astype(np.int64)
+
+
+def monthly_totals(daily, values):
+    """Sums a daily array by calendar month; returns (months, totals)."""
+    months, index = month_index(daily)
+    return months, np.bincount(index, weights=values, minlength=len(months))
+
+
+def monthly_grid(daily, values):
+    """Lays a daily array out as months x 31 days, NaN where a month has no such day in range."""
+    months, index = month_index(daily)
+    grid = np.full((len(months), 31), np.nan)
+    day_of_month = (daily.days - daily.days.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64)
+    grid[index, day_of_month] = values
+    return grid
+
+
+def monthly_percentiles(daily, values, percentiles):
+    """Returns an array (len(percentiles) x months) of percentiles of the daily values within each month."""
+    grid = monthly_grid(daily, values)
+    if not grid.size:
+        return np.zeros((len(percentiles), 0))
+    return np.nanpercentile(grid, percentiles, axis=1)
+
+
+def rolling_mean(values, window=AVERAGE_MONTHS):
+    """Mean of each value and the window - 1 before it; NaN until a full window is available."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def year_over_year(values, lag=12):
+    """Percentage change of each value on the one `lag` periods earlier; NaN without an earlier non-zero value."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if len(values) > lag:
+        earlier, current = values[:-lag], values[lag:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[lag:] = np.where(earlier != 0, (current - earlier) / earlier * 100, np.nan)
+    return result
+
+
+def linear_forecast(values, periods=FORECAST_MONTHS, fit=FORECAST_FIT_MONTHS):
+    """Extends the least-squares trend line of the last `fit` values by `periods` steps (never below 0).
+
+    Returns no points when there is nothing to fit, e.g. a range without a complete month.
+    """
+    values = np.asarray(values, dtype=np.float64)[-fit:]
+    if len(values) == 0:
+        return np.zeros(0)
+    if len(values) == 1:
+        return np.full(periods, values[0])
+    slope, intercept = np.polyfit(np.arange(len(values)), values, 1)
+    return np.maximum(slope * np.arange(len(values), len(values) + periods) + intercept, 0)
+
+
+def _number(value, digits=2):
+    # Report cells are plain Python numbers (they are pickled into the spool and written to exports)
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _trend_range(start_date, end_date):
+    # Reports show the months from start_date to end_date, and load a year more for the comparisons
+    first_month = np.datetime64(start_date, 'M')
+    last_month = np.datetime64(end_date, 'M')
+    load_from = str((first_month - 12).astype('datetime64[D]'))
+    # A month that has not ended by end_date is shown but left out of the forecast fit
+    month_complete = np.datetime64(end_date, 'D') + 1 == (last_month + 1).astype('datetime64[D]')
+    return first_month, last_month, load_from, month_complete
+
+
+def _forecast_rows(last_month, values, shown, complete, width, column, digits):
+    fitted = values[shown] if complete else values[shown][:-1]
+    rows = []
+    for step, value in enumerate(linear_forecast(fitted), start=1):
+        row = [None] * width
+        row[0] = f"{last_month + step} (forecast)"
+        row[column] = _number(value, digits)
+        rows.append(tuple(row))
+    return rows
+
+
+def revenue_trend_rows(conn, start_date, end_date):
+    """Rows of the Revenue Trends report: per month billed, paid, rolling average, change on last year and daily percentiles."""
+    first_month, last_month, load_from, complete = _trend_range(start_date, end_date)
+    daily = load_daily_totals(conn, load_from, end_date)
+    months, billed = monthly_totals(daily, daily.billed)
+    _, paid = monthly_totals(daily, daily.paid)
+    average = rolling_mean(paid)
+    change = year_over_year(paid)
+    median_day, busy_day = monthly_percentiles(daily, daily.paid, (50, 90))
+
+    shown = months >= first_month
+    if not paid[shown].any() and not billed[shown].any():
+        return []
+    rows = [(str(month), _number(b), _number(p), _number(a), _number(c, 1), _number(m), _number(h))
+            for month, b, p, a, c, m, h in zip(months[shown], billed[shown], paid[shown], average[shown],
+                                                change[shown], median_day[shown], busy_day[shown])]
+    return rows + _forecast_rows(last_month, paid, shown, complete, 7, 2, 2)
+
+
+def appointment_trend_rows(conn, start_date, end_date):
+    """Rows of the Appointment Trends report: per month counts, cancellation rate, rolling average, change on last year and busiest day."""
+    first_month, last_month, load_from, complete = _trend_range(start_date, end_date)
+    daily = load_daily_totals(conn, load_from, end_date)
+    months, appointments = monthly_totals(daily, daily.appointments)
+    _, completed = monthly_totals(daily, daily.completed)
+    _, cancelled = monthly_totals(daily, daily.cancelled)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cancellation_rate = np.where(appointments > 0, cancelled / appointments * 100, np.nan)
+    average = rolling_mean(appointments)
+    change = year_over_year(appointments)
+    grid = monthly_grid(daily, daily.appointments)
+    busiest_day = np.nanmax(grid, axis=1) if grid.size else np.zeros(0)
+
+    shown = months >= first_month
+    if not appointments[shown].any():
+        return []
+    rows = [(str(month), int(n), int(done), int(off), _number(rate, 1), _number(a, 1), _number(c, 1), int(busiest))
+            for month, n, done, off, rate, a, c, busiest in zip(
+                months[shown], appointments[shown], completed[shown], cancelled[shown], cancellation_rate[shown],
+                average[shown], change[shown], busiest_day[shown])]
+    return rows + _forecast_rows(last_month, appointments, shown, complete, 8, 1, 0)
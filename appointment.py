@@ -3,12 +3,14 @@ from tkinter import *
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
+from autocomplete_combobox import patient_combobox
+from paged_treeview import PagedTreeview
+from reference_cache import get_reference_cache
 
 class AppointmentManagement:
-    def __init__(self, master_frame, conn, c):
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         for widget in self.master_frame.winfo_children():
             widget.destroy()
@@ -28,10 +30,9 @@ class AppointmentManagement:
 
         ttk.Label(self.left_frame, text="Patient:", background='#e0f7fa').grid(row=1, column=0, sticky=W, pady=5, padx=5)
         self.patient_var = StringVar()
-        self.patient_combo = ttk.Combobox(self.left_frame, textvariable=self.patient_var, width=27, state="readonly")
+        # Type a name, phone or ID; matches come from the patient lookup index instead of a full list
+        self.patient_combo = patient_combobox(self.left_frame, textvariable=self.patient_var, width=27)
         self.patient_combo.grid(row=1, column=1, pady=5, padx=5, sticky="ew")
-        self.patient_map = {}
-        self.load_patients()
 
         ttk.Label(self.left_frame, text="Doctor:", background='#e0f7fa').grid(row=2, column=0, sticky=W, pady=5, padx=5)
         self.doctor_var = StringVar()
@@ -111,27 +112,23 @@ class AppointmentManagement:
 
         self.tree.bind('<<TreeviewSelect>>', self.on_appointment_select)
 
+        # Newest appointments first, fetched a page at a time as the list is scrolled
+        self.pager = PagedTreeview(self.tree,
+                                   '''SELECT a.appointment_id, p.name, d.name, a.appointment_date,
+                                      a.appointment_time, a.purpose, a.status
+                                      FROM appointments a
+                                      JOIN patients p ON a.patient_id = p.patient_id
+                                      JOIN doctors d ON a.doctor_id = d.doctor_id''',
+                                   key_columns=("a.appointment_date", "a.appointment_time", "a.appointment_id"),
+                                   key_indexes=(3, 4, 0), descending=True, scrollbar=scrollbar)
+
         self.current_appointment_id = None
         self.load_appointments()
 
-    def load_patients(self):
-        try:
-            self.c.execute("SELECT patient_id, name FROM patients ORDER BY name ASC")
-            patients = self.c.fetchall()
-            self.patient_map = {f"{pid} - {name}": pid for pid, name in patients}
-            self.patient_combo['values'] = list(self.patient_map.keys())
-        except sqlite3.OperationalError as e:
-            messagebox.showerror("Database Error", f"Error loading patients: {e}\nEnsure 'patients' table exists.")
-            print(f"Error loading patients: {e}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred while loading patients: {e}")
-            print(f"An unexpected error occurred while loading patients: {e}")
-
     def load_doctors(self):
         try:
-            self.c.execute("SELECT doctor_id, name FROM doctors ORDER BY name ASC")
-            doctors = self.c.fetchall()
-            self.doctor_map = {f"{did} - {name}": did for did, name in doctors}
+            # Shared by every screen and only re-read after the doctors table changes
+            self.doctor_map = get_reference_cache().doctor_map()
             self.doctor_combo['values'] = list(self.doctor_map.keys())
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Error loading doctors: {e}\nEnsure 'doctors' table exists.")
@@ -140,41 +137,35 @@ class AppointmentManagement:
             messagebox.showerror("Error", f"An unexpected error occurred while loading doctors: {e}")
             print(f"An unexpected error occurred while loading doctors: {e}")
 
+    def refresh(self):
+        """Brings the doctor list and the appointments up to date when the screen is shown again, keeping the current search."""
+        self.load_doctors()
+        self.pager.reload(on_done=self.on_appointments_loaded, on_error=self.on_appointments_load_error)
+
     def load_appointments(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.pager.set_filter(None)
+        self.pager.reload(on_done=self.on_appointments_loaded, on_error=self.on_appointments_load_error)
 
-        try:
-            self.c.execute('''SELECT a.appointment_id, p.name, d.name, a.appointment_date,
-                               a.appointment_time, a.purpose, a.status
-                               FROM appointments a
-                               JOIN patients p ON a.patient_id = p.patient_id
-                               JOIN doctors d ON a.doctor_id = d.doctor_id
-                               ORDER BY a.appointment_date DESC, a.appointment_time DESC''')
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                self.tree.insert("", END, values=("", "", "", "No appointments found.", "", "", ""))
-                self.tree.item(self.tree.get_children()[0], tags=('no_data',))
-                self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+    def on_appointments_loaded(self, row_count):
+        if not row_count:
+            self.tree.insert("", END, values=("", "", "", "No appointments found.", "", "", ""))
+            self.tree.item(self.tree.get_children()[0], tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
 
-        except sqlite3.OperationalError as e:
+    def on_appointments_load_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error loading appointments: {e}\nEnsure 'appointments', 'patients', and 'doctors' tables exist with correct columns.")
             print(f"Error loading appointments: {e}")
             self.tree.insert("", END, values=("", "", "", "Error loading appointments.", "", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred while loading appointments: {e}")
             print(f"An unexpected error occurred while loading appointments: {e}")
             self.tree.insert("", END, values=("", "", "", "Unexpected error loading appointments.", "", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
 
-
     def on_appointment_select(self, event):
         selected_item = self.tree.focus()
         if selected_item:
@@ -182,22 +173,18 @@ class AppointmentManagement:
             self.current_appointment_id = values[0]
 
             try:
-                self.c.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, a.appointment_date,
-                               a.appointment_time, a.purpose, a.status
-                               FROM appointments a
-                               JOIN patients p ON a.patient_id = p.patient_id
-                               JOIN doctors d ON a.doctor_id = d.doctor_id
-                               WHERE a.appointment_id=?''', (self.current_appointment_id,))
-                app_data = self.c.fetchone()
+                with self.db.read() as conn:
+                    app_data = conn.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, a.appointment_date,
+                                   a.appointment_time, a.purpose, a.status
+                                   FROM appointments a
+                                   JOIN patients p ON a.patient_id = p.patient_id
+                                   JOIN doctors d ON a.doctor_id = d.doctor_id
+                                   WHERE a.appointment_id=?''', (self.current_appointment_id,)).fetchone()
 
                 if app_data:
                     self.clear_form()
 
-                    patient_display_str = f"{app_data[0]} - {app_data[1]}"
-                    if patient_display_str in self.patient_map:
-                        self.combo_vars['patient_combo'].set(patient_display_str)
-                    else:
-                        self.combo_vars['patient_combo'].set("")
+                    self.patient_combo.set_selection(app_data[0], app_data[1])
 
                     doctor_display_str = f"{app_data[2]} - {app_data[3]}"
                     if doctor_display_str in self.doctor_map:
@@ -218,8 +205,7 @@ class AppointmentManagement:
 
 
     def add_appointment(self):
-        patient_full_str = self.combo_vars['patient_combo'].get()
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.patient_combo.selected_id()
 
         doctor_full_str = self.combo_vars['doctor_combo'].get()
         doctor_id = self.doctor_map.get(doctor_full_str)
@@ -259,11 +245,11 @@ class AppointmentManagement:
             return
 
         try:
-            self.c.execute('''INSERT INTO appointments
-                          (patient_id, doctor_id, appointment_date, appointment_time, purpose, status)
-                          VALUES (?, ?, ?, ?, ?, ?)''',
-                          (patient_id, doctor_id, date_str, time_str, purpose, status))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''INSERT INTO appointments
+                              (patient_id, doctor_id, appointment_date, appointment_time, purpose, status)
+                              VALUES (?, ?, ?, ?, ?, ?)''',
+                              (patient_id, doctor_id, date_str, time_str, purpose, status))
             messagebox.showinfo("Success", "Appointment added successfully.")
             self.load_appointments()
             self.clear_form()
@@ -277,8 +263,7 @@ class AppointmentManagement:
             messagebox.showerror("Update Error", "Please select an appointment to update.")
             return
 
-        patient_full_str = self.combo_vars['patient_combo'].get()
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.patient_combo.selected_id()
 
         doctor_full_str = self.combo_vars['doctor_combo'].get()
         doctor_id = self.doctor_map.get(doctor_full_str)
@@ -321,15 +306,15 @@ class AppointmentManagement:
             return
 
         try:
-            self.c.execute('''UPDATE appointments SET
-                          patient_id=?, doctor_id=?, appointment_date=?, appointment_time=?, purpose=?, status=?
-                          WHERE appointment_id=?''',
-                          (patient_id, doctor_id, date_str, time_str, purpose, status, self.current_appointment_id))
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE appointments SET
+                              patient_id=?, doctor_id=?, appointment_date=?, appointment_time=?, purpose=?, status=?
+                              WHERE appointment_id=?''',
+                              (patient_id, doctor_id, date_str, time_str, purpose, status, self.current_appointment_id)).rowcount
 
-            if self.c.rowcount == 0:
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No appointment was updated. The appointment might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Update Success", "Appointment updated successfully.")
                 self.load_appointments()
                 self.clear_form()
@@ -345,8 +330,8 @@ class AppointmentManagement:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this appointment? This action cannot be undone."):
             try:
-                self.c.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
                 messagebox.showinfo("Success", "Appointment deleted successfully.")
                 self.load_appointments()
                 self.clear_form()
@@ -360,29 +345,19 @@ class AppointmentManagement:
             self.load_appointments()
             return
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.pager.set_filter("p.name LIKE ? OR d.name LIKE ? OR a.purpose LIKE ? OR a.status LIKE ?",
+                              (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
+        self.pager.reload(on_done=self.on_search_results, on_error=self.on_search_error)
 
-        try:
-            self.c.execute('''SELECT a.appointment_id, p.name, d.name, a.appointment_date,
-                               a.appointment_time, a.purpose, a.status
-                               FROM appointments a
-                               JOIN patients p ON a.patient_id = p.patient_id
-                               JOIN doctors d ON a.doctor_id = d.doctor_id
-                               WHERE p.name LIKE ? OR d.name LIKE ? OR a.purpose LIKE ? OR a.status LIKE ?
-                               ORDER BY a.appointment_date DESC, a.appointment_time DESC''',
-                          (f"%{search_term}%", f"R%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                messagebox.showinfo("No Results", "No appointments found matching your search criteria.")
-        except sqlite3.OperationalError as e:
+    def on_search_results(self, row_count):
+        if not row_count:
+            messagebox.showinfo("No Results", "No appointments found matching your search criteria.")
+
+    def on_search_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error searching appointments: {e}")
             print(f"Error searching appointments: {e}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred during search: {str(e)}")
             print(f"An unexpected error occurred during search: {str(e)}")
 
@@ -0,0 +1,94 @@
+# ar_aging.py
+from datetime import date, timedelta
+
+AGING_CHECK_MS = 15 * 60 * 1000   # How often the application checks whether today's snapshot exists
+
+# (column, heading) of each aging bucket, by days past due_date
+AGING_BUCKETS = (
+    ("current_amount", "Current"),
+    ("days_1_30", "1-30 Days"),
+    ("days_31_60", "31-60 Days"),
+    ("days_61_90", "61-90 Days"),
+    ("days_over_90", "Over 90 Days"),
+)
+
+# The balance of every unpaid bill per patient, bucketed in one pass over idx_billing_outstanding
+# (migrations 9 and 10). Days past due are compared as dates against the bucket boundaries worked
+# out in Python, so no date arithmetic runs per bill. Bills without a due date count as current.
+AGING_QUERY = '''
+    SELECT patient_id, COUNT(*),
+           SUM(CASE WHEN due_date IS NULL OR due_date >= :as_of THEN balance ELSE 0 END),
+           SUM(CASE WHEN due_date < :as_of AND due_date >= :past_30 THEN balance ELSE 0 END),
+           SUM(CASE WHEN due_date < :past_30 AND due_date >= :past_60 THEN balance ELSE 0 END),
+           SUM(CASE WHEN due_date < :past_60 AND due_date >= :past_90 THEN balance ELSE 0 END),
+           SUM(CASE WHEN due_date < :past_90 THEN balance ELSE 0 END),
+           SUM(balance)
+    FROM billing
+    WHERE status != 'Paid'
+    GROUP BY patient_id
+'''
+
+RECORD_RUN_QUERY = '''
+    INSERT INTO ar_aging_runs (snapshot_date, created_at, patient_count, current_amount,
+                               days_1_30, days_31_60, days_61_90, days_over_90, total)
+    SELECT ?, datetime('now', 'localtime'), COUNT(*), COALESCE(SUM(current_amount), 0),
+           COALESCE(SUM(days_1_30), 0), COALESCE(SUM(days_31_60), 0), COALESCE(SUM(days_61_90), 0),
+           COALESCE(SUM(days_over_90), 0), COALESCE(SUM(total), 0)
+    FROM ar_aging_snapshot
+    WHERE true
+    ON CONFLICT (snapshot_date) DO UPDATE SET
+        created_at = excluded.created_at, patient_count = excluded.patient_count,
+        current_amount = excluded.current_amount, days_1_30 = excluded.days_1_30,
+        days_31_60 = excluded.days_31_60, days_61_90 = excluded.days_61_90,
+        days_over_90 = excluded.days_over_90, total = excluded.total
+'''
+
+LATEST_RUN_QUERY = "SELECT * FROM ar_aging_runs ORDER BY snapshot_date DESC LIMIT 1"
+
+
+def aging_boundaries(as_of):
+    """Returns the AGING_QUERY parameters for a date: as_of and the dates 30, 60 and 90 days before it."""
+    return {
+        'as_of': as_of.strftime("%Y-%m-%d"),
+        'past_30': (as_of - timedelta(days=30)).strftime("%Y-%m-%d"),
+        'past_60': (as_of - timedelta(days=60)).strftime("%Y-%m-%d"),
+        'past_90': (as_of - timedelta(days=90)).strftime("%Y-%m-%d"),
+    }
+
+
+def build_aging_snapshot(conn, as_of=None):
+    """Replaces ar_aging_snapshot with balances as of `as_of` (default today) and records the run's totals.
+
+    Runs on the caller's transaction; use it inside DatabaseManager.write().
+    """
+    as_of = as_of or date.today()
+    conn.execute("DELETE FROM ar_aging_snapshot")
+    conn.execute(f'''
+        INSERT INTO ar_aging_snapshot (patient_id, bill_count, current_amount, days_1_30, days_31_60,
+                                       days_61_90, days_over_90, total)
+        {AGING_QUERY}
+    ''', aging_boundaries(as_of))
+    conn.execute(RECORD_RUN_QUERY, (as_of.strftime("%Y-%m-%d"),))
+
+
+def latest_aging_run(conn):
+    """Returns the last run's totals as a dict (snapshot_date, patient_count, the buckets and total), or None."""
+    cursor = conn.execute(LATEST_RUN_QUERY)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip((column[0] for column in cursor.description), row))
+
+
+def refresh_aging_snapshot_if_due(conn, today=None):
+    """Builds today's snapshot unless it already exists; returns True if it was built.
+
+    Runs on the caller's transaction: use it in DatabaseManager.write(immediate=True), or queue it
+    on the WriteQueue with immediate=True, so the check and the rebuild see the same data.
+    """
+    today = today or date.today()
+    latest = latest_aging_run(conn)
+    if latest is not None and latest['snapshot_date'] >= today.strftime("%Y-%m-%d"):
+        return False
+    build_aging_snapshot(conn, today)
+    return True
@@ -0,0 +1,86 @@
+# autocomplete_combobox.py
+import re
+from tkinter import ttk
+
+from database import get_db
+from incremental_search import IncrementalSearch
+from search_index import lookup_patients, patient_matches, patient_refinable
+
+SUGGESTION_LIMIT = 15        # Matches offered in the drop-down
+TYPE_AHEAD_DELAY_MS = 150    # Shorter than the list searches; a suggestion query reads at most a few rows
+
+_LABEL_PATTERN = re.compile(r'^(\d+) - (.*)$')
+
+
+def _name_part(text):
+    # Typing after a chosen "12 - Ann Otieno" keeps searching by the name, not the label
+    match = _LABEL_PATTERN.match(text)
+    return match.group(2) if match else text
+
+
+class AutocompleteCombobox(ttk.Combobox):
+    """An editable Combobox offering the best "id - name" matches for what has been typed.
+
+    search(conn, term, limit) returns rows starting with (id, name), best first. Only the current
+    suggestions are kept, so the choices never have to be loaded in full; id_query
+    (SELECT name ... WHERE id = ?) checks an "id - name" typed or pasted by hand.
+    """
+
+    def __init__(self, master, search, matches, id_query, refinable=None, limit=SUGGESTION_LIMIT, **kwargs):
+        super().__init__(master, **kwargs)
+        self.id_query = id_query
+        self._choices = {}    # label -> id for the current suggestions and the last set_selection()
+
+        self.suggestions = IncrementalSearch(
+            self,
+            lambda conn, term, limit: search(conn, _name_part(term), limit),
+            lambda term, row: matches(_name_part(term), row),
+            self._show_matches, self._clear_matches, on_error=self._lookup_failed,
+            refinable=(lambda term: refinable(_name_part(term))) if refinable else None,
+            delay_ms=TYPE_AHEAD_DELAY_MS, limit=limit)
+        self.bind('<Return>', lambda event: self.suggestions.search_now(), add='+')
+
+    def selected_id(self):
+        """Returns the id of the chosen entry, or None if the text is not a valid "id - name"."""
+        text = self.get().strip()
+        if text in self._choices:
+            return self._choices[text]
+        match = _LABEL_PATTERN.match(text)
+        if match is None:
+            return None
+        item_id = int(match.group(1))
+        with get_db().read() as conn:
+            row = conn.execute(self.id_query, (item_id,)).fetchone()
+        if row is None or row[0] != match.group(2):
+            return None
+        self._choices[text] = item_id
+        return item_id
+
+    def set_selection(self, item_id, name):
+        """Shows an existing row as the selection, e.g. when a record is opened for editing."""
+        label = f"{item_id} - {name}"
+        self._choices[label] = item_id
+        self.set(label)
+
+    def _show_matches(self, rows, explicit):
+        labels = [f"{row[0]} - {row[1]}" for row in rows]
+        self._choices = dict(zip(labels, (row[0] for row in rows)))
+        self['values'] = labels
+        if explicit and labels:
+            self.event_generate('<Down>')  # Open the drop-down when Enter was pressed
+
+    def _clear_matches(self):
+        self._choices = {}
+        self['values'] = []
+
+    def _lookup_failed(self, e):
+        # A failed suggestion lookup only leaves the list empty; the form reports invalid input on save
+        print(f"Error looking up suggestions: {e}")
+        self._clear_matches()
+
+
+def patient_combobox(master, **kwargs):
+    """Returns an AutocompleteCombobox over the patient lookup index (ID, name, phone or email)."""
+    return AutocompleteCombobox(master, lookup_patients, patient_matches,
+                                "SELECT name FROM patients WHERE patient_id = ?",
+                                refinable=patient_refinable, **kwargs)
@@ -0,0 +1,438 @@
+# benchmarks.py
+"""Performance benchmarks run against a synthetic hospital database.
+
+Usage:
+    python benchmarks.py indexes --rows 1000000
+    python benchmarks.py fts --records 2000000
+    python benchmarks.py lookup --patients 1000000
+    python benchmarks.py pdf --rows 200000
+    python benchmarks.py analytics --rows 1000000
+    python benchmarks.py billing-run --rows 200000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from billing_run import plan_billing_run, post_billing_run, save_service_price
+from database import DatabaseManager
+from migrations import create_tables, apply_migrations
+from pdf_report import write_report_pdf
+from report_queries import ANALYTIC_REPORTS, REPORTS, report_query
+from search_index import build_match_query, lookup_patients, MEDICAL_RECORD_SEARCH_QUERY, SEARCH_RESULT_LIMIT
+
+FIRST_NAMES = ["John", "Mary", "Peter", "Grace", "James", "Faith", "David", "Mercy", "Joseph", "Ann",
+               "Brian", "Esther", "Kevin", "Lucy", "Samuel", "Ruth", "Daniel", "Joy", "Paul", "Naomi"]
+LAST_NAMES = ["Mwangi", "Otieno", "Kamau", "Wanjiru", "Ochieng", "Njoroge", "Achieng", "Kiprop",
+              "Mutua", "Chebet", "Omondi", "Wafula", "Kariuki", "Nyambura", "Barasa", "Akinyi"]
+SPECIALIZATIONS = ["Cardiology", "Pediatrics", "Neurology", "Orthopedics", "Dermatology",
+                   "General Practice", "Oncology", "Gynecology", "Psychiatry", "Radiology"]
+DIAGNOSES = ["Hypertension", "Type 2 diabetes", "Acute bronchitis", "Malaria", "Migraine",
+             "Lower back pain", "Asthma exacerbation", "Urinary tract infection", "Gastritis",
+             "Allergic rhinitis", "Anemia", "Fractured radius", "Pneumonia", "Typhoid fever"]
+TREATMENTS = ["Rest and fluids", "Oral antibiotics", "Physiotherapy", "Nebulisation",
+              "Antimalarial course", "Dietary changes", "Cast immobilisation", "IV fluids"]
+PRESCRIPTIONS = ["Amoxicillin 500mg", "Metformin 850mg", "Amlodipine 5mg", "Paracetamol 1g",
+                 "Salbutamol inhaler", "Artemether-lumefantrine", "Omeprazole 20mg", "Ferrous sulfate"]
+SERVICES = ["Consultation", "Laboratory tests", "X-Ray", "Pharmacy", "Ward admission",
+            "Minor procedure", "Ultrasound", "Physiotherapy session"]
+APPOINTMENT_STATUSES = ["Scheduled", "Completed", "Completed", "Completed", "Cancelled"]
+BILL_STATUSES = ["Paid", "Paid", "Pending", "Partially Paid"]
+
+
+def _random_date(rng, start, days):
+    return (start + timedelta(days=rng.randrange(days))).strftime("%Y-%m-%d")
+
+
+def seed_database(conn, rows, seed=42, years=3, records=None, patients=None):
+    """Fills an empty database with `rows` appointments and bills plus proportional patients, doctors and records."""
+    rng = random.Random(seed)
+    n_patients = patients if patients is not None else max(rows // 5, 10)
+    n_doctors = max(rows // 2000, 5)
+    n_records = records if records is not None else max(rows // 2, 10)
+    span_days = 365 * years
+    start = datetime.now() - timedelta(days=span_days - 30)
+
+    conn.executemany(
+        "INSERT INTO patients (name, date_of_birth, gender, address, phone, email, admission_date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+          _random_date(rng, datetime(1940, 1, 1), 365 * 80),
+          rng.choice(["Male", "Female"]),
+          f"P.O. Box {rng.randrange(100, 99999)}",
+          f"07{i:08d}",
+          f"patient{i}@example.com",
+          _random_date(rng, start, span_days)) for i in range(n_patients)))
+
+    conn.executemany(
+        "INSERT INTO doctors (name, specialization, phone, email, department, license_number) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+          rng.choice(SPECIALIZATIONS),
+          f"01{i:08d}",
+          f"doctor{i}@example.com",
+          "Outpatient",
+          f"LIC-{i:06d}") for i in range(n_doctors)))
+
+    conn.executemany(
+        "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, purpose, status) VALUES (?, ?, ?, ?, ?, ?)",
+        ((rng.randrange(1, n_patients + 1),
+          rng.randrange(1, n_doctors + 1),
+          _random_date(rng, start, span_days),
+          f"{rng.randrange(8, 17):02d}:{rng.choice(['00', '15', '30', '45'])}",
+          rng.choice(SERVICES),
+          rng.choice(APPOINTMENT_STATUSES)) for _ in range(rows)))
+
+    def bills():
+        for i in range(rows):
+            bill_date = start + timedelta(days=rng.randrange(span_days))
+            yield (rng.randrange(1, n_patients + 1),
+                   i + 1,
+                   rng.choice(SERVICES),
+                   round(rng.uniform(500, 25000), 2),
+                   bill_date.strftime("%Y-%m-%d"),
+                   (bill_date + timedelta(days=30)).strftime("%Y-%m-%d"),
+                   rng.choice(BILL_STATUSES))
+
+    conn.executemany(
+        "INSERT INTO billing (patient_id, appointment_id, service_description, amount, bill_date, due_date, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        bills())
+
+    conn.executemany(
+        "INSERT INTO medical_records (patient_id, doctor_id, record_date, diagnosis, treatment, prescription, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randrange(1, n_patients + 1),
+          rng.randrange(1, n_doctors + 1),
+          _random_date(rng, start, span_days),
+          rng.choice(DIAGNOSES),
+          rng.choice(TREATMENTS),
+          rng.choice(PRESCRIPTIONS),
+          f"Review in {rng.randrange(1, 6)} weeks. {rng.choice(DIAGNOSES)} ruled out.") for _ in range(n_records)))
+
+    conn.commit()
+
+
+def create_benchmark_database(path, rows, migrate=False, records=None, patients=None):
+    """Creates (or reuses) a seeded benchmark database at `path` and returns a DatabaseManager for it."""
+    exists = os.path.exists(path)
+    db = DatabaseManager(path)
+    with db.write() as conn:
+        if not exists:
+            create_tables(conn)
+            started = time.perf_counter()
+            seed_database(conn, rows, records=records, patients=patients)
+            print(f"Seeded {rows:,} appointments/bills in {time.perf_counter() - started:.1f}s -> {path}")
+        if migrate:
+            apply_migrations(conn)
+    return db
+
+
+def time_call(func, repeat=3):
+    """Returns the best wall-clock time in milliseconds over `repeat` calls of func()."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_query(conn, sql, params=(), repeat=3):
+    """Returns the best wall-clock time in milliseconds over `repeat` runs of a query."""
+    return time_call(lambda: conn.execute(sql, params).fetchall(), repeat)
+
+
+def query_plan(conn, sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN details joined into one line."""
+    return "; ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def hot_queries():
+    """The lookups the dashboard, reports and list screens run most often."""
+    today = datetime.now()
+    month_start = today.replace(day=1).strftime("%Y-%m-%d")
+    today_str = today.strftime("%Y-%m-%d")
+    return [
+        ("Today's scheduled appointments",
+         "SELECT COUNT(*) FROM appointments WHERE appointment_date = ? AND status = 'Scheduled'", (today_str,)),
+        ("Appointments this month",
+         "SELECT COUNT(*) FROM appointments WHERE appointment_date BETWEEN ? AND ?", (month_start, today_str)),
+        ("Paid revenue this month",
+         "SELECT SUM(amount) FROM billing WHERE status = 'Paid' AND bill_date BETWEEN ? AND ?", (month_start, today_str)),
+        ("Latest pending bills",
+         "SELECT p.name, b.amount, b.status FROM billing b JOIN patients p ON b.patient_id = p.patient_id "
+         "WHERE +b.status IN ('Pending', 'Partially Paid') ORDER BY b.bill_date DESC LIMIT 8", ()),
+        ("Appointments report (this month)",
+         "SELECT a.appointment_id, p.name, d.name, a.appointment_date, a.appointment_time, a.purpose, a.status "
+         "FROM appointments a JOIN patients p ON a.patient_id = p.patient_id JOIN doctors d ON a.doctor_id = d.doctor_id "
+         "WHERE a.appointment_date BETWEEN ? AND ? ORDER BY a.appointment_date ASC, a.appointment_time ASC",
+         (month_start, today_str)),
+        ("Doctor schedule",
+         "SELECT COUNT(*) FROM appointments WHERE doctor_id = ? AND appointment_date >= ?", (1, month_start)),
+        ("Patient bills",
+         "SELECT bill_id, amount, status FROM billing WHERE patient_id = ?", (42,)),
+        ("Patient medical history",
+         "SELECT record_id, record_date, diagnosis FROM medical_records WHERE patient_id = ? ORDER BY record_date DESC", (42,)),
+        ("First page of patients by name",
+         "SELECT patient_id, name FROM patients ORDER BY name ASC LIMIT 50", ()),
+    ]
+
+
+def run_index_benchmark(args):
+    """Compares query plans and timings for the hot lookups before and after the index migration."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_{args.rows}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows)
+    with db.write() as conn:
+        before = {}
+        for title, sql, params in hot_queries():
+            before[title] = (query_plan(conn, sql, params), time_query(conn, sql, params))
+
+        started = time.perf_counter()
+        apply_migrations(conn)
+        print(f"Migrations applied in {time.perf_counter() - started:.1f}s\n")
+
+        for title, sql, params in hot_queries():
+            plan_before, ms_before = before[title]
+            plan_after, ms_after = query_plan(conn, sql, params), time_query(conn, sql, params)
+            speedup = ms_before / ms_after if ms_after else float('inf')
+            print(f"{title}: {ms_before:.2f} ms -> {ms_after:.2f} ms ({speedup:.0f}x)")
+            print(f"    before: {plan_before}")
+            print(f"    after:  {plan_after}")
+
+    db.close()
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+# The LIKE search MedicalRecords.search_records ran before the full-text index
+LIKE_RECORD_SEARCH_QUERY = '''
+    SELECT mr.record_id, p.name, d.name, mr.record_date, mr.diagnosis
+    FROM medical_records mr
+    JOIN patients p ON mr.patient_id = p.patient_id
+    JOIN doctors d ON mr.doctor_id = d.doctor_id
+    WHERE p.name LIKE ? OR d.name LIKE ? OR mr.diagnosis LIKE ? OR mr.treatment LIKE ?
+    ORDER BY mr.record_date DESC
+'''
+
+RECORD_SEARCH_TERMS = ["Malaria", "hyper", '"type 2 diabetes"', "Wanjiru", "amoxicillin", "asthma nebulisation", "zzzz"]
+
+
+def run_fts_benchmark(args):
+    """Times the old LIKE record search against the FTS5 index for a set of typical search terms."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_fts_{args.records}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows, records=args.records)
+    with db.write() as conn:
+        started = time.perf_counter()
+        apply_migrations(conn)
+        print(f"Migrations (including the full-text index build) applied in {time.perf_counter() - started:.1f}s\n")
+
+        for term in RECORD_SEARCH_TERMS:
+            like_params = ("%" + term.strip('"') + "%",) * 4
+            like_ms = time_query(conn, LIKE_RECORD_SEARCH_QUERY, like_params, repeat=args.repeat)
+            like_count = len(conn.execute(LIKE_RECORD_SEARCH_QUERY, like_params).fetchall())
+
+            match = build_match_query(term)
+            fts_params = (match, SEARCH_RESULT_LIMIT)
+            fts_ms = time_query(conn, MEDICAL_RECORD_SEARCH_QUERY, fts_params, repeat=args.repeat)
+            fts_total = conn.execute("SELECT COUNT(*) FROM medical_records_fts WHERE medical_records_fts MATCH ?",
+                                     (match,)).fetchone()[0]
+            speedup = like_ms / fts_ms if fts_ms else float('inf')
+            print(f"{term!r}: LIKE {like_ms:.1f} ms ({like_count:,} rows) -> "
+                  f"FTS5 {fts_ms:.1f} ms (top {min(fts_total, SEARCH_RESULT_LIMIT)} of {fts_total:,} by bm25, {speedup:.0f}x)")
+            print(f"    MATCH {match}")
+
+    db.close()
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+# The LIKE search PatientManagement.search_patient ran before the trigram index
+LIKE_PATIENT_SEARCH_QUERY = '''
+    SELECT patient_id, name, gender, phone, date_of_birth FROM patients
+    WHERE name LIKE ? OR phone LIKE ? OR patient_id = ? ORDER BY name ASC
+'''
+
+# Exact names, name fragments, misspellings, a phone-number suffix and an email
+PATIENT_SEARCH_TERMS = ["Grace Otieno", "wanj", "Grase Otiend", "Mwangy", "Peetr Kamau", "4567", "patient12345@", "xq"]
+
+
+def run_lookup_benchmark(args):
+    """Times the old LIKE patient search against the trigram lookup for typical front-desk searches."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_lookup_{args.patients}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows, records=args.rows // 2, patients=args.patients)
+    with db.write() as conn:
+        started = time.perf_counter()
+        apply_migrations(conn)
+        print(f"Migrations (including the trigram index build) applied in {time.perf_counter() - started:.1f}s\n")
+
+        for term in PATIENT_SEARCH_TERMS:
+            like_params = (f"%{term}%", f"%{term}%", int(term) if term.isdigit() else -1)
+            like_ms = time_query(conn, LIKE_PATIENT_SEARCH_QUERY, like_params, repeat=args.repeat)
+            like_count = len(conn.execute(LIKE_PATIENT_SEARCH_QUERY, like_params).fetchall())
+
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                rows = lookup_patients(conn, term)
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            top = ", ".join(row[1] for row in rows[:3])
+            print(f"{term!r}: LIKE {like_ms:.1f} ms ({like_count:,} rows) -> lookup {best:.1f} ms ({len(rows)} rows: {top})")
+
+    db.close()
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+def run_pdf_benchmark(args):
+    """Writes the appointments report for the whole seeded range to a PDF, streaming rows from the database."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_pdf_{args.rows}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows, migrate=True)
+    pdf_path = args.output or os.path.join(tempfile.gettempdir(), "hms_bench_report.pdf")
+    report = REPORTS["Appointments Report"]
+    sql, params = report_query("Appointments Report", start_date="1900-01-01", end_date="2999-12-31")
+
+    def progress(page, rows):
+        if page % 500 == 0:
+            print(f"    {page:,} pages, {rows:,} rows, {page / (time.perf_counter() - started):.0f} pages/s")
+
+    with db.read() as conn:
+        started = time.perf_counter()
+        pages = write_report_pdf(pdf_path, report.title, report.columns, conn.execute(sql, params), on_page=progress)
+        elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(pdf_path) / 1e6
+    print(f"{args.rows:,} rows -> {pages:,} pages in {elapsed:.1f}s "
+          f"({pages / elapsed:.0f} pages/s, {args.rows / elapsed:,.0f} rows/s, {size_mb:.1f} MB)")
+
+    db.close()
+    if not args.output:
+        os.remove(pdf_path)
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+def run_analytics_benchmark(args):
+    """Times each analytic report over the whole seeded range, with its query plan."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_analytics_{args.rows}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows, migrate=True)
+    # Seeded rows predate booked_date/paid_date (migration 8); give them plausible ones
+    with db.write() as conn:
+        conn.execute("UPDATE appointments SET booked_date = date(appointment_date, '-' || (abs(random()) % 45) || ' days') "
+                     "WHERE booked_date IS NULL")
+        conn.execute("UPDATE billing SET paid_date = date(bill_date, '+' || (abs(random()) % 60) || ' days') "
+                     "WHERE status = 'Paid' AND paid_date IS NULL")
+        conn.execute("ANALYZE")
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    with db.read() as conn:
+        # Builder reports have a row per month in range, so they cover the seeded dates rather than all time
+        seeded_range = conn.execute("SELECT MIN(bill_date), MAX(bill_date) FROM billing").fetchone()
+        for report_type in ANALYTIC_REPORTS:
+            sql, params = report_query(report_type, start_date="1900-01-01", end_date="2999-12-31", today=today)
+            if sql is None:
+                # Built in Python from the daily statistics (analytics.py); there is no single query to plan
+                builder = REPORTS[report_type].builder
+                params = seeded_range
+                rows = len(builder(conn, *params))
+                print(f"{report_type}: {time_call(lambda: builder(conn, *params), args.repeat):.1f} ms, {rows:,} rows")
+                continue
+            rows = len(conn.execute(sql, params).fetchall())
+            print(f"{report_type}: {time_query(conn, sql, params, args.repeat):.1f} ms, {rows:,} rows")
+            print(f"    {query_plan(conn, sql, params)}")
+
+    db.close()
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+def run_billing_run_benchmark(args):
+    """Times a dry run and a real batch billing run over every completed appointment."""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"hms_bench_billing_run_{args.rows}.db")
+    if os.path.exists(path) and not args.db:
+        os.remove(path)
+    db = create_benchmark_database(path, args.rows, migrate=True)
+    # Seeded bills cover every appointment; drop the ones for completed appointments so the run has work
+    with db.write() as conn:
+        conn.execute("DELETE FROM billing WHERE appointment_id IN (SELECT appointment_id FROM appointments WHERE status = 'Completed')")
+        for service in SERVICES:
+            save_service_price(conn, service, 1500.0)
+
+    for dry_run in (True, False):
+        start = time.perf_counter()
+        with db.read() as conn:
+            run = plan_billing_run(conn)
+        if not dry_run:
+            with db.write(immediate=True) as conn:
+                post_billing_run(conn, run)
+        elapsed = time.perf_counter() - start
+        label = "dry run" if dry_run else "billing run"
+        print(f"{label}: {len(run.bills):,} bills ({run.total:,.2f}) in {elapsed:.2f}s "
+              f"({len(run.bills) / max(elapsed, 1e-9):,.0f} bills/second)")
+
+    db.close()
+    if not args.keep and not args.db:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hospital Management System performance benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    indexes = subparsers.add_parser("indexes", help="Query plans and timings before/after the index migration")
+    indexes.add_argument("--rows", type=int, default=1_000_000, help="Number of appointments and bills to generate")
+    indexes.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    indexes.add_argument("--keep", action="store_true", help="Keep the generated database")
+    indexes.set_defaults(func=run_index_benchmark)
+
+    fts = subparsers.add_parser("fts", help="Medical record search: LIKE scan vs the FTS5 index")
+    fts.add_argument("--records", type=int, default=2_000_000, help="Number of medical records to generate")
+    fts.add_argument("--rows", type=int, default=100_000, help="Number of appointments and bills to generate")
+    fts.add_argument("--repeat", type=int, default=3, help="Runs per query (the best time is reported)")
+    fts.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    fts.add_argument("--keep", action="store_true", help="Keep the generated database")
+    fts.set_defaults(func=run_fts_benchmark)
+
+    lookup = subparsers.add_parser("lookup", help="Patient search: LIKE scan vs the trigram lookup index")
+    lookup.add_argument("--patients", type=int, default=1_000_000, help="Number of patients to generate")
+    lookup.add_argument("--rows", type=int, default=100_000, help="Number of appointments and bills to generate")
+    lookup.add_argument("--repeat", type=int, default=3, help="Runs per search (the best time is reported)")
+    lookup.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    lookup.add_argument("--keep", action="store_true", help="Keep the generated database")
+    lookup.set_defaults(func=run_lookup_benchmark)
+
+    pdf = subparsers.add_parser("pdf", help="Paged, streaming PDF export of the appointments report (pages/second)")
+    pdf.add_argument("--rows", type=int, default=200_000, help="Number of appointments and bills to generate")
+    pdf.add_argument("--output", help="Keep the PDF at this path")
+    pdf.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    pdf.add_argument("--keep", action="store_true", help="Keep the generated database")
+    pdf.set_defaults(func=run_pdf_benchmark)
+
+    analytics = subparsers.add_parser("analytics", help="Timings and plans of the analytic reports over the whole range")
+    analytics.add_argument("--rows", type=int, default=1_000_000, help="Number of appointments and bills to generate")
+    analytics.add_argument("--repeat", type=int, default=3, help="Runs per report (the best time is reported)")
+    analytics.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    analytics.add_argument("--keep", action="store_true", help="Keep the generated database")
+    analytics.set_defaults(func=run_analytics_benchmark)
+
+    billing = subparsers.add_parser("billing-run", help="Batch billing of completed appointments: dry run and insert")
+    billing.add_argument("--rows", type=int, default=200_000, help="Number of appointments and bills to generate")
+    billing.add_argument("--db", help="Reuse or create the benchmark database at this path")
+    billing.add_argument("--keep", action="store_true", help="Keep the generated database")
+    billing.set_defaults(func=run_billing_run_benchmark)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# billing_run.py
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+BILL_DUE_DAYS = 30   # Same default due date as a bill added by hand
+
+# Completed appointments with no bill yet, priced by their purpose (service_prices is NOCASE, and
+# sp.service on the left makes the comparison use it). NOT EXISTS probes idx_billing_appointment.
+UNBILLED_APPOINTMENTS_QUERY = '''
+    SELECT a.appointment_id, a.patient_id, TRIM(COALESCE(a.purpose, '')), sp.service, sp.price
+    FROM appointments a
+    LEFT JOIN service_prices sp ON sp.service = TRIM(a.purpose)
+    WHERE a.status = 'Completed'
+      AND NOT EXISTS (SELECT 1 FROM billing b WHERE b.appointment_id = a.appointment_id)
+    ORDER BY a.appointment_id
+'''
+
+INSERT_BILL_QUERY = '''
+    INSERT INTO billing (patient_id, appointment_id, service_description, amount, bill_date, due_date, status)
+    VALUES (?, ?, ?, ?, ?, ?, 'Pending')
+'''
+
+BILLED_QUERY = "SELECT 1 FROM billing WHERE appointment_id = ?"
+
+SERVICE_PRICES_QUERY = "SELECT service, price FROM service_prices ORDER BY service"
+
+SAVE_PRICE_QUERY = '''
+    INSERT INTO service_prices (service, price) VALUES (?, ?)
+    ON CONFLICT (service) DO UPDATE SET price = excluded.price
+'''
+
+
+@dataclass
+class BillingRun:
+    """The bills a run creates (or would create, for a dry run) and the appointments it cannot price."""
+    bill_date: str
+    bills: list = field(default_factory=list)       # (patient_id, appointment_id, service, amount, bill_date, due_date)
+    unpriced: dict = field(default_factory=dict)    # purpose -> completed appointments with no price for it
+    total: float = 0.0
+    posted: bool = False
+    skipped: int = 0                                # Planned bills dropped because the appointment was billed meanwhile
+
+    @property
+    def unpriced_count(self):
+        return sum(self.unpriced.values())
+
+
+def plan_billing_run(conn, bill_date=None, due_days=BILL_DUE_DAYS):
+    """Works out the bills for every completed, unbilled appointment, dated `bill_date` (default today)."""
+    bill_date = bill_date or date.today()
+    run = BillingRun(bill_date.strftime("%Y-%m-%d"))
+    due_date = (bill_date + timedelta(days=due_days)).strftime("%Y-%m-%d")
+    for appointment_id, patient_id, purpose, service, price in conn.execute(UNBILLED_APPOINTMENTS_QUERY):
+        if price is None:
+            run.unpriced[purpose] = run.unpriced.get(purpose, 0) + 1
+            continue
+        run.bills.append((patient_id, appointment_id, service, price, run.bill_date, due_date))
+        run.total += price
+    run.total = round(run.total, 2)
+    return run
+
+
+def post_billing_run(conn, run):
+    """Inserts the bills of a run planned on a read connection with one executemany(); returns the run.
+
+    Run it in a write transaction that is already begun (DatabaseManager.write(immediate=True)):
+    appointments billed since the run was planned are dropped first, one idx_billing_appointment
+    probe each, so none is billed twice, and the rest are created all of them or none.
+    """
+    planned = len(run.bills)
+    run.bills = [bill for bill in run.bills if conn.execute(BILLED_QUERY, (bill[1],)).fetchone() is None]
+    run.skipped = planned - len(run.bills)
+    run.total = round(sum(bill[3] for bill in run.bills), 2)
+    conn.executemany(INSERT_BILL_QUERY, run.bills)
+    run.posted = True
+    return run
+
+
+def service_prices(conn):
+    """Returns [(service, price)] in service order."""
+    return conn.execute(SERVICE_PRICES_QUERY).fetchall()
+
+
+def save_service_price(conn, service, price):
+    """Adds a service price or changes an existing one (names match case-insensitively)."""
+    conn.execute(SAVE_PRICE_QUERY, (service, price))
+
+
+def delete_service_price(conn, service):
+    conn.execute("DELETE FROM service_prices WHERE service = ?", (service,))
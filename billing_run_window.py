@@ -0,0 +1,205 @@
+# billing_run_window.py
+from tkinter import *
+from tkinter import ttk, messagebox
+import sqlite3
+from datetime import datetime
+from billing_run import delete_service_price, plan_billing_run, post_billing_run, save_service_price, service_prices
+from database import get_db
+from query_executor import get_executor
+from write_queue import get_write_queue
+
+PREVIEW_ROWS = 500   # Bills listed in the preview; the summary counts all of them
+
+
+class BillingRunWindow:
+    """Service prices and the batch billing run for completed appointments, in a window over the billing screen."""
+
+    def __init__(self, master, on_posted=None):
+        self.on_posted = on_posted
+        self.job = None
+
+        self.window = Toplevel(master)
+        self.window.title("Billing Run")
+        self.window.geometry("900x520")
+        self.window.configure(bg='#f8f8f8')
+        self.window.transient(master)
+
+        # Left Frame (Service prices)
+        prices_frame = Frame(self.window, padx=10, pady=10, bg='#eaf7f7', relief=GROOVE, bd=2)
+        prices_frame.pack(side=LEFT, fill=Y, padx=(10, 5), pady=10)
+
+        ttk.Label(prices_frame, text="Service Prices",
+                  font=('Arial', 14, 'bold'), background='#eaf7f7', foreground='#2c3e50').grid(row=0, columnspan=2, pady=10)
+
+        self.prices_tree = ttk.Treeview(prices_frame, columns=("Service", "Price"), show="headings", height=10)
+        self.prices_tree.heading("Service", text="Service", anchor=W)
+        self.prices_tree.heading("Price", text="Price", anchor=CENTER)
+        self.prices_tree.column("Service", width=160)
+        self.prices_tree.column("Price", width=80, anchor=CENTER)
+        self.prices_tree.grid(row=1, columnspan=2, pady=5, sticky="nsew")
+        self.prices_tree.bind('<<TreeviewSelect>>', self.on_price_select)
+
+        ttk.Label(prices_frame, text="Service:", background='#eaf7f7').grid(row=2, column=0, sticky=W, pady=5, padx=5)
+        self.service_entry = ttk.Entry(prices_frame, width=22)
+        self.service_entry.grid(row=2, column=1, pady=5, padx=5, sticky="ew")
+        ttk.Label(prices_frame, text="Price:", background='#eaf7f7').grid(row=3, column=0, sticky=W, pady=5, padx=5)
+        self.price_entry = ttk.Entry(prices_frame, width=22)
+        self.price_entry.grid(row=3, column=1, pady=5, padx=5, sticky="ew")
+
+        ttk.Button(prices_frame, text="Save Price", command=self.save_price).grid(row=4, column=0, pady=10, padx=5, sticky="ew")
+        ttk.Button(prices_frame, text="Delete Price", command=self.delete_price, style='Danger.TButton').grid(row=4, column=1, pady=10, padx=5, sticky="ew")
+
+        # Right Frame (Run)
+        self.run_frame = Frame(self.window, padx=10, pady=10, bg='#e0f0f0', relief=GROOVE, bd=2)
+        self.run_frame.pack(side=RIGHT, fill=BOTH, expand=True, padx=(5, 10), pady=10)
+
+        controls = Frame(self.run_frame, bg='#e0f0f0')
+        controls.pack(fill=X)
+        ttk.Label(controls, text="Bill Date (YYYY-MM-DD):", background='#e0f0f0').pack(side=LEFT, padx=5)
+        self.bill_date_entry = ttk.Entry(controls, width=12)
+        self.bill_date_entry.pack(side=LEFT, padx=5)
+        self.bill_date_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        ttk.Button(controls, text="Preview", command=self.preview).pack(side=LEFT, padx=5)
+        ttk.Button(controls, text="Create Bills", command=self.create_bills).pack(side=LEFT, padx=5)
+
+        self.summary_label = ttk.Label(self.run_frame, text="Preview the run to see the bills it would create.",
+                                       background='#e0f0f0', wraplength=560, justify=LEFT)
+        self.summary_label.pack(fill=X, pady=10)
+
+        self.tree = ttk.Treeview(self.run_frame, columns=("Appointment", "Patient", "Service", "Amount", "Due"), show="headings")
+        for column, heading, width in (("Appointment", "Appointment ID", 100), ("Patient", "Patient ID", 80),
+                                       ("Service", "Service", 160), ("Amount", "Amount", 90), ("Due", "Due Date", 90)):
+            self.tree.heading(column, text=heading, anchor=CENTER)
+            self.tree.column(column, width=width, anchor=CENTER)
+        scrollbar = ttk.Scrollbar(self.run_frame, orient="vertical", command=self.tree.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(fill=BOTH, expand=True)
+
+        self.load_prices()
+
+    def load_prices(self):
+        self.prices_tree.delete(*self.prices_tree.get_children())
+        try:
+            with get_db().read() as conn:
+                prices = service_prices(conn)
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Error loading service prices: {e}", parent=self.window)
+            print(f"Error loading service prices: {e}")
+            return
+        for service, price in prices:
+            self.prices_tree.insert("", END, values=(service, f"{price:,.2f}"))
+
+    def on_price_select(self, event):
+        selected_item = self.prices_tree.focus()
+        if selected_item:
+            service, price = self.prices_tree.item(selected_item)['values']
+            self.service_entry.delete(0, END)
+            self.service_entry.insert(0, service)
+            self.price_entry.delete(0, END)
+            self.price_entry.insert(0, str(price).replace(",", ""))
+
+    def save_price(self):
+        service = self.service_entry.get().strip()
+        if not service:
+            messagebox.showerror("Validation Error", "Service is required.", parent=self.window)
+            return
+        try:
+            price = float(self.price_entry.get().strip())
+            if price <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Validation Error", "Price must be a positive number.", parent=self.window)
+            return
+        try:
+            with get_db().write() as conn:
+                save_service_price(conn, service, price)
+            self.load_prices()
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to save price: {str(e)}", parent=self.window)
+
+    def delete_price(self):
+        service = self.service_entry.get().strip()
+        if not service:
+            messagebox.showerror("Error", "No service selected.", parent=self.window)
+            return
+        if not messagebox.askyesno("Confirm Deletion", f"Delete the price of '{service}'?", parent=self.window):
+            return
+        try:
+            with get_db().write() as conn:
+                delete_service_price(conn, service)
+            self.service_entry.delete(0, END)
+            self.price_entry.delete(0, END)
+            self.load_prices()
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to delete price: {str(e)}", parent=self.window)
+
+    def read_bill_date(self):
+        try:
+            return datetime.strptime(self.bill_date_entry.get().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            messagebox.showerror("Validation Error", "Bill Date must be in YYYY-MM-DD format.", parent=self.window)
+            return None
+
+    def preview(self):
+        """Dry run: works out the bills on a pooled read connection without creating any."""
+        bill_date = self.read_bill_date()
+        if bill_date is None or self.job is not None:
+            return
+        # A read job owned by this window: screen navigation only cancels jobs inside the screen it destroys
+        self.job = get_executor(self.window.master.winfo_toplevel()).call(
+            lambda conn: plan_billing_run(conn, bill_date), on_done=self.on_run_done, on_error=self.on_run_error,
+            progress_parent=self.run_frame, progress_text="Working out bills...")
+
+    def create_bills(self):
+        bill_date = self.read_bill_date()
+        if bill_date is None or self.job is not None:
+            return
+        if not messagebox.askyesno("Confirm Billing Run",
+                                   "Create a bill for every completed appointment that has none yet?", parent=self.window):
+            return
+        # Planned on a read connection like the preview; only the inserts hold the writer
+        self.job = get_executor(self.window.master.winfo_toplevel()).call(
+            lambda conn: plan_billing_run(conn, bill_date), on_done=self.post_run, on_error=self.on_run_error,
+            progress_parent=self.run_frame, progress_text="Working out bills...")
+
+    def post_run(self, run):
+        # The write queue is never cancelled, so on_run_done or on_run_error always clears self.job
+        self.job = get_write_queue().submit(
+            lambda conn: post_billing_run(conn, run), on_done=self.on_run_done, on_error=self.on_run_error,
+            progress_parent=self.run_frame if self.window.winfo_exists() else None,
+            progress_text="Creating bills...", immediate=True)
+
+    def on_run_done(self, run):
+        self.job = None
+        if run.posted and self.on_posted is not None:
+            self.on_posted()
+        if not self.window.winfo_exists():
+            return # Closed while the run was working
+        self.tree.delete(*self.tree.get_children())
+        for patient_id, appointment_id, service, amount, _, due_date in run.bills[:PREVIEW_ROWS]:
+            self.tree.insert("", END, values=(appointment_id, patient_id, service, f"{amount:,.2f}", due_date))
+        if not run.bills:
+            self.tree.insert("", END, values=("", "", "No appointments to bill.", "", ""), tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+        action = "Created" if run.posted else "Would create"
+        summary = f"{action} {len(run.bills):,} bills dated {run.bill_date} totalling {run.total:,.2f}."
+        if len(run.bills) > PREVIEW_ROWS:
+            summary += f" The first {PREVIEW_ROWS:,} are listed."
+        if run.skipped:
+            summary += f" {run.skipped:,} appointments billed since the run was planned were skipped."
+        if run.unpriced:
+            purposes = ", ".join(f"{purpose or '(no purpose)'} ({count:,})"
+                                 for purpose, count in sorted(run.unpriced.items(), key=lambda item: -item[1]))
+            summary += f"\n{run.unpriced_count:,} completed appointments have no price for their purpose and are left unbilled: {purposes}"
+        self.summary_label.config(text=summary)
+
+        if run.posted:
+            messagebox.showinfo("Success", f"{len(run.bills):,} bills created.", parent=self.window)
+
+    def on_run_error(self, e):
+        self.job = None
+        print(f"Error in billing run: {e}")
+        parent = self.window if self.window.winfo_exists() else None # Closed while the run was working
+        messagebox.showerror("Billing Run Error", f"The billing run failed and created no bills: {e}", parent=parent)
@@ -1,13 +1,19 @@
 from tkinter import *
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import sqlite3
 from datetime import datetime, timedelta
+from autocomplete_combobox import patient_combobox
+from billing_run_window import BillingRunWindow
+from incremental_search import IncrementalSearch
+from paged_treeview import PagedTreeview
+from payments import bill_balance, post_payment, post_payments, read_payments_csv
+from search_index import bill_matches, search_bills as query_bills
+from write_queue import get_write_queue
 
 class BillingSystem:
-    def __init__(self, master_frame, conn, c):
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame (content_frame)
         for widget in self.master_frame.winfo_children():
@@ -32,10 +38,9 @@ class BillingSystem:
         # Patient selection
         ttk.Label(self.left_frame, text="Patient:", background='#eaf7f7').grid(row=1, column=0, sticky=W, pady=5, padx=5)
         self.patient_var = StringVar()
-        self.patient_combo = ttk.Combobox(self.left_frame, textvariable=self.patient_var, width=27, state="readonly")
+        # Type a name, phone or ID; matches come from the patient lookup index instead of a full list
+        self.patient_combo = patient_combobox(self.left_frame, textvariable=self.patient_var, width=27)
         self.patient_combo.grid(row=1, column=1, pady=5, padx=5, sticky="ew")
-        self.patient_map = {}
-        self.load_patients()
 
         # Service Description
         ttk.Label(self.left_frame, text="Service Description:", background='#eaf7f7').grid(row=2, column=0, sticky=W, pady=5, padx=5)
@@ -60,11 +65,11 @@ class BillingSystem:
         default_due_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
         self.due_date_entry.insert(0, default_due_date)
 
-        # Status
+        # Status (shown only: it follows the balance, which changes through payments)
         ttk.Label(self.left_frame, text="Status:", background='#eaf7f7').grid(row=6, column=0, sticky=W, pady=5, padx=5)
         self.status_var = StringVar()
         self.status_combo = ttk.Combobox(self.left_frame, textvariable=self.status_var,
-                                        values=["Pending", "Paid", "Partially Paid"], width=27, state="readonly")
+                                        values=["Pending", "Paid", "Partially Paid"], width=27, state="disabled")
         self.status_combo.grid(row=6, column=1, pady=5, padx=5, sticky="ew")
         self.status_combo.current(0)
 
@@ -77,25 +82,29 @@ class BillingSystem:
         ttk.Button(self.left_frame, text="Update Bill", command=self.update_bill).grid(row=7, column=1, pady=10, padx=5, sticky="ew")
         ttk.Button(self.left_frame, text="Clear Form", command=self.clear_form).grid(row=8, column=0, pady=5, padx=5, sticky="ew")
         ttk.Button(self.left_frame, text="Delete Bill", command=self.delete_bill, style='Danger.TButton').grid(row=8, column=1, pady=5, padx=5, sticky="ew")
-        ttk.Button(self.left_frame, text="Mark as Paid", command=self.mark_as_paid).grid(row=9, columnspan=2, pady=10, padx=5, sticky="ew")
+        ttk.Button(self.left_frame, text="Mark as Paid", command=self.mark_as_paid).grid(row=9, column=0, pady=10, padx=5, sticky="ew")
+        ttk.Button(self.left_frame, text="Record Payment", command=self.record_payment).grid(row=9, column=1, pady=10, padx=5, sticky="ew")
+        ttk.Button(self.left_frame, text="Import Payments (CSV)", command=self.import_payments).grid(row=10, column=0, pady=5, padx=5, sticky="ew")
+        ttk.Button(self.left_frame, text="Billing Run...", command=self.open_billing_run).grid(row=10, column=1, pady=5, padx=5, sticky="ew")
 
         # Search
-        ttk.Label(self.left_frame, text="Search Bills:", background='#eaf7f7').grid(row=10, column=0, sticky=W, pady=10, padx=5)
+        ttk.Label(self.left_frame, text="Search Bills:", background='#eaf7f7').grid(row=11, column=0, sticky=W, pady=10, padx=5)
         self.search_entry = ttk.Entry(self.left_frame, width=30)
-        self.search_entry.grid(row=10, column=1, pady=10, padx=5, sticky="ew")
-        ttk.Button(self.left_frame, text="Search", command=self.search_bills).grid(row=11, columnspan=2, pady=5, padx=5, sticky="ew")
+        self.search_entry.grid(row=11, column=1, pady=10, padx=5, sticky="ew")
+        ttk.Button(self.left_frame, text="Search", command=self.search_bills).grid(row=12, columnspan=2, pady=5, padx=5, sticky="ew")
 
         # Bills List (Treeview)
         style = ttk.Style()
         style.configure("Treeview.Heading", font=('Arial', 10, 'bold'), background='#4a69bd', foreground='white')
         style.configure("Treeview", font=('Arial', 10), rowheight=25)
 
-        self.tree = ttk.Treeview(self.right_frame, columns=("ID", "Patient", "Amount", "Issued", "Due", "Status"), show="headings")
+        self.tree = ttk.Treeview(self.right_frame, columns=("ID", "Patient", "Amount", "Balance", "Issued", "Due", "Status"), show="headings")
 
         # Define headings
         self.tree.heading("ID", text="ID", anchor=CENTER)
         self.tree.heading("Patient", text="Patient", anchor=W)
         self.tree.heading("Amount", text="Amount", anchor=CENTER)
+        self.tree.heading("Balance", text="Balance", anchor=CENTER)
         self.tree.heading("Issued", text="Date Issued", anchor=CENTER)
         self.tree.heading("Due", text="Due Date", anchor=CENTER)
         self.tree.heading("Status", text="Status", anchor=CENTER)
@@ -104,6 +113,7 @@ class BillingSystem:
         self.tree.column("ID", width=50, stretch=NO, anchor=CENTER)
         self.tree.column("Patient", width=150, stretch=YES)
         self.tree.column("Amount", width=100, stretch=NO, anchor=CENTER)
+        self.tree.column("Balance", width=100, stretch=NO, anchor=CENTER)
         self.tree.column("Issued", width=100, stretch=NO, anchor=CENTER)
         self.tree.column("Due", width=100, stretch=NO, anchor=CENTER)
         self.tree.column("Status", width=100, stretch=NO, anchor=CENTER)
@@ -118,55 +128,51 @@ class BillingSystem:
         # Bind selection event
         self.tree.bind('<<TreeviewSelect>>', self.on_bill_select)
 
+        # Newest bills first, fetched a page at a time as the list is scrolled
+        self.pager = PagedTreeview(self.tree,
+                                   '''SELECT b.bill_id, p.name, b.amount, b.balance, b.bill_date, b.due_date, b.status
+                                      FROM billing b
+                                      JOIN patients p ON b.patient_id = p.patient_id''',
+                                   key_columns=("b.bill_date", "b.bill_id"), key_indexes=(4, 0),
+                                   descending=True, scrollbar=scrollbar)
+
+        # Search as the user types; refining a term filters the last result instead of re-querying
+        self.incremental = IncrementalSearch(self.search_entry, query_bills, bill_matches,
+                                             self.on_search_results, self.load_bills,
+                                             on_error=self.on_search_error, progress_parent=self.right_frame)
+        self.search_entry.bind('<Return>', lambda event: self.search_bills())
+
         # Load initial data
         self.current_bill_id = None
         self.load_bills()
 
-    def load_patients(self):
-        try:
-            self.c.execute("SELECT patient_id, name FROM patients ORDER BY name ASC")
-            patients = self.c.fetchall()
-            self.patient_map = {f"{pid} - {name}": pid for pid, name in patients}
-            self.patient_combo['values'] = list(self.patient_map.keys())
-        except sqlite3.OperationalError as e:
-            messagebox.showerror("Database Error", f"Error loading patients: {e}\nEnsure 'patients' table exists.")
-            print(f"Error loading patients: {e}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred while loading patients: {e}")
-            print(f"An unexpected error occurred while loading patients: {e}")
+    def refresh(self):
+        """Brings the list up to date when the screen is shown again, keeping the current search."""
+        self.incremental.refresh()
 
     def load_bills(self):
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            # Fetch data from database
-            self.c.execute('''SELECT b.bill_id, p.name, b.amount, b.bill_date, b.due_date, b.status
-                           FROM billing b
-                           JOIN patients p ON b.patient_id = p.patient_id
-                           ORDER BY b.bill_date DESC''')
-            rows = self.c.fetchall()
-
-            # Insert data into treeview
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                self.tree.insert("", END, values=("", "", "No bills found.", "", "", ""))
-                self.tree.item(self.tree.get_children()[0], tags=('no_data',))
-                self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
-
-        except sqlite3.OperationalError as e:
+        # Fetch the first page; later pages are loaded as the list is scrolled
+        self.incremental.reset()
+        self.pager.set_filter(None)
+        self.pager.reload(on_done=self.on_bills_loaded, on_error=self.on_bills_load_error)
+
+    def on_bills_loaded(self, row_count):
+        if not row_count:
+            self.tree.insert("", END, values=("", "", "No bills found.", "", "", "", ""))
+            self.tree.item(self.tree.get_children()[0], tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+    def on_bills_load_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error loading bills: {e}\nEnsure 'billing' and 'patients' tables exist with correct columns.")
             print(f"Error loading bills: {e}")
-            self.tree.insert("", END, values=("", "", "Error loading bills.", "", "", ""))
+            self.tree.insert("", END, values=("", "", "Error loading bills.", "", "", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred while loading bills: {e}")
             print(f"An unexpected error occurred while loading bills: {e}")
-            self.tree.insert("", END, values=("", "", "Unexpected error loading bills.", "", "", ""))
+            self.tree.insert("", END, values=("", "", "Unexpected error loading bills.", "", "", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
 
@@ -177,21 +183,17 @@ class BillingSystem:
             self.current_bill_id = values[0]
 
             try:
-                self.c.execute('''SELECT b.patient_id, p.name, b.amount, b.service_description,
-                               b.bill_date, b.due_date, b.status
-                               FROM billing b
-                               JOIN patients p ON b.patient_id = p.patient_id
-                               WHERE b.bill_id=?''', (self.current_bill_id,))
-                bill_data = self.c.fetchone()
+                with self.db.read() as conn:
+                    bill_data = conn.execute('''SELECT b.patient_id, p.name, b.amount, b.service_description,
+                                   b.bill_date, b.due_date, b.status
+                                   FROM billing b
+                                   JOIN patients p ON b.patient_id = p.patient_id
+                                   WHERE b.bill_id=?''', (self.current_bill_id,)).fetchone()
 
                 if bill_data:
                     self.clear_form()
 
-                    patient_display_str = f"{bill_data[0]} - {bill_data[1]}"
-                    if patient_display_str in self.patient_map:
-                        self.patient_var.set(patient_display_str)
-                    else:
-                        self.patient_var.set("")
+                    self.patient_combo.set_selection(bill_data[0], bill_data[1])
 
                     self.service_entry.insert(0, bill_data[3] if bill_data[3] else "")
                     self.amount_entry.insert(0, bill_data[2] if bill_data[2] else "")
@@ -207,8 +209,7 @@ class BillingSystem:
                 self.clear_form()
 
     def add_bill(self):
-        patient_full_str = self.patient_var.get()
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.patient_combo.selected_id()
 
         if patient_id is None:
             messagebox.showerror("Input Error", "Please select a valid patient.")
@@ -226,7 +227,6 @@ class BillingSystem:
         service = self.service_entry.get().strip()
         bill_date = self.date_issued_entry.get().strip()
         due_date = self.due_date_entry.get().strip()
-        status = self.status_var.get()
 
         if not service:
             messagebox.showerror("Validation Error", "Service description is required.")
@@ -247,12 +247,11 @@ class BillingSystem:
                 return
 
         try:
-            self.c.execute('''INSERT INTO billing
-                          (patient_id, amount, bill_date, due_date, status, service_description)
-                          VALUES (?, ?, ?, ?, ?, ?)''',
-                          (patient_id, amount, bill_date, due_date,
-                           status, service))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''INSERT INTO billing
+                              (patient_id, amount, bill_date, due_date, status, service_description)
+                              VALUES (?, ?, ?, ?, 'Pending', ?)''',
+                              (patient_id, amount, bill_date, due_date, service))
             messagebox.showinfo("Success", "Bill added successfully.")
             self.load_bills()
             self.clear_form()
@@ -266,8 +265,7 @@ class BillingSystem:
             messagebox.showerror("Update Error", "Please select a bill to update.")
             return
 
-        patient_full_str = self.patient_var.get()
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.patient_combo.selected_id()
 
         if patient_id is None:
             messagebox.showerror("Input Error", "Please select a valid patient.")
@@ -285,7 +283,6 @@ class BillingSystem:
         service = self.service_entry.get().strip()
         bill_date = self.date_issued_entry.get().strip()
         due_date = self.due_date_entry.get().strip()
-        status = self.status_var.get()
 
         if not service:
             messagebox.showerror("Validation Error", "Service description is required.")
@@ -309,16 +306,16 @@ class BillingSystem:
             return
 
         try:
-            self.c.execute('''UPDATE billing SET
-                          patient_id=?, amount=?, bill_date=?, due_date=?, status=?, service_description=?
-                          WHERE bill_id=?''',
-                          (patient_id, amount, bill_date, due_date,
-                           status, service, self.current_bill_id))
-
-            if self.c.rowcount == 0:
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE billing SET
+                              patient_id=?, amount=?, bill_date=?, due_date=?, service_description=?
+                              WHERE bill_id=?''',
+                              (patient_id, amount, bill_date, due_date,
+                               service, self.current_bill_id)).rowcount
+
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No bill was updated. The bill might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Update Success", "Bill updated successfully.")
                 self.load_bills()
                 self.clear_form()
@@ -334,8 +331,8 @@ class BillingSystem:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this bill? This action cannot be undone."):
             try:
-                self.c.execute("DELETE FROM billing WHERE bill_id=?", (self.current_bill_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM billing WHERE bill_id=?", (self.current_bill_id,))
                 messagebox.showinfo("Success", "Bill deleted successfully.")
                 self.load_bills()
                 self.clear_form()
@@ -349,44 +346,116 @@ class BillingSystem:
             return
 
         try:
-            self.c.execute("UPDATE billing SET status='Paid' WHERE bill_id=?", (self.current_bill_id,))
-            if self.c.rowcount == 0:
-                messagebox.showwarning("Update Warning", "No bill was updated. The bill might have been deleted by another user or does not exist.")
-            else:
-                self.conn.commit()
-                messagebox.showinfo("Success", "Bill marked as paid.")
-                self.load_bills()
-                if hasattr(self, 'current_bill_id') and self.current_bill_id == self.tree.item(self.tree.focus())['values'][0]:
-                    self.status_var.set("Paid")
+            # Settles whatever is still owed with one payment, so the ledger accounts for the whole amount
+            with self.db.write(immediate=True) as conn:
+                balance = bill_balance(conn, self.current_bill_id)
+                if balance is not None and balance > 0:
+                    post_payment(conn, self.current_bill_id, balance)
+                elif balance is not None:
+                    conn.execute("UPDATE billing SET status='Paid' WHERE bill_id=?", (self.current_bill_id,))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update bill status: {str(e)}")
+            return
 
-    def search_bills(self):
-        search_term = self.search_entry.get().strip()
-        if not search_term:
-            self.load_bills()
+        if balance is None:
+            messagebox.showwarning("Update Warning", "No bill was updated. The bill might have been deleted by another user or does not exist.")
             return
+        messagebox.showinfo("Success", "Bill marked as paid.")
+        self.load_bills()
+        self.status_var.set("Paid")
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def record_payment(self):
+        if not hasattr(self, 'current_bill_id') or self.current_bill_id is None:
+            messagebox.showerror("Error", "No bill selected.")
+            return
 
         try:
-            self.c.execute('''SELECT b.bill_id, p.name, b.amount, b.bill_date, b.due_date, b.status
-                           FROM billing b
-                           JOIN patients p ON b.patient_id = p.patient_id
-                           WHERE p.name LIKE ? OR b.service_description LIKE ? OR b.status LIKE ?''',
-                          (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
+            with self.db.read() as conn:
+                balance = bill_balance(conn, self.current_bill_id)
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to read the bill balance: {str(e)}")
+            return
+        if balance is None:
+            messagebox.showwarning("Payment Warning", "The bill might have been deleted by another user or does not exist.")
+            return
+        if balance <= 0:
+            messagebox.showinfo("Record Payment", "This bill has nothing left to pay.")
+            return
+
+        amount = simpledialog.askfloat("Record Payment", f"Amount received (balance {balance:,.2f}):",
+                                       parent=self.master_frame, minvalue=0.01, maxvalue=balance)
+        if amount is None:
+            return
+        try:
+            with self.db.write() as conn:
+                remaining = post_payment(conn, self.current_bill_id, amount)
+            messagebox.showinfo("Success", f"Payment recorded. Remaining balance: {remaining:,.2f}")
+            self.load_bills()
+            self.status_var.set("Paid" if remaining <= 0 else "Partially Paid")
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Failed to record payment: {str(e)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+
+    def import_payments(self):
+        file_path = filedialog.askopenfilename(
+            title="Import Payments",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not file_path:
+            return
+
+        try:
+            payments = read_payments_csv(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Import Error", f"Could not read {file_path}:\n{e}")
+            return
+        if not payments:
+            messagebox.showinfo("Import Payments", "The file contains no payments.")
+            return
+        total = sum(payment[1] for payment in payments)
+        if not messagebox.askyesno("Confirm Import", f"Post {len(payments):,} payments totalling {total:,.2f}?"):
+            return
+
+        # One transaction on the write queue: a payment that fails leaves none of the batch posted, and
+        # leaving the screen does not cancel the batch or its report
+        get_write_queue().submit(
+            lambda conn: post_payments(conn, payments),
+            on_done=self.on_payments_imported, on_error=self.on_payments_import_error,
+            progress_parent=self.right_frame, progress_text="Posting payments...")
+
+    def on_payments_imported(self, count):
+        messagebox.showinfo("Success", f"{count:,} payments posted.")
+        if self.tree.winfo_exists():
+            self.load_bills()
+
+    def on_payments_import_error(self, e):
+        messagebox.showerror("Import Error", f"No payments were posted: {e}")
+        print(f"Error posting payments: {e}")
+
+    def open_billing_run(self):
+        # Bills completed appointments in bulk; the list reloads once a run has created bills
+        BillingRunWindow(self.master_frame.winfo_toplevel(), on_posted=self.refresh_after_run)
+
+    def refresh_after_run(self):
+        if self.tree.winfo_exists():
+            self.load_bills()
+
+    def search_bills(self):
+        self.incremental.search_now()
+
+    def on_search_results(self, rows, explicit):
+        self.pager.show_rows(rows)
+        if not rows:
+            self.tree.insert("", END, values=("", "No matching bills.", "", "", "", "", ""), tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+            if explicit:
                 messagebox.showinfo("No Results", "No bills found matching your search criteria.")
-        except sqlite3.OperationalError as e:
+
+    def on_search_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error searching bills: {e}")
             print(f"Error searching bills: {e}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred during search: {str(e)}")
             print(f"An unexpected error occurred during search: {str(e)}")
 
@@ -0,0 +1,116 @@
+# chart_renderer.py
+import io
+import threading
+
+# matplotlib is imported on first use (see ChartRenderer._figure); it is the slowest import in the application
+
+FIGURE_SIZE = (4, 3)   # Inches, as the dashboard charts have always been drawn
+FIGURE_DPI = 80
+
+
+class ChartRenderer:
+    """Owns one persistent matplotlib Figure per named chart and renders it to PNG bytes.
+
+    Only the object-oriented API with an Agg canvas is used (no pyplot), so no figure is registered
+    globally and rendering is safe on a worker thread. Drawing a chart again with new data updates
+    the existing artists where the shape of the data allows it, instead of building a new figure.
+    """
+
+    def __init__(self, figsize=FIGURE_SIZE, dpi=FIGURE_DPI):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.lock = threading.RLock()    # Hold it to update and render several charts as one consistent set
+        self._charts = {}    # name -> {'figure', 'axes', 'kind', 'labels', 'artists'}
+
+    def pie_chart(self, name, title, labels, sizes):
+        with self.lock:
+            chart = self._chart(name, 'pie')
+            ax = chart['axes']
+            # Wedge angles and label positions all depend on every slice, so the axes are redrawn
+            ax.clear()
+            ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=self._pie_colors())
+            ax.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
+            ax.set_title(title, fontsize=12)
+            chart['labels'] = list(labels)
+
+    def bar_chart(self, name, title, x_labels, values, color='#1ABC9C'):
+        with self.lock:
+            chart = self._chart(name, 'bar')
+            ax = chart['axes']
+            if chart['labels'] == list(x_labels):
+                for bar, value in zip(chart['artists'], values):
+                    bar.set_height(value)
+                    bar.set_color(color)
+                ax.relim()
+                ax.autoscale_view()
+            else:
+                ax.clear()
+                chart['artists'] = list(ax.bar(x_labels, values, color=color))
+                ax.tick_params(axis='x', rotation=45) # Rotate labels if needed
+                chart['labels'] = list(x_labels)
+            ax.set_title(title, fontsize=12)
+            chart['figure'].tight_layout() # Adjust layout to prevent labels from overlapping
+
+    def line_chart(self, name, title, x_labels, values, color='#3498db', trend=None, trend_label=None):
+        # trend: an optional second series (e.g. a rolling average) drawn dashed over the same labels
+        with self.lock:
+            chart = self._chart(name, 'line')
+            ax = chart['axes']
+            series = [values] if trend is None else [values, trend]
+            if chart['labels'] == list(x_labels) and len(chart['artists']) == len(series):
+                for line, ydata in zip(chart['artists'], series):
+                    line.set_ydata(ydata)
+                chart['artists'][0].set_color(color)
+                ax.relim()
+                ax.autoscale_view()
+            else:
+                ax.clear()
+                chart['artists'] = ax.plot(x_labels, values, marker='o', linestyle='-', color=color)
+                if trend is not None:
+                    chart['artists'] += ax.plot(x_labels, trend, linestyle='--', color='#95A5A6', label=trend_label)
+                    ax.legend(fontsize=8)
+                ax.tick_params(axis='x', rotation=45)
+                ax.grid(True, linestyle='--', alpha=0.7)
+                chart['labels'] = list(x_labels)
+            ax.set_title(title, fontsize=12)
+            chart['figure'].tight_layout()
+
+    def render_png(self, name):
+        """Draws a chart and returns it as PNG bytes."""
+        with self.lock:
+            buffer = io.BytesIO()
+            self._charts[name]['figure'].savefig(buffer, format='png')
+            return buffer.getvalue()
+
+    def _chart(self, name, kind):
+        chart = self._charts.get(name)
+        if chart is None or chart['kind'] != kind:
+            chart = {'figure': None, 'axes': None, 'kind': kind, 'labels': None, 'artists': []}
+            chart['figure'], chart['axes'] = self._figure()
+            self._charts[name] = chart
+        return chart
+
+    def _figure(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        figure = Figure(figsize=self.figsize, dpi=self.dpi)
+        FigureCanvasAgg(figure)  # Attaches itself as figure.canvas; renders off screen
+        return figure, figure.add_subplot()
+
+    def _pie_colors(self):
+        from matplotlib import colormaps
+        return colormaps['Paired'].colors
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer():
+    """Returns the application-wide ChartRenderer, so figures survive the dashboard being rebuilt."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+        return _renderer
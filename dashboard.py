@@ -1,32 +1,145 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Frame, Label, Button, Scrollbar, VERTICAL, CENTER, RIGHT, Y, BOTH, END, LEFT, X
 import sqlite3
-from datetime import datetime, timedelta # Import timedelta
-import calendar # Import calendar for month names
+import base64
+from datetime import date, datetime
+
+from chart_renderer import get_chart_renderer
+from dashboard_data import (load_dashboard_snapshot, error_snapshot, load_table_versions,
+                            RECENT_APPOINTMENTS_QUERY, PENDING_BILLS_QUERY, REVENUE_AVERAGE_MONTHS)
+from database import get_db
+from query_executor import get_executor
+
+LIVE_REFRESH_MS = 5000   # How often live mode checks PRAGMA data_version for new commits
+
+# Which parts of the dashboard each table_versions counter feeds. The cards and charts come from
+# the stats_* tables, which triggers on these same tables keep up to date.
+DASHBOARD_SOURCES = {
+    'patients': ('snapshot', 'recent_appointments', 'pending_bills'),
+    'doctors': ('snapshot', 'recent_appointments'),
+    'appointments': ('snapshot', 'recent_appointments'),
+    'billing': ('snapshot', 'pending_bills'),
+    'ar_aging': ('snapshot',),   # A new aging run changes the overdue receivables card
+}
+
+# The snapshot fields each chart is drawn from; a chart is only redrawn when these change
+CHART_FIELDS = {
+    "gender": ('gender_labels', 'gender_counts'),
+    "appointments": ('month_labels', 'monthly_appointments'),
+    "specializations": ('specialization_labels', 'specialization_counts'),
+    "revenue": ('month_labels', 'revenue_history'),
+}
+
+# (chart name, grid row, grid column) of each chart in the graphs section
+CHART_SLOTS = (
+    ("gender", 0, 0),
+    ("appointments", 0, 1),
+    ("specializations", 1, 0),
+    ("revenue", 1, 1),
+)
+
+
+def chart_data(snapshot, name):
+    return tuple(tuple(getattr(snapshot, field)) for field in CHART_FIELDS[name])
+
+
+def render_dashboard_charts(snapshot, names=None):
+    """Updates the persistent dashboard figures from a snapshot and returns {chart name: PNG bytes}.
+
+    Only the charts in `names` are drawn (all of them by default). Runs on a worker thread;
+    matplotlib is first imported here, off the Tk thread.
+    """
+    names = set(CHART_FIELDS if names is None else names)
+    renderer = get_chart_renderer()
+    with renderer.lock:
+        if "gender" in names:
+            # Graph 1: Patients by Gender (Pie Chart)
+            renderer.pie_chart("gender", "Patients by Gender",
+                               snapshot.gender_labels, snapshot.gender_counts)
+        if "appointments" in names:
+            # Graph 2: Monthly Appointments (Bar Chart)
+            renderer.bar_chart("appointments", "Last 6 Months Appointments",
+                               snapshot.month_labels, snapshot.monthly_appointments)
+        if "specializations" in names:
+            # Graph 3: Doctor Specialization Distribution (Bar Chart)
+            renderer.bar_chart("specializations", "Doctor Specializations",
+                               snapshot.specialization_labels, snapshot.specialization_counts,
+                               color='#9C27B0') # Purple
+        if "revenue" in names:
+            # Graph 4: Revenue Trend (Line Chart) with its rolling average
+            from analytics import rolling_mean  # numpy; matplotlib has loaded it on this thread already
+            average = rolling_mean(snapshot.revenue_history, REVENUE_AVERAGE_MONTHS)[-len(snapshot.monthly_revenue):]
+            renderer.line_chart("revenue", "Last 6 Months Revenue (Ksh)",
+                                snapshot.month_labels, snapshot.monthly_revenue,
+                                trend=average.tolist(), trend_label=f"{REVENUE_AVERAGE_MONTHS}-month average")
+        return {name: renderer.render_png(name) for name, _, _ in CHART_SLOTS if name in names}
+
+
+def load_dashboard_update(conn, table_versions, snapshot, shown_charts, reload_snapshot=False):
+    """Worker thread: reloads the parts of the dashboard whose tables changed and redraws the charts whose data did.
+
+    table_versions are the counters the dashboard was last loaded at and shown_charts maps each
+    chart name to the data it shows. Returns a dict holding only what has to be updated on screen.
+    """
+    update = {'table_versions': load_table_versions(conn)}
+    stale = set()
+    for table, parts in DASHBOARD_SOURCES.items():
+        if table not in update['table_versions'] or update['table_versions'][table] != table_versions.get(table):
+            stale.update(parts)
+    if reload_snapshot:
+        stale.add('snapshot')  # A new day changes today's appointments and the months shown
+
+    if 'snapshot' in stale:
+        snapshot = update['snapshot'] = load_dashboard_snapshot(conn)
+    if 'recent_appointments' in stale:
+        update['recent_appointments'] = conn.execute(RECENT_APPOINTMENTS_QUERY).fetchall()
+    if 'pending_bills' in stale:
+        update['pending_bills'] = conn.execute(PENDING_BILLS_QUERY).fetchall()
+
+    charts = {name: chart_data(snapshot, name) for name in CHART_FIELDS}
+    update['chart_data'] = {name: data for name, data in charts.items() if data != shown_charts.get(name)}
+    if update['chart_data']:
+        try:
+            update['charts'] = render_dashboard_charts(snapshot, update['chart_data'])
+        except Exception as e:
+            update['chart_error'] = e  # The figures still refresh; only the charts are unavailable
+    return update
 
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 class Dashboard:
-    def __init__(self, parent_frame, conn, c):
+    def __init__(self, parent_frame, db):
         self.parent_frame = parent_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
+        self.update_job = None
+        self.poll_id = None
 
         for widget in self.parent_frame.winfo_children():
             widget.destroy()
 
         self.create_dashboard_ui()
+        self.refresh() # Draws the charts
+        self.schedule_poll()
 
     def create_dashboard_ui(self):
         """Builds the UI for the dashboard."""
         # Main container for the dashboard content
         container = Frame(self.parent_frame, bg='#f0f2f5') # Lighter background
         container.pack(fill=BOTH, expand=True, padx=15, pady=15)
+        container.bind("<Destroy>", lambda e: self.stop_polling())
+        self.container = container
 
         # Header
         Label(container, text="Hospital Dashboard",
-              font=('Arial', 24, 'bold'), bg='#f0f2f5', fg='#333333').pack(pady=20)
+              font=('Arial', 24, 'bold'), bg='#f0f2f5', fg='#333333').pack(pady=(20, 5))
+        self.create_live_controls(container)
+
+        # Counters first: anything committed while the figures load shows up on the next check
+        self.data_version = get_db().data_version()
+        self.table_versions = self.load_table_versions()
+        self.loaded_day = date.today()
+
+        # All card and chart figures come from a single snapshot query pass
+        self.snapshot = self.load_snapshot()
 
         # Top section for statistics cards
         stats_frame = Frame(container, bg='#f0f2f5')
@@ -41,6 +154,7 @@ class Dashboard:
         graphs_frame.grid_rowconfigure(0, weight=1)
         graphs_frame.grid_rowconfigure(1, weight=1)
 
+        # Charts are rendered off the Tk thread and appear once ready
         self.display_graphs(graphs_frame)
 
         # Bottom section for tables (also using a grid)
@@ -51,31 +165,53 @@ class Dashboard:
         tables_frame.grid_rowconfigure(0, weight=1) # Only one row for tables in this example
 
         self.display_tables(tables_frame)
+        self.last_updated = datetime.now()
+        self.show_last_updated()
+
+    def create_live_controls(self, parent_frame):
+        """Live updates switch and the time the figures were last brought up to date."""
+        controls = Frame(parent_frame, bg='#f0f2f5')
+        controls.pack(pady=(0, 10))
+        self.live_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(controls, text="Live updates", variable=self.live_var, command=self.on_live_toggled,
+                       font=('Arial', 10), bg='#f0f2f5', activebackground='#f0f2f5').pack(side=LEFT, padx=5)
+        self.updated_label = Label(controls, text="", font=('Arial', 10, 'italic'), bg='#f0f2f5', fg='gray')
+        self.updated_label.pack(side=LEFT, padx=5)
+
+    def load_table_versions(self):
+        try:
+            with self.db.read() as conn:
+                return load_table_versions(conn)
+        except sqlite3.Error as e:
+            print(f"DB Error (load_table_versions): {e}")
+            return {}  # Every part counts as changed on the next check
+
+    def load_snapshot(self):
+        """Loads every card and chart figure in one pass over the database."""
+        try:
+            with self.db.read() as conn:
+                return load_dashboard_snapshot(conn)
+        except sqlite3.Error as e:
+            print(f"DB Error (load_dashboard_snapshot): {e}")
+        except Exception as e:
+            print(f"Error (load_dashboard_snapshot): {e}")
+        return error_snapshot()
 
     def display_statistics(self, parent_frame):
         """Displays the key statistics cards with rounded borders."""
         stats = [
-            ("Total Patients", "SELECT COUNT(*) FROM patients", "#4CAF50"), # Green
-            ("Total Doctors", "SELECT COUNT(*) FROM doctors", "#2196F3"), # Blue
-            ("Today's Appointments", "SELECT COUNT(*) FROM appointments WHERE appointment_date = date('now') AND status = 'Scheduled'", "#FF9800"), # Orange
-            ("Pending Bills", "SELECT COUNT(*) FROM billing WHERE status != 'Paid'", "#F44336") # Red
+            ("Total Patients", 'total_patients', "#4CAF50"), # Green
+            ("Total Doctors", 'total_doctors', "#2196F3"), # Blue
+            ("Today's Appointments", 'todays_appointments', "#FF9800"), # Orange
+            ("Pending Bills", 'pending_bills', "#F44336"), # Red
+            ("Overdue Receivables (Ksh)", 'overdue_receivables', "#795548") # Brown
         ]
+        self.card_values = {} # snapshot field -> the Label showing it
 
         for i in range(len(stats)):
             parent_frame.columnconfigure(i, weight=1)
 
-        for i, (title, query, color) in enumerate(stats):
-            count = "N/A"
-            try:
-                self.c.execute(query)
-                count = self.c.fetchone()[0]
-            except sqlite3.OperationalError as e:
-                print(f"Warning: Could not fetch stat for '{title}' due to missing table or column: {e}")
-                count = "Error"
-            except Exception as e:
-                print(f"An unexpected error occurred for '{title}': {e}")
-                count = "Error"
-
+        for i, (title, field, color) in enumerate(stats):
             card_canvas = tk.Canvas(parent_frame, bg=parent_frame['bg'], highlightthickness=0)
             card_canvas.grid(row=0, column=i, padx=10, pady=10, sticky="nsew")
 
@@ -94,223 +230,123 @@ class Dashboard:
 
             Label(stat_card_content, text=title, font=('Arial', 12, 'bold'),
                   bg=color, fg='white').pack()
-            Label(stat_card_content, text=str(count), font=('Arial', 28, 'bold'),
-                  bg=color, fg='white').pack(pady=5)
+            self.card_values[field] = Label(stat_card_content, text=str(getattr(self.snapshot, field)),
+                                            font=('Arial', 28, 'bold'), bg=color, fg='white')
+            self.card_values[field].pack(pady=5)
 
-            # Bind click event to the content frame (which covers most of the card)
-            stat_card_content.bind("<Button-1>", lambda e, q=query: self.show_card_details(title, q))
+            # Bind click event to the content frame (which covers most of the card); the count is read on click
+            stat_card_content.bind("<Button-1>", lambda e, t=title, f=field: self.show_card_details(t, getattr(self.snapshot, f)))
             # Also bind to the canvas itself for clicks outside the content frame
-            card_canvas.bind("<Button-1>", lambda e, q=query: self.show_card_details(title, q))
+            card_canvas.bind("<Button-1>", lambda e, t=title, f=field: self.show_card_details(t, getattr(self.snapshot, f)))
 
-    def show_card_details(self, title, query):
+    def show_card_details(self, title, count):
         """Displays a message box with details for a clicked card."""
-        details = ""
-        try:
-            if "COUNT" in query.upper(): # Simple check for count queries
-                self.c.execute(query)
-                count = self.c.fetchone()[0]
-                details = f"Total {title.lower()}: {count}"
-            else:
-                details = f"Details for {title} (query: {query})" # Fallback
-        except Exception as e:
-            details = f"Could not fetch details: {e}"
-        messagebox.showinfo(f"{title} Details", details)
+        messagebox.showinfo(f"{title} Details", f"Total {title.lower()}: {count}")
 
 
     def display_graphs(self, parent_frame):
-        """Displays different types of graphs with data from the database."""
-        # Graph 1: Patients by Gender (Pie Chart)
-        gender_labels, gender_sizes = self.get_patients_by_gender()
-        self.create_pie_chart(parent_frame, row=0, column=0,
-                              title="Patients by Gender",
-                              labels=gender_labels,
-                              sizes=gender_sizes)
-
-        # Graph 2: Monthly Appointments (Bar Chart)
-        appt_months, appt_counts = self.get_monthly_appointments()
-        self.create_bar_chart(parent_frame, row=0, column=1,
-                              title="Last 6 Months Appointments",
-                              x_labels=appt_months,
-                              values=appt_counts)
-
-        # Graph 3: Doctor Specialization Distribution (Bar Chart)
-        spec_labels, spec_counts = self.get_doctor_specializations()
-        self.create_bar_chart(parent_frame, row=1, column=0,
-                              title="Doctor Specializations",
-                              x_labels=spec_labels,
-                              values=spec_counts,
-                              color='#9C27B0') # Purple
-
-        # Graph 4: Revenue Trend (Line Chart)
-        revenue_months, revenue_amounts = self.get_monthly_revenue()
-        self.create_line_chart(parent_frame, row=1, column=1,
-                               title="Last 6 Months Revenue (Ksh)",
-                               x_labels=revenue_months,
-                               values=revenue_amounts)
-
-
-    def get_patients_by_gender(self):
-        """Fetches patient count by gender from the database."""
-        labels = []
-        sizes = []
-        try:
-            self.c.execute("SELECT gender, COUNT(*) FROM patients GROUP BY gender")
-            rows = self.c.fetchall()
-            if rows:
-                for gender, count in rows:
-                    if gender: # Ensure gender is not None or empty
-                        labels.append(gender)
-                        sizes.append(count)
-                # Handle cases where some genders might be missing from the data
-                # For example, if only Male and Female are present, but 'Other' is a desired label.
-                # This simple approach only includes existing genders.
-            else:
-                labels = ['No Data']
-                sizes = [1] # A small placeholder to make the chart render
-        except sqlite3.OperationalError as e:
-            print(f"DB Error (get_patients_by_gender): {e}")
-            labels = ['DB Error']
-            sizes = [1]
-        except Exception as e:
-            print(f"Error (get_patients_by_gender): {e}")
-            labels = ['Error']
-            sizes = [1]
-        return labels, sizes
-
-    def get_monthly_appointments(self):
-        """Fetches appointment counts per month for the last 6 months."""
-        months = []
-        counts = []
-        try:
-            today = datetime.now()
-            for i in range(6): # Last 6 months including current
-                target_month = today - timedelta(days=30 * (5 - i)) # Approx. 30 days per month
-                month_start = target_month.replace(day=1)
-                # Find the last day of the month
-                if target_month.month == 12:
-                    month_end = target_month.replace(month=1, year=target_month.year + 1, day=1) - timedelta(days=1)
-                else:
-                    month_end = target_month.replace(month=target_month.month + 1, day=1) - timedelta(days=1)
-
-                month_name = calendar.month_abbr[target_month.month]
-                year_abbr = str(target_month.year)[-2:] # '24' for 2024
-
-                self.c.execute(
-                    "SELECT COUNT(*) FROM appointments WHERE appointment_date BETWEEN ? AND ?",
-                    (month_start.strftime("%Y-%m-%d"), month_end.strftime("%Y-%m-%d"))
-                )
-                count = self.c.fetchone()[0]
-                months.append(f"{month_name}'{year_abbr}")
-                counts.append(count)
-        except sqlite3.OperationalError as e:
-            print(f"DB Error (get_monthly_appointments): {e}")
-            months = ['Error'] * 6
-            counts = [0] * 6
-        except Exception as e:
-            print(f"Error (get_monthly_appointments): {e}")
-            months = ['Error'] * 6
-            counts = [0] * 6
-        return months, counts
-
-    def get_doctor_specializations(self):
-        """Fetches doctor counts by specialization from the database."""
-        labels = []
-        counts = []
-        try:
-            self.c.execute("SELECT specialization, COUNT(*) FROM doctors GROUP BY specialization")
-            rows = self.c.fetchall()
-            if rows:
-                for spec, count in rows:
-                    if spec: # Ensure specialization is not None or empty
-                        labels.append(spec)
-                        counts.append(count)
-            else:
-                labels = ['No Data']
-                counts = [1]
-        except sqlite3.OperationalError as e:
-            print(f"DB Error (get_doctor_specializations): {e}")
-            labels = ['DB Error']
-            counts = [1]
-        except Exception as e:
-            print(f"Error (get_doctor_specializations): {e}")
-            labels = ['Error']
-            counts = [1]
-        return labels, counts
-
-    def get_monthly_revenue(self):
-        """Fetches total paid revenue per month for the last 6 months."""
-        months = []
-        amounts = []
-        try:
-            today = datetime.now()
-            for i in range(6): # Last 6 months including current
-                target_month = today - timedelta(days=30 * (5 - i)) # Approx. 30 days per month
-                month_start = target_month.replace(day=1)
-                # Find the last day of the month
-                if target_month.month == 12:
-                    month_end = target_month.replace(month=1, year=target_month.year + 1, day=1) - timedelta(days=1)
-                else:
-                    month_end = target_month.replace(month=target_month.month + 1, day=1) - timedelta(days=1)
-
-                month_name = calendar.month_abbr[target_month.month]
-                year_abbr = str(target_month.year)[-2:] # '24' for 2024
-
-                self.c.execute(
-                    "SELECT SUM(amount) FROM billing WHERE status = 'Paid' AND bill_date BETWEEN ? AND ?",
-                    (month_start.strftime("%Y-%m-%d"), month_end.strftime("%Y-%m-%d"))
-                )
-                total_amount = self.c.fetchone()[0]
-                months.append(f"{month_name}'{year_abbr}")
-                amounts.append(total_amount if total_amount is not None else 0) # Handle None for SUM
-
-        except sqlite3.OperationalError as e:
-            print(f"DB Error (get_monthly_revenue): {e}")
-            months = ['Error'] * 6
-            amounts = [0] * 6
-        except Exception as e:
-            print(f"Error (get_monthly_revenue): {e}")
-            months = ['Error'] * 6
-            amounts = [0] * 6
-        return months, amounts
-
-    def create_pie_chart(self, parent, row, column, title, labels, sizes):
-        """Creates a pie chart and embeds it in the Tkinter frame."""
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=80) # Smaller figure size
-        ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=plt.cm.Paired.colors)
-        ax.axis('equal') # Equal aspect ratio ensures that pie is drawn as a circle.
-        ax.set_title(title, fontsize=12)
-
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
-        canvas.draw()
-
-    def create_bar_chart(self, parent, row, column, title, x_labels, values, color='#1ABC9C'):
-        """Creates a bar chart and embeds it in the Tkinter frame."""
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=80)
-        ax.bar(x_labels, values, color=color)
-        ax.set_title(title, fontsize=12)
-        ax.tick_params(axis='x', rotation=45) # Rotate labels if needed
-        plt.tight_layout() # Adjust layout to prevent labels from overlapping
-
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
-        canvas.draw()
-
-    def create_line_chart(self, parent, row, column, title, x_labels, values, color='#3498db'):
-        """Creates a line chart and embeds it in the Tkinter frame."""
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=80)
-        ax.plot(x_labels, values, marker='o', linestyle='-', color=color)
-        ax.set_title(title, fontsize=12)
-        ax.tick_params(axis='x', rotation=45)
-        ax.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
-        canvas.draw()
+        """Lays out the chart slots; the first refresh renders them from the snapshot on a worker thread."""
+        self.chart_labels = {}
+        self.chart_images = {} # PhotoImages must stay referenced or Tk blanks them
+        self.shown_charts = {} # chart name -> chart_data() it shows; empty until the first render
+        for name, row, column in CHART_SLOTS:
+            label = Label(parent_frame, text="Loading chart...", font=('Arial', 10, 'italic'), bg='white', fg='gray')
+            label.grid(row=row, column=column, padx=10, pady=10, sticky="nsew")
+            self.chart_labels[name] = label
+
+    def show_charts(self, images):
+        """Puts the rendered PNG charts into their slots (Tk thread)."""
+        for name, png in images.items():
+            label = self.chart_labels[name]
+            self.chart_images[name] = tk.PhotoImage(master=label, data=base64.b64encode(png))
+            label.config(image=self.chart_images[name], text="", bg='#f0f2f5')
+
+    def on_charts_error(self, e, names):
+        if isinstance(e, ImportError):
+            message = "Charts unavailable: matplotlib is not installed."
+        else:
+            message = "Charts unavailable: error drawing charts."
+        print(f"Error rendering dashboard charts: {e}")
+        for name in names:
+            self.chart_images.pop(name, None)
+            self.chart_labels[name].config(image="", text=message)
+
+    def schedule_poll(self):
+        self.poll_id = self.container.after(LIVE_REFRESH_MS, self.poll_for_changes)
+
+    def stop_polling(self):
+        if self.poll_id is not None:
+            self.container.after_cancel(self.poll_id)
+            self.poll_id = None
+
+    def poll_for_changes(self):
+        """Timer: refreshes while live updates are on and the dashboard is on screen."""
+        self.poll_id = None
+        if self.live_var.get() and self.container.winfo_ismapped():
+            self.refresh()
+        self.schedule_poll()
+
+    def on_live_toggled(self):
+        if self.live_var.get():
+            self.refresh()
+        self.show_last_updated()
+
+    def refresh(self):
+        """Brings the cards, charts and tables whose data changed up to date, leaving the rest alone.
+
+        PRAGMA data_version is compared first, so checking an idle database costs one pragma;
+        the reload and chart drawing run on a worker thread.
+        """
+        if self.update_job is not None and not self.update_job.cancelled:
+            return  # The next check picks up anything committed since it started
+        data_version = get_db().data_version()
+        new_day = date.today() != self.loaded_day
+        charts_pending = len(self.shown_charts) < len(CHART_SLOTS)
+        if data_version == self.data_version and not new_day and not charts_pending:
+            return
+
+        table_versions = dict(self.table_versions)
+        snapshot = self.snapshot
+        shown_charts = dict(self.shown_charts)
+        self.update_job = get_executor(self.container.winfo_toplevel()).call(
+            lambda conn: load_dashboard_update(conn, table_versions, snapshot, shown_charts, new_day),
+            on_done=lambda update: self.apply_update(update, data_version),
+            on_error=self.on_update_error, owner=self.container)
+
+    def apply_update(self, update, data_version):
+        """Shows what load_dashboard_update reloaded (Tk thread)."""
+        self.update_job = None
+        if not self.container.winfo_exists():
+            return # The dashboard was destroyed while the update was loading
+        if 'snapshot' in update:
+            self.snapshot = update['snapshot']
+            for field, label in self.card_values.items():
+                label.config(text=str(getattr(self.snapshot, field)))
+            self.loaded_day = date.today()
+        if 'recent_appointments' in update:
+            self.show_table_rows(self.recent_tree, update['recent_appointments'], "No recent appointments")
+        if 'pending_bills' in update:
+            self.show_table_rows(self.pending_tree, update['pending_bills'], "No pending bills")
+        if 'chart_error' in update:
+            self.on_charts_error(update['chart_error'], update['chart_data'])
+        else:
+            self.show_charts(update.get('charts', {}))
+        # Failed charts count as shown too, so they are not retried until their data changes
+        self.shown_charts.update(update['chart_data'])
+        self.table_versions = update['table_versions']
+        self.data_version = data_version
+        self.last_updated = datetime.now()
+        self.show_last_updated()
+
+    def on_update_error(self, e):
+        # Counters are left as they were, so the next check tries again
+        self.update_job = None
+        print(f"Error refreshing dashboard: {e}")
+
+    def show_last_updated(self):
+        if self.updated_label.winfo_exists():
+            state = "" if self.live_var.get() else " (live updates off)"
+            self.updated_label.config(text=f"Last updated {self.last_updated:%H:%M:%S}{state}")
 
     def display_tables(self, parent_frame):
         """Displays multiple small tables."""
@@ -324,6 +360,17 @@ class Dashboard:
         pending_bills_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
         self.display_patients_with_pending_bills(pending_bills_frame)
 
+    def show_table_rows(self, tree, rows, empty_text):
+        """Replaces a dashboard table's rows, with a placeholder row when there are none."""
+        tree.delete(*tree.get_children())
+        if rows:
+            for row in rows:
+                tree.insert("", END, values=row)
+        else:
+            placeholder = [""] * len(tree['columns'])
+            placeholder[1] = empty_text
+            tree.insert("", END, values=placeholder)
+
     def display_recent_appointments(self, parent_frame):
         """Displays a table of recent appointments."""
         Label(parent_frame, text="Recent Appointments",
@@ -336,6 +383,7 @@ class Dashboard:
 
         columns = ("Patient", "Doctor", "Date", "Status")
         tree = ttk.Treeview(parent_frame, columns=columns, show="headings", height=6, style="Dashboard.Treeview")
+        self.recent_tree = tree
 
         for col in columns:
             tree.heading(col, text=col)
@@ -353,19 +401,9 @@ class Dashboard:
         tree.pack(fill=BOTH, expand=True, padx=5, pady=5)
 
         try:
-            self.c.execute('''
-                SELECT p.name, d.name, a.appointment_date, a.status
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.patient_id
-                JOIN doctors d ON a.doctor_id = d.doctor_id
-                ORDER BY a.appointment_date DESC, a.appointment_time DESC LIMIT 8
-            ''')
-            rows = self.c.fetchall()
-            if rows:
-                for row in rows:
-                    tree.insert("", END, values=row)
-            else:
-                tree.insert("", END, values=("", "No recent appointments", "", ""))
+            with self.db.read() as conn:
+                rows = conn.execute(RECENT_APPOINTMENTS_QUERY).fetchall()
+            self.show_table_rows(tree, rows, "No recent appointments")
 
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Could not fetch recent appointments: {e}")
@@ -384,8 +422,9 @@ class Dashboard:
         style.configure("Dashboard.Treeview.Heading", font=('Arial', 9, 'bold'), background='#607D8B', foreground='white')
         style.configure("Dashboard.Treeview", font=('Arial', 9), rowheight=20)
 
-        columns = ("Patient", "Amount", "Status")
+        columns = ("Patient", "Balance", "Status")
         tree = ttk.Treeview(parent_frame, columns=columns, show="headings", height=6, style="Dashboard.Treeview")
+        self.pending_tree = tree
 
         for col in columns:
             tree.heading(col, text=col)
@@ -402,22 +441,12 @@ class Dashboard:
         tree.pack(fill=BOTH, expand=True, padx=5, pady=5)
 
         try:
-            self.c.execute('''
-                SELECT p.name, b.amount, b.status
-                FROM billing b
-                JOIN patients p ON b.patient_id = p.patient_id
-                WHERE b.status = 'Pending' OR b.status = 'Partially Paid'
-                ORDER BY b.bill_date DESC LIMIT 8
-            ''')
-            rows = self.c.fetchall()
-            if rows:
-                for row in rows:
-                    tree.insert("", END, values=row)
-            else:
-                tree.insert("", END, values=("", "No pending bills", ""))
+            with self.db.read() as conn:
+                rows = conn.execute(PENDING_BILLS_QUERY).fetchall()
+            self.show_table_rows(tree, rows, "No pending bills")
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Could not fetch pending bills: {e}")
             tree.insert("", END, values=("", "Error loading", ""))
         except Exception as e:
             messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-            tree.insert("", END, values=("", "Unexpected Error", ""))
\ No newline at end of file
+            tree.insert("", END, values=("", "Unexpected Error", ""))
@@ -0,0 +1,175 @@
+# dashboard_data.py
+import calendar
+from dataclasses import dataclass
+from datetime import datetime
+
+# All figures are read from the stats_* summary tables (migration 2), which triggers keep in
+# step with every insert/update/delete, so the cost depends on the months shown, not on history.
+
+REVENUE_AVERAGE_MONTHS = 3   # Rolling average drawn over the revenue chart; the months before the chart are loaded for it
+
+# The KPI cards in one round trip; overdue receivables come from the latest aging run (see ar_aging.py)
+KPI_QUERY = '''
+    SELECT
+        (SELECT COALESCE(SUM(patient_count), 0) FROM stats_patient_gender),
+        (SELECT COALESCE(SUM(doctor_count), 0) FROM stats_doctor_specialization),
+        (SELECT COALESCE(SUM(appointment_count), 0) FROM stats_daily_appointments
+            WHERE day = ? AND status = 'Scheduled'),
+        (SELECT COALESCE(SUM(bill_count), 0) FROM stats_billing_status WHERE status != 'Paid'),
+        (SELECT total - current_amount FROM ar_aging_runs ORDER BY snapshot_date DESC LIMIT 1)
+'''
+
+MONTHLY_APPOINTMENTS_QUERY = '''
+    SELECT substr(day, 1, 7) AS month, SUM(appointment_count)
+    FROM stats_daily_appointments
+    WHERE day >= ? AND day < ?
+    GROUP BY month
+'''
+
+MONTHLY_REVENUE_QUERY = '''
+    SELECT substr(day, 1, 7) AS month, SUM(paid_amount)
+    FROM stats_daily_billing
+    WHERE day >= ? AND day < ?
+    GROUP BY month
+'''
+
+GENDER_QUERY = "SELECT gender, patient_count FROM stats_patient_gender WHERE patient_count > 0 ORDER BY gender"
+
+SPECIALIZATION_QUERY = '''
+    SELECT specialization, doctor_count FROM stats_doctor_specialization
+    WHERE doctor_count > 0 ORDER BY specialization
+'''
+
+# The two dashboard tables; both walk an index newest-first and stop after a screenful
+RECENT_APPOINTMENTS_QUERY = '''
+    SELECT p.name, d.name, a.appointment_date, a.status
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.patient_id
+    JOIN doctors d ON a.doctor_id = d.doctor_id
+    ORDER BY a.appointment_date DESC, a.appointment_time DESC LIMIT 8
+'''
+
+PENDING_BILLS_QUERY = '''
+    SELECT p.name, b.balance, b.status
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    WHERE +b.status IN ('Pending', 'Partially Paid') -- unary + walks idx_billing_date newest-first and stops at 8
+    ORDER BY b.bill_date DESC LIMIT 8
+'''
+
+
+@dataclass
+class DashboardSnapshot:
+    """Everything the dashboard cards and charts render, loaded in one pass."""
+    total_patients: object
+    total_doctors: object
+    todays_appointments: object
+    pending_bills: object
+    overdue_receivables: object  # Formatted amount, e.g. "1.2M"; "N/A" before the first aging run
+    gender_labels: list
+    gender_counts: list
+    specialization_labels: list
+    specialization_counts: list
+    month_labels: list           # Oldest first, e.g. ["Feb'25", ..., "Jul'25"]
+    monthly_appointments: list
+    monthly_revenue: list
+    revenue_history: list        # monthly_revenue preceded by REVENUE_AVERAGE_MONTHS - 1 earlier months
+
+
+def month_starts(today, months):
+    """Returns the first day of each of the last `months` calendar months (oldest first) plus the next month's."""
+    year, month = today.year, today.month
+    starts = []
+    for offset in range(months - 1, -2, -1):
+        m = month - offset
+        y = year + (m - 1) // 12
+        m = (m - 1) % 12 + 1
+        starts.append(datetime(y, m, 1))
+    return starts
+
+
+def _month_buckets(rows, starts):
+    totals = dict(rows)
+    return [totals.get(start.strftime("%Y-%m"), 0) or 0 for start in starts[:-1]]
+
+
+def format_amount(amount):
+    """Shortens an amount for a dashboard card, e.g. 1234567 -> "1.2M"."""
+    if amount is None:
+        return "N/A"
+    if abs(amount) >= 1_000_000:
+        return f"{amount / 1_000_000:.1f}M"
+    if abs(amount) >= 1_000:
+        return f"{amount / 1_000:.1f}K"
+    return f"{amount:,.0f}"
+
+
+def _labelled_counts(rows):
+    labels = [label for label, count in rows if label]
+    counts = [count for label, count in rows if label]
+    if not labels:
+        return ['No Data'], [1]  # A placeholder slice/bar so the chart still renders
+    return labels, counts
+
+
+def load_dashboard_snapshot(conn, today=None, months=6):
+    """Computes all dashboard figures with one query per summary table and returns a DashboardSnapshot."""
+    today = today or datetime.now()
+    starts = month_starts(today, months)
+    range_start = starts[0].strftime("%Y-%m-%d")
+    range_end = starts[-1].strftime("%Y-%m-%d")
+
+    total_patients, total_doctors, todays_appointments, pending_bills, overdue_receivables = conn.execute(
+        KPI_QUERY, (today.strftime("%Y-%m-%d"),)).fetchone()
+
+    gender_labels, gender_counts = _labelled_counts(
+        conn.execute(GENDER_QUERY).fetchall())
+    specialization_labels, specialization_counts = _labelled_counts(
+        conn.execute(SPECIALIZATION_QUERY).fetchall())
+
+    monthly_appointments = _month_buckets(
+        conn.execute(MONTHLY_APPOINTMENTS_QUERY, (range_start, range_end)).fetchall(), starts)
+    history_starts = month_starts(today, months + REVENUE_AVERAGE_MONTHS - 1)
+    revenue_history = _month_buckets(
+        conn.execute(MONTHLY_REVENUE_QUERY, (history_starts[0].strftime("%Y-%m-%d"), range_end)).fetchall(),
+        history_starts)
+
+    return DashboardSnapshot(
+        total_patients=total_patients,
+        total_doctors=total_doctors,
+        todays_appointments=todays_appointments,
+        pending_bills=pending_bills,
+        overdue_receivables=format_amount(overdue_receivables),
+        gender_labels=gender_labels,
+        gender_counts=gender_counts,
+        specialization_labels=specialization_labels,
+        specialization_counts=specialization_counts,
+        month_labels=[f"{calendar.month_abbr[s.month]}'{str(s.year)[-2:]}" for s in starts[:-1]],
+        monthly_appointments=monthly_appointments,
+        monthly_revenue=revenue_history[-months:],
+        revenue_history=revenue_history,
+    )
+
+
+def error_snapshot(months=6):
+    """Returns a placeholder snapshot used when the database could not be read."""
+    return DashboardSnapshot(
+        total_patients="Error",
+        total_doctors="Error",
+        todays_appointments="Error",
+        pending_bills="Error",
+        overdue_receivables="Error",
+        gender_labels=['DB Error'],
+        gender_counts=[1],
+        specialization_labels=['DB Error'],
+        specialization_counts=[1],
+        month_labels=['Error'] * months,
+        monthly_appointments=[0] * months,
+        monthly_revenue=[0] * months,
+        revenue_history=[0] * (months + REVENUE_AVERAGE_MONTHS - 1),
+    )
+
+
+def load_table_versions(conn):
+    """Returns {table name: change counter} from table_versions (migrations 5, 6 and 9)."""
+    return dict(conn.execute("SELECT table_name, version FROM table_versions"))
@@ -0,0 +1,151 @@
+# database.py
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+
+DB_NAME = 'hospital.db'
+
+# Applied to every connection the manager opens (writer, readers and the monitor)
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA busy_timeout = 5000;",     # Wait up to 5s on a lock instead of failing straight away
+    "PRAGMA synchronous = NORMAL;",    # Durable enough in WAL mode and avoids an fsync per commit
+    "PRAGMA cache_size = -20000;",     # ~20 MB page cache per connection
+    "PRAGMA mmap_size = 268435456;",   # Map up to 256 MB of the file instead of read() calls
+    "PRAGMA temp_store = MEMORY;",     # Sorts and temp b-trees stay off disk
+)
+
+
+class DatabaseManager:
+    """Owns the single writer connection and a pool of read-only connections to the hospital database."""
+
+    def __init__(self, db_name=DB_NAME, pool_size=4):
+        self.db_name = db_name
+        self.pool_size = pool_size
+
+        self._write_lock = threading.RLock()
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._readers_created = 0
+        self._all_readers = []
+        self._local = threading.local()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+
+        # The writer is shared by the Tk thread and worker threads. It is private: every write,
+        # from whichever thread, goes through write(), which serialises transactions with _write_lock.
+        self._writer = self._open()
+        self.journal_mode = self._writer.execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+
+    def _open(self, readonly=False):
+        """Opens a connection with the shared pragmas applied."""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=5.0)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if readonly:
+            conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    def _acquire_reader(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            if self._readers_created < self.pool_size:
+                conn = self._open(readonly=True)
+                self._readers_created += 1
+                self._all_readers.append(conn)
+                return conn
+
+        # Pool exhausted: wait for another thread to hand its connection back
+        return self._pool.get()
+
+    @contextmanager
+    def read(self):
+        """Yields a read-only connection for the calling thread, taken from the pool."""
+        conn = getattr(self._local, 'reader', None)
+        if conn is not None:
+            # Nested read() in the same thread reuses the connection it already holds
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire_reader()
+        self._local.reader = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                self._local.reader = None
+                if conn.in_transaction:
+                    conn.rollback()
+                self._pool.put(conn)
+
+    @contextmanager
+    def write(self, immediate=False):
+        """Yields the writer connection inside a transaction; commits on success, rolls back on error.
+
+        sqlite3 only begins the transaction at the first INSERT/UPDATE/DELETE. immediate=True begins it
+        (taking SQLite's write lock) straight away, so what is read before the first write stays current.
+        """
+        with self._write_lock:
+            try:
+                if immediate:
+                    self._writer.execute("BEGIN IMMEDIATE")
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def data_version(self):
+        """Returns a number that changes whenever another connection commits to the database."""
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = self._open(readonly=True)
+            return self._monitor.execute("PRAGMA data_version;").fetchone()[0]
+
+    def close(self):
+        """Closes every connection owned by the manager."""
+        with self._pool_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers_created = 0
+            self._pool = queue.LifoQueue()
+        with self._monitor_lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+        with self._write_lock:
+            self._writer.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_db(db_name=DB_NAME):
+    """Returns the application-wide DatabaseManager, opening it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DatabaseManager(db_name)
+        return _manager
+
+
+def close_db():
+    """Closes the application-wide DatabaseManager if it is open."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
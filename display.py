@@ -1,8 +1,9 @@
 from tkinter import *
 from tkinter import messagebox
-import sqlite3, pyttsx3
 from datetime import datetime
 
+from database import get_db, close_db
+
 class Application:
     def __init__(self, master):
         self.master = master
@@ -10,19 +11,19 @@ class Application:
         self.main_frame.pack(fill=BOTH, expand=True)
         self.master.title("Appointment Display")
         
-        # Database connection
-        self.conn = sqlite3.connect('hospital.db')
-        self.c = self.conn.cursor()
+        # Shared WAL-mode database: the display reads from the pool so it never blocks
+        # (or is blocked by) the front desk and billing writing at the same time
+        self.db = get_db()
         
         # Get today's appointments
         today = datetime.now().strftime("%Y-%m-%d")
-        self.c.execute('''SELECT a.appointment_id, p.name, d.name, time(a.scheduled_time)
-                       FROM appointments a
-                       JOIN patients p ON a.patient_id = p.patient_id
-                       JOIN doctors d ON a.doctor_id = d.doctor_id
-                       WHERE date(a.scheduled_time) = ? AND a.status = 'Scheduled'
-                       ORDER BY a.scheduled_time''', (today,))
-        self.appointments = self.c.fetchall()
+        with self.db.read() as conn:
+            self.appointments = conn.execute('''SELECT a.appointment_id, p.name, d.name, time(a.scheduled_time)
+                           FROM appointments a
+                           JOIN patients p ON a.patient_id = p.patient_id
+                           JOIN doctors d ON a.doctor_id = d.doctor_id
+                           WHERE date(a.scheduled_time) = ? AND a.status = 'Scheduled'
+                           ORDER BY a.scheduled_time''', (today,)).fetchall()
         self.current_index = 0
         
         # UI Elements
@@ -107,8 +108,8 @@ class Application:
         
         appt_id = self.appointments[self.current_index][0]
         try:
-            self.c.execute("UPDATE appointments SET status='Completed' WHERE appointment_id=?", (appt_id,))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute("UPDATE appointments SET status='Completed' WHERE appointment_id=?", (appt_id,))
             messagebox.showinfo("Success", "Appointment marked as completed")
             
             # Remove from display list
@@ -133,6 +134,7 @@ class Application:
     
     def speak(self, text):
         try:
+            import pyttsx3  # Loaded on the first announcement rather than at startup
             engine = pyttsx3.init()
             engine.setProperty('rate', engine.getProperty('rate') - 50)
             engine.say(text)
@@ -141,4 +143,4 @@ class Application:
             pass  # Text-to-speech not essential
     
     def __del__(self):
-        self.conn.close()
\ No newline at end of file
+        close_db()
\ No newline at end of file
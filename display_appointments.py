@@ -5,21 +5,30 @@ import sqlite3
 from datetime import datetime
 import threading
 
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
-    print("Warning: pyttsx3 not found. Text-to-speech functionality will be disabled.")
-except Exception as e:
-    TTS_AVAILABLE = False
-    print(f"Warning: Error initializing pyttsx3: {e}. Text-to-speech functionality will be disabled.")
+
+def create_tts_engine():
+    """Imports pyttsx3 and starts a speech engine; returns None if text-to-speech is unavailable."""
+    # Imported here rather than at module level: loading pyttsx3 and its driver is slow
+    try:
+        import pyttsx3
+    except ImportError:
+        print("Warning: pyttsx3 not found. Text-to-speech functionality will be disabled.")
+        return None
+    except Exception as e:
+        print(f"Warning: Error initializing pyttsx3: {e}. Text-to-speech functionality will be disabled.")
+        return None
+    try:
+        engine = pyttsx3.init()
+        engine.setProperty('rate', engine.getProperty('rate') - 50)
+        return engine
+    except Exception as e:
+        print(f"Error initializing pyttsx3 engine: {e}")
+        return None
 
 class DisplayAppointments:
-    def __init__(self, master_frame, conn, c):
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         for widget in self.master_frame.winfo_children():
             widget.destroy()
@@ -58,14 +67,7 @@ class DisplayAppointments:
         self.complete_btn.pack(side=LEFT, padx=15)
 
         self.engine = None
-        if TTS_AVAILABLE:
-            try:
-                self.engine = pyttsx3.init()
-                self.engine.setProperty('rate', self.engine.getProperty('rate') - 50)
-            except Exception as e:
-                print(f"Error initializing pyttsx3 engine: {e}")
-                self.engine = None
-                TTS_AVAILABLE = False
+        self.tts_checked = False # The speech engine is started on the first announcement
 
         self.load_appointments()
         self.current_index = 0
@@ -75,13 +77,13 @@ class DisplayAppointments:
     def load_appointments(self):
         today = datetime.now().strftime("%Y-%m-%d")
         try:
-            self.c.execute('''SELECT a.appointment_id, p.name, d.name, strftime('%H:%M', a.scheduled_time)
-                           FROM appointments a
-                           JOIN patients p ON a.patient_id = p.patient_id
-                           JOIN doctors d ON a.doctor_id = d.doctor_id
-                           WHERE date(a.scheduled_time) = ? AND a.status = 'Scheduled'
-                           ORDER BY a.scheduled_time ASC''', (today,))
-            self.appointments = self.c.fetchall()
+            with self.db.read() as conn:
+                self.appointments = conn.execute('''SELECT a.appointment_id, p.name, d.name, strftime('%H:%M', a.scheduled_time)
+                               FROM appointments a
+                               JOIN patients p ON a.patient_id = p.patient_id
+                               JOIN doctors d ON a.doctor_id = d.doctor_id
+                               WHERE date(a.scheduled_time) = ? AND a.status = 'Scheduled'
+                               ORDER BY a.scheduled_time ASC''', (today,)).fetchall()
             if not self.appointments:
                 self.current_index = 0
             elif self.current_index >= len(self.appointments):
@@ -151,8 +153,8 @@ class DisplayAppointments:
             return
 
         try:
-            self.c.execute("UPDATE appointments SET status='Completed' WHERE appointment_id=?", (appt_id,))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute("UPDATE appointments SET status='Completed' WHERE appointment_id=?", (appt_id,))
             messagebox.showinfo("Success", f"Appointment #{appt_id} marked as completed.")
 
             del self.appointments[self.current_index]
@@ -169,7 +171,10 @@ class DisplayAppointments:
             messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
 
     def speak(self, text):
-        if TTS_AVAILABLE and self.engine:
+        if not self.tts_checked:
+            self.tts_checked = True
+            self.engine = create_tts_engine()
+        if self.engine:
             def run_speak():
                 try:
                     self.engine.say(text)
@@ -2,12 +2,14 @@
 from tkinter import *
 from tkinter import ttk, messagebox
 import sqlite3
+from incremental_search import IncrementalSearch
+from paged_treeview import PagedTreeview
+from search_index import doctor_matches, search_doctors
 
 class DoctorManagement:
-    def __init__(self, master_frame, conn, c): # Accept master_frame, conn, and c
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn  # Use the shared connection
-        self.c = c        # Use the shared cursor
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame (content_frame)
         for widget in self.master_frame.winfo_children():
@@ -88,33 +90,44 @@ class DoctorManagement:
 
         self.tree.bind('<<TreeviewSelect>>', self.on_doctor_select)
 
-        self.current_doctor_id = None
+        # Rows are fetched a page at a time in (name, doctor_id) order as the list is scrolled
+        self.pager = PagedTreeview(self.tree,
+                                   "SELECT doctor_id, name, specialization, department, phone, email, license_number FROM doctors",
+                                   key_columns=("name", "doctor_id"), key_indexes=(1, 0), scrollbar=scrollbar)
 
-        self.load_doctors()
+        # Search as the user types; refining a term filters the last result instead of re-querying
+        self.incremental = IncrementalSearch(self.search_entry, search_doctors, doctor_matches,
+                                             self.on_search_results, self.load_doctors,
+                                             on_error=self.on_search_error, progress_parent=self.right_frame)
+        self.search_entry.bind('<Return>', lambda event: self.search_doctor())
 
-    def load_doctors(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.current_doctor_id = None
 
-        try:
-            self.c.execute("SELECT doctor_id, name, specialization, department, phone, email, license_number FROM doctors ORDER BY name ASC")
-            rows = self.c.fetchall()
+        self.load_doctors()
 
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                self.tree.insert("", END, values=("", "", "No doctors found.", "", "", "", ""))
-                self.tree.item(self.tree.get_children()[0], tags=('no_data',))
-                self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+    def refresh(self):
+        """Brings the list up to date when the screen is shown again, keeping the current search."""
+        self.incremental.refresh()
 
-        except sqlite3.OperationalError as e:
+    def load_doctors(self):
+        self.incremental.reset()
+        self.pager.set_filter(None)
+        self.pager.reload(on_done=self.on_doctors_loaded, on_error=self.on_doctors_load_error)
+
+    def on_doctors_loaded(self, row_count):
+        if not row_count:
+            self.tree.insert("", END, values=("", "", "No doctors found.", "", "", "", ""))
+            self.tree.item(self.tree.get_children()[0], tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+    def on_doctors_load_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error loading doctors: {e}\nEnsure 'doctors' table exists with correct columns.")
             print(f"Error loading doctors: {e}")
             self.tree.insert("", END, values=("", "", "Error loading doctors.", "", "", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred while loading doctors: {e}")
             print(f"An unexpected error occurred while loading doctors: {e}")
             self.tree.insert("", END, values=("", "", "Unexpected error loading doctors.", "", "", "", ""))
@@ -127,8 +140,8 @@ class DoctorManagement:
             values = self.tree.item(selected_item)['values']
             self.current_doctor_id = values[0]
 
-            self.c.execute("SELECT name, specialization, phone, email, department, license_number FROM doctors WHERE doctor_id=?", (self.current_doctor_id,))
-            doctor_data = self.c.fetchone()
+            with self.db.read() as conn:
+                doctor_data = conn.execute("SELECT name, specialization, phone, email, department, license_number FROM doctors WHERE doctor_id=?", (self.current_doctor_id,)).fetchone()
 
             if doctor_data:
                 self.clear_form()
@@ -158,12 +171,12 @@ class DoctorManagement:
             return
 
         try:
-            self.c.execute('''INSERT INTO doctors
-                          (name, specialization, phone, email, department, license_number)
-                          VALUES (?, ?, ?, ?, ?, ?)''',
-                          (data['name'], data['specialization'], data['phone'],
-                           data['email'], data['department'], data['license_number']))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''INSERT INTO doctors
+                              (name, specialization, phone, email, department, license_number)
+                              VALUES (?, ?, ?, ?, ?, ?)''',
+                              (data['name'], data['specialization'], data['phone'],
+                               data['email'], data['department'], data['license_number']))
             messagebox.showinfo("Success", "Doctor added successfully.")
             self.load_doctors()
             self.clear_form()
@@ -199,16 +212,16 @@ class DoctorManagement:
             return
 
         try:
-            self.c.execute('''UPDATE doctors SET
-                          name=?, specialization=?, phone=?, email=?, department=?, license_number=?
-                          WHERE doctor_id=?''',
-                          (data['name'], data['specialization'], data['phone'],
-                           data['email'], data['department'], data['license_number'], self.current_doctor_id))
-
-            if self.c.rowcount == 0:
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE doctors SET
+                              name=?, specialization=?, phone=?, email=?, department=?, license_number=?
+                              WHERE doctor_id=?''',
+                              (data['name'], data['specialization'], data['phone'],
+                               data['email'], data['department'], data['license_number'], self.current_doctor_id)).rowcount
+
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No doctor record was updated. The record might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Update Success", "Doctor updated successfully.")
                 self.load_doctors()
                 self.clear_form()
@@ -229,8 +242,8 @@ class DoctorManagement:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this doctor? This action cannot be undone and will also delete related appointments or records due to cascading deletes."):
             try:
-                self.c.execute("DELETE FROM doctors WHERE doctor_id=?", (self.current_doctor_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM doctors WHERE doctor_id=?", (self.current_doctor_id,))
                 messagebox.showinfo("Success", "Doctor deleted successfully.")
                 self.load_doctors()
                 self.clear_form()
@@ -239,31 +252,21 @@ class DoctorManagement:
                 messagebox.showerror("Error", f"Failed to delete doctor: {str(e)}")
 
     def search_doctor(self):
-        search_term = self.search_entry.get().strip()
-        if not search_term:
-            self.load_doctors()
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            self.c.execute('''SELECT doctor_id, name, specialization, department, phone, email, license_number
-                           FROM doctors
-                           WHERE name LIKE ? OR specialization LIKE ? OR department LIKE ? OR license_number LIKE ?
-                           ORDER BY name ASC''',
-                          (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
+        self.incremental.search_now()
+
+    def on_search_results(self, rows, explicit):
+        self.pager.show_rows(rows)
+        if not rows:
+            self.tree.insert("", END, values=("", "No matching doctors.", "", "", "", "", ""), tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+            if explicit:
                 messagebox.showinfo("No Results", "No doctors found matching your search criteria.")
-        except sqlite3.OperationalError as e:
+
+    def on_search_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error searching doctors: {e}")
             print(f"Error searching doctors: {e}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred during search: {str(e)}")
             print(f"An unexpected error occurred during search: {str(e)}")
 
@@ -2,10 +2,9 @@ import tkinter as tk
 from tkinter import ttk, Frame, Label, BOTH
 
 class Help:
-    def __init__(self, master_frame, conn, c): # conn and c are passed for consistency, though not used here
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # Passed for consistency, though not used here
 
         # Clear any existing widgets in the parent frame
         for widget in self.master_frame.winfo_children():
@@ -13,6 +12,9 @@ class Help:
 
         self.create_help_ui()
 
+    def refresh(self):
+        """Nothing to reload: the help text does not depend on the database."""
+
     def create_help_ui(self):
         self.main_frame = Frame(self.master_frame, bg='#f8f8f8')
         self.main_frame.pack(fill=BOTH, expand=True, padx=15, pady=15)
@@ -0,0 +1,142 @@
+# incremental_search.py
+from collections import OrderedDict
+
+from database import get_db
+from query_executor import get_executor
+
+DEBOUNCE_MS = 250        # Pause in typing before a search is sent
+CACHE_SIZE = 32          # Recent search terms kept per screen
+RESULT_LIMIT = 200       # Rows fetched per search; fewer back means the result is complete
+
+
+class IncrementalSearch:
+    """Searches as the user types in an entry: debounced, superseded lookups dropped, recent results cached.
+
+    search(conn, term, limit) runs on a worker thread and returns at most `limit` rows.
+    matches(term, row) must agree with it, so that when a term is refined ('wan' -> 'wanj') a
+    complete cached result for the shorter term can be filtered in memory instead of re-queried.
+    refinable(term), if given, says whether a complete result for `term` can be refined that way at all.
+    """
+
+    def __init__(self, entry, search, matches, on_results, on_clear, on_error=None, refinable=None,
+                 progress_parent=None, delay_ms=DEBOUNCE_MS, limit=RESULT_LIMIT, cache_size=CACHE_SIZE):
+        self.entry = entry
+        self.search = search
+        self.matches = matches
+        self.refinable = refinable
+        self.on_results = on_results    # on_results(rows, explicit) on the Tk thread
+        self.on_clear = on_clear        # Called when the entry is emptied
+        self.on_error = on_error
+        self.progress_parent = progress_parent
+        self.delay_ms = delay_ms
+        self.limit = limit
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()     # term -> (rows, complete)
+        self._cache_version = None
+        self._after_id = None
+        self._job = None
+        self._generation = 0
+        self._last_term = None
+
+        self.entry.bind('<KeyRelease>', self._on_key_release, add='+')
+
+    def search_now(self):
+        """Runs the search for the current text straight away (the Search button / Enter)."""
+        self._cancel_timer()
+        self._run(explicit=True)
+
+    def refresh(self):
+        """Shows the current term's rows again, re-querying if the data changed (or the list if the entry is empty)."""
+        self._cancel_timer()
+        self._last_term = None
+        self._run()
+
+    def reset(self):
+        """Forgets the last term shown, e.g. after the list was reloaded; cached results stay valid."""
+        self._cancel_timer()
+        self._cancel_job()
+        self._last_term = None
+
+    def _on_key_release(self, event):
+        if event.keysym in ('Return', 'KP_Enter'):
+            return  # Handled by the screen's own binding, if any
+        self._cancel_timer()
+        self._after_id = self.entry.after(self.delay_ms, self._run)
+
+    def _cancel_timer(self):
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _cancel_job(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def _run(self, explicit=False):
+        self._after_id = None
+        term = " ".join(self.entry.get().split())
+        if term == self._last_term and not explicit:
+            return
+        self._last_term = term
+        self._cancel_job()
+        self._generation += 1
+
+        if not term:
+            self.on_clear()
+            return
+
+        cached = self._cached_result(term)
+        if cached is not None:
+            self.on_results(cached, explicit)
+            return
+
+        generation = self._generation
+
+        def done(rows):
+            self._job = None
+            if generation != self._generation:
+                return  # A newer term was typed meanwhile
+            self._remember(term, rows, complete=len(rows) < self.limit)
+            self.on_results(rows, explicit)
+
+        def failed(error):
+            self._job = None
+            if generation == self._generation and self.on_error:
+                self.on_error(error)
+
+        self._job = get_executor(self.entry.winfo_toplevel()).call(
+            lambda conn: self.search(conn, term, self.limit),
+            on_done=done, on_error=failed, progress_parent=self.progress_parent, owner=self.entry)
+
+    def _cached_result(self, term):
+        """Returns rows for `term` from the cache, filtering a complete result for a shorter prefix if needed."""
+        # Any committed write bumps data_version, which invalidates everything cached
+        version = get_db().data_version()
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+
+        if term in self._cache:
+            self._cache.move_to_end(term)
+            return self._cache[term][0]
+
+        key = term.lower()
+        for cached_term in reversed(self._cache):
+            rows, complete = self._cache[cached_term]
+            if not complete or not key.startswith(cached_term.lower()):
+                continue
+            if self.refinable is None or self.refinable(cached_term):
+                refined = [row for row in rows if self.matches(term, row)]
+                if not refined:
+                    return None  # Let the database try (e.g. fuzzy matches) rather than show nothing
+                self._remember(term, refined, complete=True)
+                return refined
+        return None
+
+    def _remember(self, term, rows, complete):
+        self._cache[term] = (rows, complete)
+        self._cache.move_to_end(term)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -1,3 +1,4 @@
+import startup_timer # First, so the startup clock covers every import below
 import tkinter as tk
 from tkinter import *
 from tkinter import ttk, messagebox
@@ -5,23 +6,21 @@ import sqlite3
 import platform
 from datetime import datetime
 
-# Import all your modules
-from dashboard import Dashboard
-from patient_management import PatientManagement
-from doctor_management import DoctorManagement
-from appointment import AppointmentManagement
-from medical_records import MedicalRecords
-from reports import Reports
-from settings import Settings # Ensure this import is correct
-from help import Help
-from update_appointments import UpdateAppointments
-from display_appointments import DisplayAppointments
-from billing_system import BillingSystem
+# Screens are imported by load_module on first navigation, so the window can appear
+# before matplotlib, reportlab and the other screen dependencies are loaded
+from ar_aging import AGING_CHECK_MS, refresh_aging_snapshot_if_due
+from database import get_db, close_db
+from migrations import create_tables, apply_migrations
+from query_executor import get_executor, shutdown_executor
+from report_jobs import get_report_queue, shutdown_report_queue
+from screen_manager import ScreenManager
+from write_queue import get_write_queue, shutdown_write_queue
 
 class HospitalManagementSystem:
     def __init__(self, master):
         self.master = master
         self.master.title("Hospital Management System")
+        startup_timer.mark("core imports and Tk start")
 
         # Global font size variable (used for zoom functionality)
         self.current_font_size = 10 # Default font size
@@ -34,11 +33,16 @@ class HospitalManagementSystem:
 
         # --- IMPORTANT: Database Connection and Table Creation ---
         self.db_name = 'hospital.db'
-        self.conn = None
-        self.c = None
+        self.db = None
         self.connect_db_and_create_tables()
+        startup_timer.mark("database open and migrations")
         # --------------------------------------------------------
 
+        # Worker threads for list, search and report queries, so they never block the main loop
+        self.executor = get_executor(self.master)
+        # Background writes run one at a time on their own thread, untouched by navigation
+        self.write_queue = get_write_queue(self.master)
+
         # Create main containers
         self.create_main_containers()
 
@@ -53,9 +57,14 @@ class HospitalManagementSystem:
 
         # Create content area
         self.create_content_area()
+        startup_timer.mark("main window layout")
 
         # Initialize dashboard (now tables should exist)
         self.show_dashboard()
+        startup_timer.mark("dashboard")
+
+        # Builds the day's accounts receivable aging snapshot in the background, then checks again periodically
+        self.refresh_aging_snapshot()
 
         # Bind the on_closing method to the window close button
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -117,82 +126,13 @@ class HospitalManagementSystem:
     def connect_db_and_create_tables(self):
         """Connects to the database and creates tables if they don't exist."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.c = self.conn.cursor()
-            self.c.execute("PRAGMA foreign_keys = ON;")
-
-            self.c.execute('''
-                CREATE TABLE IF NOT EXISTS patients (
-                    patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    date_of_birth TEXT,
-                    gender TEXT,
-                    address TEXT,
-                    phone TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE,
-                    admission_date TEXT,
-                    medical_history TEXT
-                )
-            ''')
-
-            self.c.execute('''
-                CREATE TABLE IF NOT EXISTS doctors (
-                    doctor_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    specialization TEXT,
-                    phone TEXT UNIQUE,
-                    email TEXT,
-                    department TEXT,
-                    license_number TEXT UNIQUE NOT NULL
-                )
-            ''')
-
-            self.c.execute('''
-                CREATE TABLE IF NOT EXISTS appointments (
-                    appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id INTEGER NOT NULL,
-                    doctor_id INTEGER NOT NULL,
-                    appointment_date TEXT NOT NULL,
-                    appointment_time TEXT NOT NULL,
-                    purpose TEXT,
-                    status TEXT DEFAULT 'Scheduled',
-                    FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
-                    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
-                )
-            ''')
-
-            self.c.execute('''
-                CREATE TABLE IF NOT EXISTS medical_records (
-                    record_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id INTEGER NOT NULL,
-                    doctor_id INTEGER NOT NULL,
-                    record_date TEXT NOT NULL,
-                    diagnosis TEXT,
-                    treatment TEXT,
-                    prescription TEXT,
-                    notes TEXT,
-                    FOREIGN KEY(patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
-                    FOREIGN KEY(doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
-                )
-            ''')
-
-            self.c.execute('''
-                CREATE TABLE IF NOT EXISTS billing (
-                    bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id INTEGER NOT NULL,
-                    appointment_id INTEGER,
-                    service_description TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    bill_date TEXT NOT NULL,
-                    due_date TEXT,
-                    status TEXT DEFAULT 'Pending',
-                    FOREIGN KEY(patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
-                    FOREIGN KEY(appointment_id) REFERENCES appointments(appointment_id) ON DELETE SET NULL
-                )
-            ''')
-
-            self.conn.commit()
-            print("Database tables checked/created successfully.")
+            # The shared manager opens the database in WAL mode; screens read from its connection
+            # pool and write through db.write(), the one locked path to the writer connection.
+            self.db = get_db(self.db_name)
+            with self.db.write() as conn:
+                create_tables(conn)
+                schema_version = apply_migrations(conn)
+            print(f"Database tables checked/created successfully (schema version {schema_version}).")
 
         except sqlite3.Error as e:
             messagebox.showerror("Database Connection Error", f"Failed to connect to database or create tables: {e}\nApplication will exit.")
@@ -317,6 +257,12 @@ class HospitalManagementSystem:
         self.clock_label.config(text=now)
         self.master.after(1000, self.update_clock)
 
+    def refresh_aging_snapshot(self):
+        """Rebuilds the aging snapshot on the write queue if today's has not been built yet."""
+        self.write_queue.submit(refresh_aging_snapshot_if_due, immediate=True,
+                                on_error=lambda e: print(f"Error building the aging snapshot: {e}"))
+        self.master.after(AGING_CHECK_MS, self.refresh_aging_snapshot)
+
     def create_sidebar(self):
         """Create the sidebar navigation"""
         self.sidebar_frame = ttk.Frame(self.bottom_container, style='Sidebar.TFrame', width=220)
@@ -357,23 +303,20 @@ class HospitalManagementSystem:
         self.content_frame.pack(side=RIGHT, fill=BOTH, expand=True)
         self.content_frame.grid_propagate(False)
 
-    def clear_content(self):
-        """Clears all widgets from the content area."""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        # Screens stay alive after the first visit and are only refreshed when shown again
+        self.screens = ScreenManager(self.content_frame, self.db)
 
     def load_module(self, module_name, class_name):
-        """Dynamically loads a module into the content area."""
-        self.clear_content()
-
+        """Shows a screen in the content area, importing and constructing it on first use."""
         try:
-            module = __import__(module_name)
-            module_class = getattr(module, class_name)
-            # Pass the database connection and cursor to the module
-            module_class(self.content_frame, self.conn, self.c)
-
-        except ImportError:
-            messagebox.showerror("Module Error", f"Module '{module_name}' not found.\nPlease ensure '{module_name}.py' exists in the same directory.")
+            self.screens.show(module_name, class_name)
+
+        except ImportError as e:
+            if e.name == module_name:
+                messagebox.showerror("Module Error", f"Module '{module_name}' not found.\nPlease ensure '{module_name}.py' exists in the same directory.")
+            else:
+                messagebox.showerror("Module Error", f"Failed to load {module_name}: missing dependency '{e.name}'.\n{e}")
+                print(f"Error loading module {module_name}: {e}")
         except AttributeError:
             messagebox.showerror("Class Error", f"Class '{class_name}' not found in module '{module_name}'.\nPlease check the class name in '{module_name}.py'.")
         except Exception as e:
@@ -382,20 +325,16 @@ class HospitalManagementSystem:
 
     def show_dashboard(self):
         """Instantiates and displays the Dashboard content."""
-        self.clear_content()
-        Dashboard(self.content_frame, self.conn, self.c)
+        self.load_module('dashboard', 'Dashboard')
 
     def show_reports(self):
-        self.clear_content()
-        Reports(self.content_frame, self.conn, self.c)
+        self.load_module('reports', 'Reports')
 
     def show_settings(self):
-        self.clear_content()
-        Settings(self.content_frame, self.conn, self.c)
+        self.load_module('settings', 'Settings')
 
     def show_help(self):
-        self.clear_content()
-        Help(self.content_frame, self.conn, self.c)
+        self.load_module('help', 'Help')
 
     def show_about(self):
         """Displays an about message box."""
@@ -403,9 +342,19 @@ class HospitalManagementSystem:
 
     def on_closing(self):
         """Handles closing the application and database connection cleanly."""
-        if messagebox.askokcancel("Quit Application", "Do you want to quit the application?"):
-            if self.conn:
-                self.conn.close()
+        message = "Do you want to quit the application?"
+        running = get_report_queue().active_count()
+        if running:
+            message = f"{running} report job(s) are still running and will be cancelled.\n{message}"
+        saving = get_write_queue().pending
+        if saving:
+            message = f"{saving} change(s) are still being saved; the application closes once they finish.\n{message}"
+        if messagebox.askokcancel("Quit Application", message):
+            shutdown_report_queue()
+            shutdown_executor()
+            shutdown_write_queue()  # Waits for a write in progress to commit or roll back
+            if self.db:
+                close_db()
                 print("Database connection closed.")
             self.master.destroy()
 
@@ -475,4 +424,6 @@ class HospitalManagementSystem:
 if __name__ == "__main__":
     root = Tk()
     app = HospitalManagementSystem(root)
+    # Idle callbacks run after the pending redraws, i.e. once the first frame has been painted
+    root.after_idle(startup_timer.report)
     root.mainloop()
\ No newline at end of file
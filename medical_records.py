@@ -3,12 +3,16 @@ from tkinter import *
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
+from autocomplete_combobox import patient_combobox
+from incremental_search import IncrementalSearch
+from paged_treeview import PagedTreeview
+from reference_cache import get_reference_cache
+from search_index import record_matches, search_medical_records
 
 class MedicalRecords:
-    def __init__(self, master_frame, conn, c): # Accept master_frame, conn, and c
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn  # Use the shared connection
-        self.c = c        # Use the shared cursor
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame (content_frame)
         for widget in self.master_frame.winfo_children():
@@ -35,10 +39,9 @@ class MedicalRecords:
         # Patient selection
         ttk.Label(self.left_frame, text="Patient:", background='#eaf7f7').grid(row=1, column=0, sticky=W, pady=5, padx=5)
         self.inputs['patient_var'] = StringVar()
-        self.inputs['patient_combo'] = ttk.Combobox(self.left_frame, textvariable=self.inputs['patient_var'], width=27, state="readonly")
+        # Type a name, phone or ID; matches come from the patient lookup index instead of a full list
+        self.inputs['patient_combo'] = patient_combobox(self.left_frame, textvariable=self.inputs['patient_var'], width=27)
         self.inputs['patient_combo'].grid(row=1, column=1, pady=5, padx=5, sticky="ew")
-        self.patient_map = {}
-        self.load_patients()
 
         # Doctor selection
         ttk.Label(self.left_frame, text="Doctor:", background='#eaf7f7').grid(row=2, column=0, sticky=W, pady=5, padx=5)
@@ -119,28 +122,34 @@ class MedicalRecords:
 
         self.tree.bind('<<TreeviewSelect>>', self.on_record_select)
 
+        # Newest records first, fetched a page at a time as the list is scrolled
+        self.pager = PagedTreeview(self.tree,
+                                   '''SELECT mr.record_id, p.name, d.name, mr.record_date, mr.diagnosis
+                                      FROM medical_records mr
+                                      JOIN patients p ON mr.patient_id = p.patient_id
+                                      JOIN doctors d ON mr.doctor_id = d.doctor_id''',
+                                   key_columns=("mr.record_date", "mr.record_id"), key_indexes=(3, 0),
+                                   descending=True, scrollbar=scrollbar)
+
+        # Ranked full-text search over diagnosis, treatment, prescription, notes and names, as the user types
+        self.incremental = IncrementalSearch(self.inputs['search_entry'], search_medical_records, record_matches,
+                                             self.on_search_results, self.load_records,
+                                             on_error=self.on_search_error, progress_parent=self.right_frame)
+        self.inputs['search_entry'].bind('<Return>', lambda event: self.search_records())
+
         self.current_record_id = None
 
         self.load_records()
 
-    def load_patients(self):
-        try:
-            self.c.execute("SELECT patient_id, name FROM patients ORDER BY name ASC")
-            patients = self.c.fetchall()
-            self.patient_map = {f"{pid} - {name}": pid for pid, name in patients}
-            self.inputs['patient_combo']['values'] = list(self.patient_map.keys())
-        except sqlite3.OperationalError as e:
-            messagebox.showerror("Database Error", f"Error loading patients: {e}\nEnsure 'patients' table exists.")
-            print(f"Error loading patients: {e}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred while loading patients: {e}")
-            print(f"An unexpected error occurred while loading patients: {e}")
+    def refresh(self):
+        """Brings the doctor list and the records up to date when the screen is shown again, keeping the current search."""
+        self.load_doctors()
+        self.incremental.refresh()
 
     def load_doctors(self):
         try:
-            self.c.execute("SELECT doctor_id, name FROM doctors ORDER BY name ASC")
-            doctors = self.c.fetchall()
-            self.doctor_map = {f"{did} - {name}": did for did, name in doctors}
+            # Shared by every screen and only re-read after the doctors table changes
+            self.doctor_map = get_reference_cache().doctor_map()
             self.inputs['doctor_combo']['values'] = list(self.doctor_map.keys())
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Error loading doctors: {e}\nEnsure 'doctors' table exists.")
@@ -150,32 +159,24 @@ class MedicalRecords:
             print(f"An unexpected error occurred while loading doctors: {e}")
 
     def load_records(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            self.c.execute('''SELECT mr.record_id, p.name, d.name, mr.record_date, mr.diagnosis
-                           FROM medical_records mr
-                           JOIN patients p ON mr.patient_id = p.patient_id
-                           JOIN doctors d ON mr.doctor_id = d.doctor_id
-                           ORDER BY mr.record_date DESC''')
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                self.tree.insert("", END, values=("", "", "No medical records found.", "", ""))
-                self.tree.item(self.tree.get_children()[0], tags=('no_data',))
-                self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
-
-        except sqlite3.OperationalError as e:
+        self.incremental.reset()
+        self.pager.set_filter(None)
+        self.pager.reload(on_done=self.on_records_loaded, on_error=self.on_records_load_error)
+
+    def on_records_loaded(self, row_count):
+        if not row_count:
+            self.tree.insert("", END, values=("", "", "No medical records found.", "", ""))
+            self.tree.item(self.tree.get_children()[0], tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+    def on_records_load_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error loading medical records: {e}\nEnsure 'medical_records', 'patients', and 'doctors' tables exist with correct columns.")
             print(f"Error loading medical records: {e}")
             self.tree.insert("", END, values=("", "", "Error loading medical records.", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred while loading medical records: {e}")
             print(f"An unexpected error occurred while loading medical records: {e}")
             self.tree.insert("", END, values=("", "", "Unexpected error loading medical records.", "", ""))
@@ -188,22 +189,18 @@ class MedicalRecords:
             values = self.tree.item(selected_item)['values']
             self.current_record_id = values[0]
 
-            self.c.execute('''SELECT mr.patient_id, p.name, mr.doctor_id, d.name,
-                           mr.record_date, mr.diagnosis, mr.treatment, mr.prescription, mr.notes
-                           FROM medical_records mr
-                           JOIN patients p ON mr.patient_id = p.patient_id
-                           JOIN doctors d ON mr.doctor_id = d.doctor_id
-                           WHERE mr.record_id=?''', (self.current_record_id,))
-            record_data = self.c.fetchone()
+            with self.db.read() as conn:
+                record_data = conn.execute('''SELECT mr.patient_id, p.name, mr.doctor_id, d.name,
+                               mr.record_date, mr.diagnosis, mr.treatment, mr.prescription, mr.notes
+                               FROM medical_records mr
+                               JOIN patients p ON mr.patient_id = p.patient_id
+                               JOIN doctors d ON mr.doctor_id = d.doctor_id
+                               WHERE mr.record_id=?''', (self.current_record_id,)).fetchone()
 
             if record_data:
                 self.clear_form()
 
-                patient_display_str = f"{record_data[0]} - {record_data[1]}"
-                if patient_display_str in self.patient_map:
-                    self.inputs['patient_var'].set(patient_display_str)
-                else:
-                    self.inputs['patient_var'].set("")
+                self.inputs['patient_combo'].set_selection(record_data[0], record_data[1])
 
                 doctor_display_str = f"{record_data[2]} - {record_data[3]}"
                 if doctor_display_str in self.doctor_map:
@@ -221,10 +218,9 @@ class MedicalRecords:
                 self.clear_form()
 
     def add_record(self):
-        patient_full_str = self.inputs['patient_var'].get()
         doctor_full_str = self.inputs['doctor_var'].get()
 
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.inputs['patient_combo'].selected_id()
         doctor_id = self.doctor_map.get(doctor_full_str)
 
         if patient_id is None or doctor_id is None:
@@ -252,12 +248,12 @@ class MedicalRecords:
             return
 
         try:
-            self.c.execute('''INSERT INTO medical_records
-                          (patient_id, doctor_id, record_date, diagnosis, treatment, prescription, notes)
-                          VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                          (patient_id, doctor_id, record_date, diagnosis,
-                           treatment, prescription, notes))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''INSERT INTO medical_records
+                              (patient_id, doctor_id, record_date, diagnosis, treatment, prescription, notes)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                              (patient_id, doctor_id, record_date, diagnosis,
+                               treatment, prescription, notes))
             messagebox.showinfo("Success", "Medical record added successfully.")
             self.load_records()
             self.clear_form()
@@ -271,10 +267,9 @@ class MedicalRecords:
             messagebox.showerror("Update Error", "Please select a record to update.")
             return
 
-        patient_full_str = self.inputs['patient_var'].get()
         doctor_full_str = self.inputs['doctor_var'].get()
 
-        patient_id = self.patient_map.get(patient_full_str)
+        patient_id = self.inputs['patient_combo'].selected_id()
         doctor_id = self.doctor_map.get(doctor_full_str)
 
         if patient_id is None or doctor_id is None:
@@ -305,18 +300,18 @@ class MedicalRecords:
             return
 
         try:
-            self.c.execute('''UPDATE medical_records SET
-                        patient_id=?, doctor_id=?, record_date=?,
-                        diagnosis=?, treatment=?, prescription=?, notes=?
-                        WHERE record_id=?''',
-                        (patient_id, doctor_id, record_date,
-                        diagnosis, treatment, prescription, notes,
-                        self.current_record_id))
-
-            if self.c.rowcount == 0:
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE medical_records SET
+                            patient_id=?, doctor_id=?, record_date=?,
+                            diagnosis=?, treatment=?, prescription=?, notes=?
+                            WHERE record_id=?''',
+                            (patient_id, doctor_id, record_date,
+                            diagnosis, treatment, prescription, notes,
+                            self.current_record_id)).rowcount
+
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No record was updated. The record might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Update Success", "Medical record updated successfully.")
                 self.load_records()
                 self.clear_form()
@@ -332,8 +327,8 @@ class MedicalRecords:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this medical record? This action cannot be undone and will also delete related records due to cascading deletes."):
             try:
-                self.c.execute("DELETE FROM medical_records WHERE record_id=?", (self.current_record_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM medical_records WHERE record_id=?", (self.current_record_id,))
                 messagebox.showinfo("Success", "Medical record deleted successfully.")
                 self.load_records()
                 self.clear_form()
@@ -342,33 +337,21 @@ class MedicalRecords:
                 messagebox.showerror("Error", f"Failed to delete record: {str(e)}")
 
     def search_records(self):
-        search_term = self.inputs['search_entry'].get().strip()
-        if not search_term:
-            self.load_records()
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            self.c.execute('''SELECT mr.record_id, p.name, d.name, mr.record_date, mr.diagnosis
-                           FROM medical_records mr
-                           JOIN patients p ON mr.patient_id = p.patient_id
-                           JOIN doctors d ON mr.doctor_id = d.doctor_id
-                           WHERE p.name LIKE ? OR d.name LIKE ? OR mr.diagnosis LIKE ? OR mr.treatment LIKE ?
-                           ORDER BY mr.record_date DESC''',
-                          (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"))
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
+        self.incremental.search_now()
+
+    def on_search_results(self, rows, explicit):
+        self.pager.show_rows(rows)
+        if not rows:
+            self.tree.insert("", END, values=("", "", "No matching records.", "", ""), tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+            if explicit:
                 messagebox.showinfo("No Results", "No medical records found matching your search criteria.")
-        except sqlite3.OperationalError as e:
+
+    def on_search_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error searching records: {e}")
             print(f"Error searching records: {e}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred during search: {str(e)}")
             print(f"An unexpected error occurred during search: {str(e)}")
 
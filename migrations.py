@@ -0,0 +1,1064 @@
+# migrations.py
+import sqlite3
+
+# Base tables. These use IF NOT EXISTS so they are safe to run against any existing hospital.db.
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS patients (
+        patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        date_of_birth TEXT,
+        gender TEXT,
+        address TEXT,
+        phone TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE,
+        admission_date TEXT,
+        medical_history TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS doctors (
+        doctor_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        specialization TEXT,
+        phone TEXT UNIQUE,
+        email TEXT,
+        department TEXT,
+        license_number TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS appointments (
+        appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        appointment_date TEXT NOT NULL,
+        appointment_time TEXT NOT NULL,
+        purpose TEXT,
+        status TEXT DEFAULT 'Scheduled',
+        FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
+        FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS medical_records (
+        record_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        record_date TEXT NOT NULL,
+        diagnosis TEXT,
+        treatment TEXT,
+        prescription TEXT,
+        notes TEXT,
+        FOREIGN KEY(patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
+        FOREIGN KEY(doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS billing (
+        bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        appointment_id INTEGER,
+        service_description TEXT NOT NULL,
+        amount REAL NOT NULL,
+        bill_date TEXT NOT NULL,
+        due_date TEXT,
+        status TEXT DEFAULT 'Pending',
+        FOREIGN KEY(patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
+        FOREIGN KEY(appointment_id) REFERENCES appointments(appointment_id) ON DELETE SET NULL
+    )
+    ''',
+]
+
+# Versioned schema changes applied on top of SCHEMA. PRAGMA user_version stores the last
+# version applied, so new changes are appended here and applied ones are never edited.
+# A step is either an SQL string or a callable taking the connection (for backfills).
+MIGRATIONS = [
+    (1, "Indexes for dashboard, report and list lookups", [
+        # Date-ordered appointment lists, monthly dashboard buckets and report date ranges
+        "CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments(appointment_date, appointment_time)",
+        # Per-doctor schedules and workload
+        "CREATE INDEX IF NOT EXISTS idx_appointments_doctor_date ON appointments(doctor_id, appointment_date)",
+        # Today's scheduled count and status-filtered reports
+        "CREATE INDEX IF NOT EXISTS idx_appointments_status_date ON appointments(status, appointment_date)",
+        # Pending bills and monthly paid revenue; amount is included so SUM(amount) never touches the table
+        "CREATE INDEX IF NOT EXISTS idx_billing_status_date ON billing(status, bill_date, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_billing_patient ON billing(patient_id)",
+        "CREATE INDEX IF NOT EXISTS idx_billing_date ON billing(bill_date)",
+        "CREATE INDEX IF NOT EXISTS idx_medical_records_patient_date ON medical_records(patient_id, record_date)",
+        "CREATE INDEX IF NOT EXISTS idx_medical_records_date ON medical_records(record_date)",
+        # ORDER BY name lists and pick lists (the rowid makes these covering for id/name lookups)
+        "CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(name)",
+        "CREATE INDEX IF NOT EXISTS idx_doctors_name ON doctors(name)",
+        # Give the planner statistics for the new indexes without a full-table ANALYZE
+        "PRAGMA analysis_limit = 1000",
+        "ANALYZE",
+    ]),
+    (2, "Trigger-maintained statistics tables for the dashboard", [
+        # --- Summary tables (NULL keys are stored as '' because primary key columns can't be NULL here) ---
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily_appointments (
+            day TEXT NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            appointment_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, doctor_id, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily_billing (
+            day TEXT PRIMARY KEY,
+            billed_amount REAL NOT NULL DEFAULT 0,
+            paid_amount REAL NOT NULL DEFAULT 0,
+            bill_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_billing_status (
+            status TEXT PRIMARY KEY,
+            bill_count INTEGER NOT NULL DEFAULT 0,
+            amount REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_patient_gender (
+            gender TEXT PRIMARY KEY,
+            patient_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_doctor_specialization (
+            specialization TEXT PRIMARY KEY,
+            doctor_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+
+        # --- Backfill from the existing rows ---
+        """
+        INSERT INTO stats_daily_appointments (day, doctor_id, status, appointment_count)
+        SELECT appointment_date, doctor_id, COALESCE(status, ''), COUNT(*)
+        FROM appointments GROUP BY appointment_date, doctor_id, COALESCE(status, '')
+        """,
+        """
+        INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+        SELECT bill_date, SUM(amount), SUM(CASE WHEN status = 'Paid' THEN amount ELSE 0 END), COUNT(*)
+        FROM billing GROUP BY bill_date
+        """,
+        """
+        INSERT INTO stats_billing_status (status, bill_count, amount)
+        SELECT COALESCE(status, ''), COUNT(*), SUM(amount) FROM billing GROUP BY COALESCE(status, '')
+        """,
+        """
+        INSERT INTO stats_patient_gender (gender, patient_count)
+        SELECT COALESCE(gender, ''), COUNT(*) FROM patients GROUP BY COALESCE(gender, '')
+        """,
+        """
+        INSERT INTO stats_doctor_specialization (specialization, doctor_count)
+        SELECT COALESCE(specialization, ''), COUNT(*) FROM doctors GROUP BY COALESCE(specialization, '')
+        """,
+
+        # --- appointments -> stats_daily_appointments ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_insert AFTER INSERT ON appointments
+        BEGIN
+            INSERT INTO stats_daily_appointments (day, doctor_id, status, appointment_count)
+            VALUES (NEW.appointment_date, NEW.doctor_id, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (day, doctor_id, status) DO UPDATE SET appointment_count = appointment_count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_delete AFTER DELETE ON appointments
+        BEGIN
+            UPDATE stats_daily_appointments SET appointment_count = appointment_count - 1
+            WHERE day = OLD.appointment_date AND doctor_id = OLD.doctor_id AND status = COALESCE(OLD.status, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_appointments_update
+        AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+        BEGIN
+            UPDATE stats_daily_appointments SET appointment_count = appointment_count - 1
+            WHERE day = OLD.appointment_date AND doctor_id = OLD.doctor_id AND status = COALESCE(OLD.status, '');
+            INSERT INTO stats_daily_appointments (day, doctor_id, status, appointment_count)
+            VALUES (NEW.appointment_date, NEW.doctor_id, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (day, doctor_id, status) DO UPDATE SET appointment_count = appointment_count + 1;
+        END
+        """,
+
+        # --- billing -> stats_daily_billing and stats_billing_status ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_billing_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+            VALUES (NEW.bill_date, NEW.amount, CASE WHEN NEW.status = 'Paid' THEN NEW.amount ELSE 0 END, 1)
+            ON CONFLICT (day) DO UPDATE SET
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount,
+                bill_count = bill_count + 1;
+            INSERT INTO stats_billing_status (status, bill_count, amount)
+            VALUES (COALESCE(NEW.status, ''), 1, NEW.amount)
+            ON CONFLICT (status) DO UPDATE SET bill_count = bill_count + 1, amount = amount + excluded.amount;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_billing_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE stats_daily_billing SET
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - CASE WHEN OLD.status = 'Paid' THEN OLD.amount ELSE 0 END,
+                bill_count = bill_count - 1
+            WHERE day = OLD.bill_date;
+            UPDATE stats_billing_status SET bill_count = bill_count - 1, amount = amount - OLD.amount
+            WHERE status = COALESCE(OLD.status, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_billing_update
+        AFTER UPDATE OF amount, bill_date, status ON billing
+        BEGIN
+            UPDATE stats_daily_billing SET
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - CASE WHEN OLD.status = 'Paid' THEN OLD.amount ELSE 0 END,
+                bill_count = bill_count - 1
+            WHERE day = OLD.bill_date;
+            INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+            VALUES (NEW.bill_date, NEW.amount, CASE WHEN NEW.status = 'Paid' THEN NEW.amount ELSE 0 END, 1)
+            ON CONFLICT (day) DO UPDATE SET
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount,
+                bill_count = bill_count + 1;
+            UPDATE stats_billing_status SET bill_count = bill_count - 1, amount = amount - OLD.amount
+            WHERE status = COALESCE(OLD.status, '');
+            INSERT INTO stats_billing_status (status, bill_count, amount)
+            VALUES (COALESCE(NEW.status, ''), 1, NEW.amount)
+            ON CONFLICT (status) DO UPDATE SET bill_count = bill_count + 1, amount = amount + excluded.amount;
+        END
+        """,
+
+        # --- patients -> stats_patient_gender ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_patients_insert AFTER INSERT ON patients
+        BEGIN
+            INSERT INTO stats_patient_gender (gender, patient_count) VALUES (COALESCE(NEW.gender, ''), 1)
+            ON CONFLICT (gender) DO UPDATE SET patient_count = patient_count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_patients_delete AFTER DELETE ON patients
+        BEGIN
+            UPDATE stats_patient_gender SET patient_count = patient_count - 1 WHERE gender = COALESCE(OLD.gender, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_patients_update AFTER UPDATE OF gender ON patients
+        BEGIN
+            UPDATE stats_patient_gender SET patient_count = patient_count - 1 WHERE gender = COALESCE(OLD.gender, '');
+            INSERT INTO stats_patient_gender (gender, patient_count) VALUES (COALESCE(NEW.gender, ''), 1)
+            ON CONFLICT (gender) DO UPDATE SET patient_count = patient_count + 1;
+        END
+        """,
+
+        # --- doctors -> stats_doctor_specialization ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_doctors_insert AFTER INSERT ON doctors
+        BEGIN
+            INSERT INTO stats_doctor_specialization (specialization, doctor_count) VALUES (COALESCE(NEW.specialization, ''), 1)
+            ON CONFLICT (specialization) DO UPDATE SET doctor_count = doctor_count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_doctors_delete AFTER DELETE ON doctors
+        BEGIN
+            UPDATE stats_doctor_specialization SET doctor_count = doctor_count - 1
+            WHERE specialization = COALESCE(OLD.specialization, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_doctors_update AFTER UPDATE OF specialization ON doctors
+        BEGIN
+            UPDATE stats_doctor_specialization SET doctor_count = doctor_count - 1
+            WHERE specialization = COALESCE(OLD.specialization, '');
+            INSERT INTO stats_doctor_specialization (specialization, doctor_count) VALUES (COALESCE(NEW.specialization, ''), 1)
+            ON CONFLICT (specialization) DO UPDATE SET doctor_count = doctor_count + 1;
+        END
+        """,
+    ]),
+    (3, "Full-text index for medical record search", [
+        # rowid is the record_id. Patient and doctor names are copied in so one MATCH covers them too;
+        # prefix indexes keep 'hyp*'-style searches from scanning the whole term list.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS medical_records_fts USING fts5(
+            diagnosis, treatment, prescription, notes, patient_name, doctor_name,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        """
+        INSERT INTO medical_records_fts (rowid, diagnosis, treatment, prescription, notes, patient_name, doctor_name)
+        SELECT mr.record_id, mr.diagnosis, mr.treatment, mr.prescription, mr.notes, p.name, d.name
+        FROM medical_records mr
+        LEFT JOIN patients p ON mr.patient_id = p.patient_id
+        LEFT JOIN doctors d ON mr.doctor_id = d.doctor_id
+        """,
+        "INSERT INTO medical_records_fts (medical_records_fts) VALUES ('optimize')",
+
+        # --- medical_records -> medical_records_fts ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fts_medical_records_insert AFTER INSERT ON medical_records
+        BEGIN
+            INSERT INTO medical_records_fts (rowid, diagnosis, treatment, prescription, notes, patient_name, doctor_name)
+            VALUES (NEW.record_id, NEW.diagnosis, NEW.treatment, NEW.prescription, NEW.notes,
+                    (SELECT name FROM patients WHERE patient_id = NEW.patient_id),
+                    (SELECT name FROM doctors WHERE doctor_id = NEW.doctor_id));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fts_medical_records_delete AFTER DELETE ON medical_records
+        BEGIN
+            DELETE FROM medical_records_fts WHERE rowid = OLD.record_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fts_medical_records_update AFTER UPDATE ON medical_records
+        BEGIN
+            DELETE FROM medical_records_fts WHERE rowid = OLD.record_id;
+            INSERT INTO medical_records_fts (rowid, diagnosis, treatment, prescription, notes, patient_name, doctor_name)
+            VALUES (NEW.record_id, NEW.diagnosis, NEW.treatment, NEW.prescription, NEW.notes,
+                    (SELECT name FROM patients WHERE patient_id = NEW.patient_id),
+                    (SELECT name FROM doctors WHERE doctor_id = NEW.doctor_id));
+        END
+        """,
+
+        # --- renamed patients/doctors -> their copies in medical_records_fts ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fts_patients_update AFTER UPDATE OF name ON patients
+        WHEN NEW.name IS NOT OLD.name
+        BEGIN
+            UPDATE medical_records_fts SET patient_name = NEW.name
+            WHERE rowid IN (SELECT record_id FROM medical_records WHERE patient_id = NEW.patient_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fts_doctors_update AFTER UPDATE OF name ON doctors
+        WHEN NEW.name IS NOT OLD.name
+        BEGIN
+            UPDATE medical_records_fts SET doctor_name = NEW.name
+            WHERE rowid IN (SELECT record_id FROM medical_records WHERE doctor_id = NEW.doctor_id);
+        END
+        """,
+    ]),
+    (4, "Trigram lookup index for patient search", [
+        # Every 3-character sequence of name, phone and email is indexed (case-insensitively), so any
+        # substring of 3+ characters -- including a phone number's last digits -- is an index lookup.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS patients_lookup USING fts5(
+            name, phone, email,
+            tokenize = 'trigram'
+        )
+        """,
+        """
+        INSERT INTO patients_lookup (rowid, name, phone, email)
+        SELECT patient_id, name, phone, email FROM patients
+        """,
+        "INSERT INTO patients_lookup (patients_lookup) VALUES ('optimize')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lookup_patients_insert AFTER INSERT ON patients
+        BEGIN
+            INSERT INTO patients_lookup (rowid, name, phone, email) VALUES (NEW.patient_id, NEW.name, NEW.phone, NEW.email);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lookup_patients_delete AFTER DELETE ON patients
+        BEGIN
+            DELETE FROM patients_lookup WHERE rowid = OLD.patient_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_lookup_patients_update AFTER UPDATE OF patient_id, name, phone, email ON patients
+        BEGIN
+            DELETE FROM patients_lookup WHERE rowid = OLD.patient_id;
+            INSERT INTO patients_lookup (rowid, name, phone, email) VALUES (NEW.patient_id, NEW.name, NEW.phone, NEW.email);
+        END
+        """,
+    ]),
+    (5, "Change counters for reference data", [
+        # Bumped by triggers whenever a row that feeds a pick list changes, so a cached list can be
+        # checked with one tiny read instead of being reloaded (see reference_cache.py)
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES ('patients', 0), ('doctors', 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_patients_insert AFTER INSERT ON patients
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'patients';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_patients_delete AFTER DELETE ON patients
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'patients';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_patients_update AFTER UPDATE OF patient_id, name ON patients
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'patients';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_doctors_insert AFTER INSERT ON doctors
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'doctors';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_doctors_delete AFTER DELETE ON doctors
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'doctors';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_doctors_update AFTER UPDATE OF doctor_id, name, specialization ON doctors
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'doctors';
+        END
+        """,
+    ]),
+    (6, "Change counters for appointments and billing", [
+        # Lets the live dashboard tell which of its cards, charts and tables a commit affected
+        "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES ('appointments', 0), ('billing', 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_appointments_insert AFTER INSERT ON appointments
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_appointments_delete AFTER DELETE ON appointments
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_appointments_update AFTER UPDATE ON appointments
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'appointments';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_billing_insert AFTER INSERT ON billing
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'billing';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_billing_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'billing';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_billing_update AFTER UPDATE ON billing
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'billing';
+        END
+        """,
+    ]),
+    (7, "Count every patient and doctor update", [
+        # The report cache keys results by these counters, and the patient and doctor lists show
+        # every column, so an edited phone number or department has to count as a change too
+        "DROP TRIGGER IF EXISTS trg_version_patients_update",
+        """
+        CREATE TRIGGER trg_version_patients_update AFTER UPDATE ON patients
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'patients';
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_version_doctors_update",
+        """
+        CREATE TRIGGER trg_version_doctors_update AFTER UPDATE ON doctors
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'doctors';
+        END
+        """,
+    ]),
+    (8, "Booking and payment dates, and statistics tables for the analytic reports", [
+        # Existing rows keep NULL: when they were booked or paid was never recorded, and the
+        # lead time and settlement reports leave them out rather than guess
+        "ALTER TABLE appointments ADD COLUMN booked_date TEXT",
+        "ALTER TABLE billing ADD COLUMN paid_date TEXT",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_appointments_booked_date AFTER INSERT ON appointments
+        WHEN NEW.booked_date IS NULL
+        BEGIN
+            UPDATE appointments SET booked_date = date('now', 'localtime') WHERE appointment_id = NEW.appointment_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_paid_date_insert AFTER INSERT ON billing
+        WHEN NEW.status = 'Paid' AND NEW.paid_date IS NULL
+        BEGIN
+            UPDATE billing SET paid_date = date('now', 'localtime') WHERE bill_id = NEW.bill_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_paid_date_update AFTER UPDATE OF status ON billing
+        WHEN (NEW.status = 'Paid') IS NOT (OLD.status = 'Paid') AND NEW.paid_date IS OLD.paid_date
+        BEGIN
+            UPDATE billing SET paid_date = CASE WHEN NEW.status = 'Paid' THEN date('now', 'localtime') END
+            WHERE bill_id = NEW.bill_id;
+        END
+        """,
+
+        # --- Summary tables: grouping these small tables replaces sorting every row in the date range ---
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily_service (
+            day TEXT NOT NULL,
+            service_description TEXT NOT NULL,
+            bill_count INTEGER NOT NULL DEFAULT 0,
+            billed_amount REAL NOT NULL DEFAULT 0,
+            paid_amount REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, service_description)
+        ) WITHOUT ROWID
+        """,
+        # Weeks start on Monday: week = date(day, '-6 days', 'weekday 1')
+        """
+        CREATE TABLE IF NOT EXISTS stats_weekly_appointments (
+            week TEXT NOT NULL,
+            doctor_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            appointment_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (week, doctor_id, status)
+        ) WITHOUT ROWID
+        """,
+        # lead_days is capped at 31 ("over 30 days"); total_days keeps the uncapped sum for averages
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily_lead_times (
+            day TEXT NOT NULL,
+            lead_days INTEGER NOT NULL,
+            appointment_count INTEGER NOT NULL DEFAULT 0,
+            total_days REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, lead_days)
+        ) WITHOUT ROWID
+        """,
+        # Bills paid (with a paid_date) by the day they were billed
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily_settlement (
+            day TEXT PRIMARY KEY,
+            paid_bills INTEGER NOT NULL DEFAULT 0,
+            paid_amount REAL NOT NULL DEFAULT 0,
+            total_days REAL NOT NULL DEFAULT 0,
+            within_7_days INTEGER NOT NULL DEFAULT 0,
+            within_30_days INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO stats_weekly_appointments (week, doctor_id, status, appointment_count)
+        SELECT date(day, '-6 days', 'weekday 1'), doctor_id, status, SUM(appointment_count)
+        FROM stats_daily_appointments GROUP BY 1, 2, 3
+        """,
+        # Per-doctor rates over a date range: skip-scan by doctor instead of sorting every day's counts
+        "CREATE INDEX IF NOT EXISTS idx_stats_appointments_doctor ON stats_daily_appointments(doctor_id, day, status, appointment_count)",
+        """
+        INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+        SELECT bill_date, COALESCE(service_description, ''), COUNT(*), SUM(amount),
+               SUM(CASE WHEN status = 'Paid' THEN amount ELSE 0 END)
+        FROM billing GROUP BY bill_date, COALESCE(service_description, '')
+        """,
+
+        # --- appointments -> stats_weekly_appointments ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_weekly_insert AFTER INSERT ON appointments
+        BEGIN
+            INSERT INTO stats_weekly_appointments (week, doctor_id, status, appointment_count)
+            VALUES (date(NEW.appointment_date, '-6 days', 'weekday 1'), NEW.doctor_id, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (week, doctor_id, status) DO UPDATE SET appointment_count = appointment_count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_weekly_delete AFTER DELETE ON appointments
+        BEGIN
+            UPDATE stats_weekly_appointments SET appointment_count = appointment_count - 1
+            WHERE week = date(OLD.appointment_date, '-6 days', 'weekday 1') AND doctor_id = OLD.doctor_id
+              AND status = COALESCE(OLD.status, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_weekly_update
+        AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+        BEGIN
+            UPDATE stats_weekly_appointments SET appointment_count = appointment_count - 1
+            WHERE week = date(OLD.appointment_date, '-6 days', 'weekday 1') AND doctor_id = OLD.doctor_id
+              AND status = COALESCE(OLD.status, '');
+            INSERT INTO stats_weekly_appointments (week, doctor_id, status, appointment_count)
+            VALUES (date(NEW.appointment_date, '-6 days', 'weekday 1'), NEW.doctor_id, COALESCE(NEW.status, ''), 1)
+            ON CONFLICT (week, doctor_id, status) DO UPDATE SET appointment_count = appointment_count + 1;
+        END
+        """,
+
+        # --- billing -> stats_daily_service ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_service_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+            VALUES (NEW.bill_date, COALESCE(NEW.service_description, ''), 1, NEW.amount,
+                    CASE WHEN NEW.status = 'Paid' THEN NEW.amount ELSE 0 END)
+            ON CONFLICT (day, service_description) DO UPDATE SET
+                bill_count = bill_count + 1,
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_service_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE stats_daily_service SET
+                bill_count = bill_count - 1,
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - CASE WHEN OLD.status = 'Paid' THEN OLD.amount ELSE 0 END
+            WHERE day = OLD.bill_date AND service_description = COALESCE(OLD.service_description, '');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_service_update
+        AFTER UPDATE OF amount, bill_date, service_description, status ON billing
+        BEGIN
+            UPDATE stats_daily_service SET
+                bill_count = bill_count - 1,
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - CASE WHEN OLD.status = 'Paid' THEN OLD.amount ELSE 0 END
+            WHERE day = OLD.bill_date AND service_description = COALESCE(OLD.service_description, '');
+            INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+            VALUES (NEW.bill_date, COALESCE(NEW.service_description, ''), 1, NEW.amount,
+                    CASE WHEN NEW.status = 'Paid' THEN NEW.amount ELSE 0 END)
+            ON CONFLICT (day, service_description) DO UPDATE SET
+                bill_count = bill_count + 1,
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount;
+        END
+        """,
+
+        # --- appointments -> stats_daily_lead_times (only appointments with a booked_date) ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_lead_times_insert AFTER INSERT ON appointments
+        WHEN NEW.booked_date IS NOT NULL
+        BEGIN
+            INSERT INTO stats_daily_lead_times (day, lead_days, appointment_count, total_days)
+            VALUES (NEW.appointment_date,
+                    MIN(MAX(CAST(julianday(NEW.appointment_date) - julianday(NEW.booked_date) AS INTEGER), 0), 31),
+                    1, MAX(julianday(NEW.appointment_date) - julianday(NEW.booked_date), 0))
+            ON CONFLICT (day, lead_days) DO UPDATE SET
+                appointment_count = appointment_count + 1, total_days = total_days + excluded.total_days;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_lead_times_delete AFTER DELETE ON appointments
+        WHEN OLD.booked_date IS NOT NULL
+        BEGIN
+            UPDATE stats_daily_lead_times SET
+                appointment_count = appointment_count - 1,
+                total_days = total_days - MAX(julianday(OLD.appointment_date) - julianday(OLD.booked_date), 0)
+            WHERE day = OLD.appointment_date
+              AND lead_days = MIN(MAX(CAST(julianday(OLD.appointment_date) - julianday(OLD.booked_date) AS INTEGER), 0), 31);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_lead_times_update
+        AFTER UPDATE OF appointment_date, booked_date ON appointments
+        BEGIN
+            UPDATE stats_daily_lead_times SET
+                appointment_count = appointment_count - 1,
+                total_days = total_days - MAX(julianday(OLD.appointment_date) - julianday(OLD.booked_date), 0)
+            WHERE OLD.booked_date IS NOT NULL AND day = OLD.appointment_date
+              AND lead_days = MIN(MAX(CAST(julianday(OLD.appointment_date) - julianday(OLD.booked_date) AS INTEGER), 0), 31);
+            INSERT INTO stats_daily_lead_times (day, lead_days, appointment_count, total_days)
+            SELECT NEW.appointment_date,
+                   MIN(MAX(CAST(julianday(NEW.appointment_date) - julianday(NEW.booked_date) AS INTEGER), 0), 31),
+                   1, MAX(julianday(NEW.appointment_date) - julianday(NEW.booked_date), 0)
+            WHERE NEW.booked_date IS NOT NULL
+            ON CONFLICT (day, lead_days) DO UPDATE SET
+                appointment_count = appointment_count + 1, total_days = total_days + excluded.total_days;
+        END
+        """,
+
+        # --- billing -> stats_daily_settlement (only paid bills with a paid_date) ---
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_settlement_insert AFTER INSERT ON billing
+        WHEN NEW.status = 'Paid' AND NEW.paid_date IS NOT NULL
+        BEGIN
+            INSERT INTO stats_daily_settlement (day, paid_bills, paid_amount, total_days, within_7_days, within_30_days)
+            VALUES (NEW.bill_date, 1, NEW.amount, julianday(NEW.paid_date) - julianday(NEW.bill_date), julianday(NEW.paid_date) - julianday(NEW.bill_date) <= 7, julianday(NEW.paid_date) - julianday(NEW.bill_date) <= 30)
+            ON CONFLICT (day) DO UPDATE SET
+                paid_bills = paid_bills + 1,
+                paid_amount = paid_amount + excluded.paid_amount,
+                total_days = total_days + excluded.total_days,
+                within_7_days = within_7_days + excluded.within_7_days,
+                within_30_days = within_30_days + excluded.within_30_days;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_settlement_delete AFTER DELETE ON billing
+        WHEN OLD.status = 'Paid' AND OLD.paid_date IS NOT NULL
+        BEGIN
+            UPDATE stats_daily_settlement SET
+                paid_bills = paid_bills - 1,
+                paid_amount = paid_amount - OLD.amount,
+                total_days = total_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date)),
+                within_7_days = within_7_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date) <= 7),
+                within_30_days = within_30_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date) <= 30)
+            WHERE day = OLD.bill_date;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_stats_settlement_update
+        AFTER UPDATE OF amount, bill_date, status, paid_date ON billing
+        BEGIN
+            UPDATE stats_daily_settlement SET
+                paid_bills = paid_bills - 1,
+                paid_amount = paid_amount - OLD.amount,
+                total_days = total_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date)),
+                within_7_days = within_7_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date) <= 7),
+                within_30_days = within_30_days - (julianday(OLD.paid_date) - julianday(OLD.bill_date) <= 30)
+            WHERE OLD.status = 'Paid' AND OLD.paid_date IS NOT NULL AND day = OLD.bill_date;
+            INSERT INTO stats_daily_settlement (day, paid_bills, paid_amount, total_days, within_7_days, within_30_days)
+            SELECT NEW.bill_date, 1, NEW.amount, julianday(NEW.paid_date) - julianday(NEW.bill_date), julianday(NEW.paid_date) - julianday(NEW.bill_date) <= 7, julianday(NEW.paid_date) - julianday(NEW.bill_date) <= 30
+            WHERE NEW.status = 'Paid' AND NEW.paid_date IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET
+                paid_bills = paid_bills + 1,
+                paid_amount = paid_amount + excluded.paid_amount,
+                total_days = total_days + excluded.total_days,
+                within_7_days = within_7_days + excluded.within_7_days,
+                within_30_days = within_30_days + excluded.within_30_days;
+        END
+        """,
+    ]),
+    (9, "Accounts receivable aging snapshot", [
+        # Unpaid bills only, in patient order: the aging query groups them per patient straight off
+        # this index without reading the table or sorting
+        "CREATE INDEX IF NOT EXISTS idx_billing_outstanding ON billing(patient_id, due_date, amount, status) WHERE status != 'Paid'",
+        # Outstanding amounts per patient and days past due_date, as of the last run (see ar_aging.py)
+        """
+        CREATE TABLE IF NOT EXISTS ar_aging_snapshot (
+            patient_id INTEGER PRIMARY KEY,
+            bill_count INTEGER NOT NULL DEFAULT 0,
+            current_amount REAL NOT NULL DEFAULT 0,
+            days_1_30 REAL NOT NULL DEFAULT 0,
+            days_31_60 REAL NOT NULL DEFAULT 0,
+            days_61_90 REAL NOT NULL DEFAULT 0,
+            days_over_90 REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0
+        )
+        """,
+        # One row of totals per run, kept as a history
+        """
+        CREATE TABLE IF NOT EXISTS ar_aging_runs (
+            snapshot_date TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            patient_count INTEGER NOT NULL DEFAULT 0,
+            current_amount REAL NOT NULL DEFAULT 0,
+            days_1_30 REAL NOT NULL DEFAULT 0,
+            days_31_60 REAL NOT NULL DEFAULT 0,
+            days_61_90 REAL NOT NULL DEFAULT 0,
+            days_over_90 REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        # A run replaces the snapshot and writes its totals row; this counter tells the dashboard
+        # and the report cache that it happened
+        "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES ('ar_aging', 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_ar_aging_insert AFTER INSERT ON ar_aging_runs
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'ar_aging';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_version_ar_aging_update AFTER UPDATE ON ar_aging_runs
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'ar_aging';
+        END
+        """,
+        "PRAGMA analysis_limit = 1000",
+        "ANALYZE billing",
+    ]),
+    (10, "Payments ledger and per-bill balances", [
+        # balance is what is still owed on a bill, kept by the triggers below so it is read, never summed.
+        # What was collected on existing bills was never recorded: paid ones start at 0, the rest at the full amount.
+        "ALTER TABLE billing ADD COLUMN balance REAL",
+        "UPDATE billing SET balance = CASE WHEN status = 'Paid' THEN 0 ELSE amount END",
+        """
+        CREATE TABLE IF NOT EXISTS payments (
+            payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bill_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            payment_date TEXT NOT NULL,
+            method TEXT,
+            reference TEXT,
+            balance_after REAL,           -- The bill's balance once this payment was posted
+            FOREIGN KEY(bill_id) REFERENCES billing(bill_id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_payments_bill ON payments(bill_id, payment_date)",
+        # New bills owe their amount (nothing if entered as already paid); changing the amount moves the balance with it
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_balance_insert AFTER INSERT ON billing
+        WHEN NEW.balance IS NULL
+        BEGIN
+            UPDATE billing SET balance = CASE WHEN NEW.status = 'Paid' THEN 0 ELSE NEW.amount END
+            WHERE bill_id = NEW.bill_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_balance_amount AFTER UPDATE OF amount ON billing
+        WHEN NEW.amount IS NOT OLD.amount AND NEW.balance IS OLD.balance
+        BEGIN
+            UPDATE billing SET balance = ROUND(balance + NEW.amount - OLD.amount, 2) WHERE bill_id = NEW.bill_id;
+        END
+        """,
+        # A payment must be positive and no more than the bill still owes; anything else aborts the
+        # statement (and, in DatabaseManager.write(), the whole batch it is part of)
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_validate BEFORE INSERT ON payments
+        BEGIN
+            SELECT RAISE(ABORT, 'Payment amount must be positive') WHERE NEW.amount <= 0;
+            SELECT RAISE(ABORT, 'Payment exceeds the outstanding balance')
+            WHERE NEW.amount > (SELECT balance FROM billing WHERE bill_id = NEW.bill_id) + 0.005;
+        END
+        """,
+        # Posting takes the payment off the balance, settles the status (and paid_date, on the payment's
+        # own date) and stores the running balance on the ledger row, all in the inserting statement
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_post AFTER INSERT ON payments
+        BEGIN
+            UPDATE billing SET
+                balance = ROUND(balance - NEW.amount, 2),
+                status = CASE WHEN ROUND(balance - NEW.amount, 2) <= 0 THEN 'Paid' ELSE 'Partially Paid' END,
+                paid_date = CASE WHEN ROUND(balance - NEW.amount, 2) <= 0 THEN NEW.payment_date ELSE paid_date END
+            WHERE bill_id = NEW.bill_id;
+            UPDATE payments SET balance_after = (SELECT balance FROM billing WHERE bill_id = NEW.bill_id)
+            WHERE payment_id = NEW.payment_id;
+        END
+        """,
+        # Deleting a payment reverses it
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_reverse AFTER DELETE ON payments
+        BEGIN
+            UPDATE billing SET
+                balance = ROUND(balance + OLD.amount, 2),
+                status = CASE WHEN ROUND(balance + OLD.amount, 2) <= 0 THEN 'Paid'
+                              WHEN ROUND(balance + OLD.amount, 2) < amount THEN 'Partially Paid'
+                              ELSE 'Pending' END
+            WHERE bill_id = OLD.bill_id;
+        END
+        """,
+        # Aging now sums balances rather than whole amounts
+        "DROP INDEX IF EXISTS idx_billing_outstanding",
+        "CREATE INDEX IF NOT EXISTS idx_billing_outstanding ON billing(patient_id, due_date, balance, status) WHERE status != 'Paid'",
+        "PRAGMA analysis_limit = 1000",
+        "ANALYZE billing",
+    ]),
+    (11, "Service prices and the batch billing run", [
+        # Price of each service; completed appointments are billed at the price of their purpose
+        """
+        CREATE TABLE IF NOT EXISTS service_prices (
+            service TEXT PRIMARY KEY COLLATE NOCASE,
+            price REAL NOT NULL CHECK (price > 0)
+        )
+        """,
+        # The billing run's "no bill for this appointment yet" check
+        "CREATE INDEX IF NOT EXISTS idx_billing_appointment ON billing(appointment_id)",
+    ]),
+    (12, "A bill's status follows its balance", [
+        # Only the ledger moves a balance, so a status change that leaves the balance alone must already
+        # agree with it: marking a bill paid with money still owed (or un-paying a settled one) aborts
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_status_guard BEFORE UPDATE OF status ON billing
+        WHEN NEW.status IS NOT OLD.status AND NEW.balance IS OLD.balance
+         AND NEW.status IS NOT CASE WHEN NEW.balance <= 0 THEN 'Paid'
+                                    WHEN NEW.balance < NEW.amount THEN 'Partially Paid'
+                                    ELSE 'Pending' END
+        BEGIN
+            SELECT RAISE(ABORT, 'A bill''s status follows its balance; record a payment instead');
+        END
+        """,
+        # A new amount may not drop below what has been paid, and it settles the status along with the balance
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_billing_amount_guard BEFORE UPDATE OF amount ON billing
+        WHEN NEW.amount IS NOT OLD.amount AND ROUND(OLD.balance + NEW.amount - OLD.amount, 2) < 0
+        BEGIN
+            SELECT RAISE(ABORT, 'Bill amount is less than what has been paid on it');
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_billing_balance_amount",
+        """
+        CREATE TRIGGER trg_billing_balance_amount AFTER UPDATE OF amount ON billing
+        WHEN NEW.amount IS NOT OLD.amount AND NEW.balance IS OLD.balance
+        BEGIN
+            UPDATE billing SET
+                balance = ROUND(balance + NEW.amount - OLD.amount, 2),
+                status = CASE WHEN ROUND(balance + NEW.amount - OLD.amount, 2) <= 0 THEN 'Paid'
+                              WHEN ROUND(balance + NEW.amount - OLD.amount, 2) < NEW.amount THEN 'Partially Paid'
+                              ELSE 'Pending' END
+            WHERE bill_id = NEW.bill_id;
+        END
+        """,
+    ]),
+    (13, "Revenue statistics count what the ledger has collected", [
+        # paid_amount was the whole amount of Paid bills, so partial payments never reached the reports.
+        # It is now amount - balance, the ledger's own figure. A bill's balance is only set by
+        # trg_billing_balance_insert after the row is inserted, so a NULL balance counts as the status implies;
+        # the UPDATE OF balance that follows swaps that estimate for the real figure.
+        "DROP TRIGGER IF EXISTS trg_stats_billing_insert",
+        """
+        CREATE TRIGGER trg_stats_billing_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+            VALUES (NEW.bill_date, NEW.amount,
+                    NEW.amount - COALESCE(NEW.balance, CASE WHEN NEW.status = 'Paid' THEN 0 ELSE NEW.amount END), 1)
+            ON CONFLICT (day) DO UPDATE SET
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount,
+                bill_count = bill_count + 1;
+            INSERT INTO stats_billing_status (status, bill_count, amount)
+            VALUES (COALESCE(NEW.status, ''), 1, NEW.amount)
+            ON CONFLICT (status) DO UPDATE SET bill_count = bill_count + 1, amount = amount + excluded.amount;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_stats_billing_delete",
+        """
+        CREATE TRIGGER trg_stats_billing_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE stats_daily_billing SET
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - (OLD.amount - COALESCE(OLD.balance, CASE WHEN OLD.status = 'Paid' THEN 0 ELSE OLD.amount END)),
+                bill_count = bill_count - 1
+            WHERE day = OLD.bill_date;
+            UPDATE stats_billing_status SET bill_count = bill_count - 1, amount = amount - OLD.amount
+            WHERE status = COALESCE(OLD.status, '');
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_stats_billing_update",
+        """
+        CREATE TRIGGER trg_stats_billing_update
+        AFTER UPDATE OF amount, balance, bill_date, status ON billing
+        BEGIN
+            UPDATE stats_daily_billing SET
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - (OLD.amount - COALESCE(OLD.balance, CASE WHEN OLD.status = 'Paid' THEN 0 ELSE OLD.amount END)),
+                bill_count = bill_count - 1
+            WHERE day = OLD.bill_date;
+            INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+            VALUES (NEW.bill_date, NEW.amount,
+                    NEW.amount - COALESCE(NEW.balance, CASE WHEN NEW.status = 'Paid' THEN 0 ELSE NEW.amount END), 1)
+            ON CONFLICT (day) DO UPDATE SET
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount,
+                bill_count = bill_count + 1;
+            UPDATE stats_billing_status SET bill_count = bill_count - 1, amount = amount - OLD.amount
+            WHERE status = COALESCE(OLD.status, '');
+            INSERT INTO stats_billing_status (status, bill_count, amount)
+            VALUES (COALESCE(NEW.status, ''), 1, NEW.amount)
+            ON CONFLICT (status) DO UPDATE SET bill_count = bill_count + 1, amount = amount + excluded.amount;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_stats_service_insert",
+        """
+        CREATE TRIGGER trg_stats_service_insert AFTER INSERT ON billing
+        BEGIN
+            INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+            VALUES (NEW.bill_date, COALESCE(NEW.service_description, ''), 1, NEW.amount,
+                    NEW.amount - COALESCE(NEW.balance, CASE WHEN NEW.status = 'Paid' THEN 0 ELSE NEW.amount END))
+            ON CONFLICT (day, service_description) DO UPDATE SET
+                bill_count = bill_count + 1,
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_stats_service_delete",
+        """
+        CREATE TRIGGER trg_stats_service_delete AFTER DELETE ON billing
+        BEGIN
+            UPDATE stats_daily_service SET
+                bill_count = bill_count - 1,
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - (OLD.amount - COALESCE(OLD.balance, CASE WHEN OLD.status = 'Paid' THEN 0 ELSE OLD.amount END))
+            WHERE day = OLD.bill_date AND service_description = COALESCE(OLD.service_description, '');
+        END
+        """,
+        "DROP TRIGGER IF EXISTS trg_stats_service_update",
+        """
+        CREATE TRIGGER trg_stats_service_update
+        AFTER UPDATE OF amount, balance, bill_date, service_description, status ON billing
+        BEGIN
+            UPDATE stats_daily_service SET
+                bill_count = bill_count - 1,
+                billed_amount = billed_amount - OLD.amount,
+                paid_amount = paid_amount - (OLD.amount - COALESCE(OLD.balance, CASE WHEN OLD.status = 'Paid' THEN 0 ELSE OLD.amount END))
+            WHERE day = OLD.bill_date AND service_description = COALESCE(OLD.service_description, '');
+            INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+            VALUES (NEW.bill_date, COALESCE(NEW.service_description, ''), 1, NEW.amount,
+                    NEW.amount - COALESCE(NEW.balance, CASE WHEN NEW.status = 'Paid' THEN 0 ELSE NEW.amount END))
+            ON CONFLICT (day, service_description) DO UPDATE SET
+                bill_count = bill_count + 1,
+                billed_amount = billed_amount + excluded.billed_amount,
+                paid_amount = paid_amount + excluded.paid_amount;
+        END
+        """,
+        # Backfill: recount both tables from the bills, so payments already posted are counted
+        "DELETE FROM stats_daily_billing",
+        """
+        INSERT INTO stats_daily_billing (day, billed_amount, paid_amount, bill_count)
+        SELECT bill_date, SUM(amount), ROUND(SUM(amount - balance), 2), COUNT(*)
+        FROM billing GROUP BY bill_date
+        """,
+        "DELETE FROM stats_daily_service",
+        """
+        INSERT INTO stats_daily_service (day, service_description, bill_count, billed_amount, paid_amount)
+        SELECT bill_date, COALESCE(service_description, ''), COUNT(*), SUM(amount), ROUND(SUM(amount - balance), 2)
+        FROM billing GROUP BY bill_date, COALESCE(service_description, '')
+        """,
+    ]),
+]
+
+
+def create_tables(conn):
+    """Creates the base tables if they don't exist."""
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+
+
+def get_schema_version(conn):
+    """Returns the last migration version applied to the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn, migrations=None):
+    """Applies every migration newer than the database's user_version, each in its own transaction."""
+    migrations = MIGRATIONS if migrations is None else migrations
+    current = get_schema_version(conn)
+
+    for version, description, steps in migrations:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            # PRAGMA does not accept bound parameters; version is an int from the list above
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            current = version
+            print(f"Applied migration {version}: {description}")
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    return current
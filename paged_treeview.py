@@ -0,0 +1,210 @@
+# paged_treeview.py
+import sqlite3
+from tkinter import END, messagebox
+
+from query_executor import get_executor
+from settings import get_setting
+
+# Fraction of the scroll range from either end at which the next/previous page is fetched
+SCROLL_THRESHOLD = 0.1
+# Never trim the tree below this many rows, so a small page size cannot leave the view half empty
+MIN_WINDOW_ROWS = 200
+
+
+class PagedTreeview:
+    """Shows a query in a ttk.Treeview one page at a time, fetching more pages with keyset pagination as the user scrolls."""
+
+    def __init__(self, tree, select_sql, key_columns, key_indexes, descending=False,
+                 page_size=None, max_pages=3, scrollbar=None):
+        # select_sql is a SELECT ... FROM ... [JOIN ...] without WHERE/ORDER BY/LIMIT.
+        # key_columns is the unique sort key as SQL expressions (last one a primary key), and
+        # key_indexes gives the position of each key value in the selected row.
+        self.tree = tree
+        self.executor = get_executor(tree.winfo_toplevel())
+        self.select_sql = select_sql
+        self.key_columns = tuple(key_columns)
+        self.key_indexes = tuple(key_indexes)
+        self.descending = descending
+        self.page_size = max(int(page_size or get_setting("display_record_limit")), 1)
+        self.max_rows = max(max_pages * self.page_size, MIN_WINDOW_ROWS)
+        self.scrollbar = scrollbar
+
+        self.filter_sql = None
+        self.filter_params = ()
+        self.at_start = True   # The first row of the result is loaded
+        self.at_end = True     # The last row of the result is loaded
+        self._job = None       # The page query currently running on the executor
+        self._keys = {}
+
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+    def set_filter(self, where=None, params=()):
+        """Restricts the rows to a WHERE condition (without the keyword); None shows everything."""
+        self.filter_sql = where
+        self.filter_params = tuple(params)
+
+    def reload(self, on_done=None, on_error=None):
+        """Clears the tree and loads the first page in the background.
+
+        on_done(row_count) or on_error(exception) is called on the Tk thread once the page arrives.
+        """
+        self._cancel_pending()
+        self.tree.delete(*self.tree.get_children())
+        self._keys = {}
+        self.at_start = self.at_end = True
+
+        def loaded(rows):
+            for row in rows:
+                self._insert(END, row)
+            self.at_end = len(rows) < self.page_size
+            self.tree.yview_moveto(0)
+            if on_done:
+                on_done(len(rows))
+
+        self._fetch(None, True, loaded, on_error, progress=True)
+
+    def show_query(self, sql, params=(), on_done=None, on_error=None):
+        """Replaces the rows with a self-contained, already LIMITed query such as ranked search hits.
+
+        Scrolling fetches nothing more until the next reload().
+        """
+        self._cancel_pending()
+        self.tree.delete(*self.tree.get_children())
+        self._keys = {}
+        self.at_start = self.at_end = True
+
+        def loaded(rows):
+            self.show_rows(rows)
+            if on_done:
+                on_done(len(rows))
+
+        self._submit(sql, params, loaded, on_error, progress=True)
+
+    def show_rows(self, rows):
+        """Replaces the rows with an already fetched list (e.g. from a multi-query lookup); scrolling fetches nothing more."""
+        self._cancel_pending()
+        self.tree.delete(*self.tree.get_children())
+        self._keys = {}
+        self.at_start = self.at_end = True
+        for row in rows:
+            self._insert(END, row)
+        self.tree.yview_moveto(0)
+
+    def _build_query(self, after, forward):
+        conditions = []
+        params = []
+        if self.filter_sql:
+            conditions.append(f"({self.filter_sql})")
+            params.extend(self.filter_params)
+        ascending = forward != self.descending
+        if after is not None:
+            # Row-value comparison lets SQLite seek straight into the index on the sort key
+            columns = ", ".join(self.key_columns)
+            placeholders = ", ".join("?" for _ in self.key_columns)
+            conditions.append(f"({columns}) {'>' if ascending else '<'} ({placeholders})")
+            params.extend(after)
+
+        sql = self.select_sql
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        direction = "ASC" if ascending else "DESC"
+        sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column in self.key_columns)
+        sql += " LIMIT ?"
+        params.append(self.page_size)
+        return sql, params
+
+    def _fetch(self, after, forward, on_rows, on_error, progress=False):
+        sql, params = self._build_query(after, forward)
+        self._submit(sql, params, on_rows, on_error, progress, reverse=not forward)
+
+    def _submit(self, sql, params, on_rows, on_error, progress=False, reverse=False):
+        rows = []
+
+        def done(row_count):
+            self._job = None
+            if reverse:
+                rows.reverse()
+            on_rows(rows)
+
+        def failed(error):
+            self._job = None
+            if on_error:
+                on_error(error)
+            else:
+                print(f"Error loading rows: {error}")
+
+        self._job = self.executor.submit(sql, params, on_chunk=rows.extend, on_done=done, on_error=failed,
+                                         progress_parent=self.tree.master if progress else None, owner=self.tree)
+
+    def _cancel_pending(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def _insert(self, index, row):
+        # Keep the raw key values: Treeview stores values as Tcl strings and hands back ints/strs
+        item = self.tree.insert("", index, values=row)
+        self._keys[item] = tuple(row[i] for i in self.key_indexes)
+
+    def _delete(self, items):
+        self.tree.delete(*items)
+        for item in items:
+            self._keys.pop(item, None)
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._job is not None:
+            return
+        first, last = float(first), float(last)
+        if not self.at_end and last >= 1.0 - SCROLL_THRESHOLD:
+            self._load_page(True)
+        elif not self.at_start and first <= SCROLL_THRESHOLD:
+            self._load_page(False)
+
+    def _load_page(self, forward):
+        """Fetches the page after (or before) the loaded rows in the background."""
+        children = self.tree.get_children()
+        if not children:
+            return
+        edge = children[-1] if forward else children[0]
+        self._fetch(self._keys[edge], forward,
+                    lambda rows: self._add_page(rows, forward), self._page_failed)
+
+    def _add_page(self, rows, forward):
+        """Appends (or prepends) a page and trims the far end so at most max_rows stay in the tree."""
+        children = self.tree.get_children()
+        top_index = int(float(self.tree.yview()[0]) * len(children))
+        anchor = children[min(top_index, len(children) - 1)]
+
+        if forward:
+            for row in rows:
+                self._insert(END, row)
+            self.at_end = len(rows) < self.page_size
+        else:
+            for row in reversed(rows):
+                self._insert(0, row)
+            self.at_start = len(rows) < self.page_size
+
+        children = self.tree.get_children()
+        excess = len(children) - self.max_rows
+        if excess > 0:
+            if forward:
+                self._delete(children[:excess])
+                self.at_start = False
+            else:
+                self._delete(children[-excess:])
+                self.at_end = False
+            children = self.tree.get_children()
+
+        # Keep the row that was at the top of the view where the user left it
+        if anchor in children:
+            self.tree.yview_moveto(children.index(anchor) / len(children))
+
+    def _page_failed(self, error):
+        if isinstance(error, sqlite3.OperationalError):
+            messagebox.showerror("Database Error", f"Error loading more rows: {error}")
+        else:
+            messagebox.showerror("Error", f"An unexpected error occurred while loading more rows: {error}")
+        print(f"Error loading more rows: {error}")
+        self.at_start = self.at_end = True
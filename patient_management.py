@@ -3,12 +3,14 @@ from tkinter import *
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
+from paged_treeview import PagedTreeview
+from incremental_search import IncrementalSearch
+from search_index import PATIENT_LOOKUP_LIMIT, lookup_patients, patient_matches, patient_refinable
 
 class PatientManagement:
-    def __init__(self, master_frame, conn, c): # Accept conn and c from main_menu
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame # This is the content_frame from main_menu
-        self.conn = conn  # Use the connection passed from main_menu
-        self.c = c        # Use the cursor passed from main_menu
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame
         for widget in self.master_frame.winfo_children():
@@ -91,33 +93,45 @@ class PatientManagement:
 
         self.tree.bind('<<TreeviewSelect>>', self.on_patient_select)
 
-        self.current_patient_id = None
+        # Rows are fetched a page at a time in (name, patient_id) order as the list is scrolled
+        self.pager = PagedTreeview(self.tree,
+                                   "SELECT patient_id, name, gender, phone, date_of_birth FROM patients",
+                                   key_columns=("name", "patient_id"), key_indexes=(1, 0), scrollbar=vsb)
 
-        self.load_patients()
+        # Search as the user types: ranked lookup on the trigram index, refined in memory where possible
+        self.incremental = IncrementalSearch(self.search_entry, lookup_patients, patient_matches,
+                                             self.on_search_hits, self.load_patients,
+                                             on_error=self.on_search_error, refinable=patient_refinable,
+                                             progress_parent=self.right_frame, limit=PATIENT_LOOKUP_LIMIT)
+        self.search_entry.bind('<Return>', lambda event: self.search_patient())
 
-    def load_patients(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.current_patient_id = None
 
-        try:
-            self.c.execute("SELECT patient_id, name, gender, phone, date_of_birth FROM patients ORDER BY name ASC")
-            rows = self.c.fetchall()
+        self.load_patients()
 
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
-                self.tree.insert("", END, values=("", "", "No patients found.", "", ""))
-                self.tree.item(self.tree.get_children()[0], tags=('no_data',))
-                self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+    def refresh(self):
+        """Brings the list up to date when the screen is shown again, keeping the current search."""
+        self.incremental.refresh()
 
-        except sqlite3.OperationalError as e:
+    def load_patients(self):
+        self.incremental.reset()
+        self.pager.set_filter(None)
+        self.pager.reload(on_done=self.on_patients_loaded, on_error=self.on_patients_load_error)
+
+    def on_patients_loaded(self, row_count):
+        if not row_count:
+            self.tree.insert("", END, values=("", "", "No patients found.", "", ""))
+            self.tree.item(self.tree.get_children()[0], tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+    def on_patients_load_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error loading patients: {e}\nEnsure 'patients' table exists with correct columns.")
             print(f"Error loading patients: {e}")
             self.tree.insert("", END, values=("", "", "Error loading patients.", "", ""))
             self.tree.item(self.tree.get_children()[0], tags=('error_data',))
             self.tree.tag_configure('error_data', foreground='red', font=('Arial', 10, 'bold'))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred while loading patients: {e}")
             print(f"An unexpected error occurred while loading patients: {e}")
             self.tree.insert("", END, values=("", "", "Unexpected error loading patients.", "", ""))
@@ -130,8 +144,8 @@ class PatientManagement:
             values = self.tree.item(selected_item)['values']
             self.current_patient_id = values[0]
 
-            self.c.execute("SELECT patient_id, name, date_of_birth, gender, address, phone, email, admission_date, medical_history FROM patients WHERE patient_id=?", (self.current_patient_id,))
-            patient_data = self.c.fetchone()
+            with self.db.read() as conn:
+                patient_data = conn.execute("SELECT patient_id, name, date_of_birth, gender, address, phone, email, admission_date, medical_history FROM patients WHERE patient_id=?", (self.current_patient_id,)).fetchone()
 
             if patient_data:
                 self.clear_form()
@@ -166,12 +180,12 @@ class PatientManagement:
                 return
 
         try:
-            self.c.execute('''INSERT INTO patients
-                          (name, date_of_birth, gender, address, phone, email, admission_date, medical_history)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                          (data['name'], data['date_of_birth'], data['gender'], data['address'],
-                           data['phone'], data['email'], datetime.now().strftime("%Y-%m-%d"), data['medical_history']))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''INSERT INTO patients
+                              (name, date_of_birth, gender, address, phone, email, admission_date, medical_history)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                              (data['name'], data['date_of_birth'], data['gender'], data['address'],
+                               data['phone'], data['email'], datetime.now().strftime("%Y-%m-%d"), data['medical_history']))
             messagebox.showinfo("Success", "Patient added successfully.")
             self.load_patients()
             self.clear_form()
@@ -211,15 +225,15 @@ class PatientManagement:
             return
 
         try:
-            self.c.execute('''UPDATE patients SET
-                          name=?, date_of_birth=?, gender=?, address=?, phone=?, email=?, medical_history=?
-                          WHERE patient_id=?''',
-                          (data['name'], data['date_of_birth'], data['gender'], data['address'],
-                           data['phone'], data['email'], data['medical_history'], self.current_patient_id))
-            if self.c.rowcount == 0:
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE patients SET
+                              name=?, date_of_birth=?, gender=?, address=?, phone=?, email=?, medical_history=?
+                              WHERE patient_id=?''',
+                              (data['name'], data['date_of_birth'], data['gender'], data['address'],
+                               data['phone'], data['email'], data['medical_history'], self.current_patient_id)).rowcount
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No patient record was updated. The record might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Success", "Patient updated successfully.")
                 self.load_patients()
                 self.clear_form()
@@ -240,8 +254,8 @@ class PatientManagement:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this patient? This action cannot be undone and will also delete related appointments or records due to cascading deletes."):
             try:
-                self.c.execute("DELETE FROM patients WHERE patient_id=?", (self.current_patient_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM patients WHERE patient_id=?", (self.current_patient_id,))
                 messagebox.showinfo("Success", "Patient deleted successfully.")
                 self.load_patients()
                 self.clear_form()
@@ -250,33 +264,22 @@ class PatientManagement:
                 messagebox.showerror("Error", f"Failed to delete patient: {str(e)}")
 
     def search_patient(self):
-        search_term = self.search_entry.get().strip()
-        if not search_term:
-            self.load_patients()
-            return
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            patient_id_search = int(search_term) # Try to convert to int for ID search
-        except ValueError:
-            patient_id_search = -1 # A value that won't match any ID
-
-        try:
-            self.c.execute("SELECT patient_id, name, gender, phone, date_of_birth FROM patients WHERE name LIKE ? OR phone LIKE ? OR patient_id = ? ORDER BY name ASC",
-                          (f"%{search_term}%", f"%{search_term}%", patient_id_search))
-            rows = self.c.fetchall()
-
-            if rows:
-                for row in rows:
-                    self.tree.insert("", END, values=row)
-            else:
+        # ID, then name/phone/email substrings, then misspelled names
+        self.incremental.search_now()
+
+    def on_search_hits(self, rows, explicit):
+        self.pager.show_rows(rows)
+        if not rows:
+            self.tree.insert("", END, values=("", "", "No matching patients.", "", ""), tags=('no_data',))
+            self.tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+            if explicit:
                 messagebox.showinfo("No Results", "No patients found matching your search criteria.")
-        except sqlite3.OperationalError as e:
+
+    def on_search_error(self, e):
+        if isinstance(e, sqlite3.OperationalError):
             messagebox.showerror("Database Error", f"Error searching patients: {e}")
             print(f"Error searching patients: {e}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"An unexpected error occurred during search: {str(e)}")
             print(f"An unexpected error occurred during search: {str(e)}")
 
@@ -0,0 +1,72 @@
+# payments.py
+import csv
+from datetime import datetime
+
+PAYMENT_METHODS = ("Cash", "M-Pesa", "Card", "Insurance", "Bank Transfer")
+
+POST_PAYMENT_QUERY = '''
+    INSERT INTO payments (bill_id, amount, payment_date, method, reference)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+BILL_PAYMENTS_QUERY = '''
+    SELECT payment_id, payment_date, amount, method, reference, balance_after
+    FROM payments
+    WHERE bill_id = ?
+    ORDER BY payment_date, payment_id
+'''
+
+
+def post_payments(conn, payments):
+    """Posts (bill_id, amount, payment_date, method, reference) rows with one executemany(); returns the row count.
+
+    The ledger triggers (migration 10) take each payment off its bill's balance and settle its
+    status as the row is inserted. A payment that is not positive, or more than its bill still
+    owes, raises sqlite3.IntegrityError; inside DatabaseManager.write() the whole batch is then
+    rolled back, so a batch is posted completely or not at all.
+    """
+    cursor = conn.executemany(POST_PAYMENT_QUERY, payments)
+    return cursor.rowcount
+
+
+def post_payment(conn, bill_id, amount, payment_date=None, method=None, reference=None):
+    """Posts one payment (dated today by default) and returns the bill's balance after it."""
+    payment_date = payment_date or datetime.now().strftime("%Y-%m-%d")
+    post_payments(conn, [(bill_id, amount, payment_date, method, reference)])
+    return bill_balance(conn, bill_id)
+
+
+def bill_balance(conn, bill_id):
+    """Returns what is still owed on a bill (the stored balance, not a sum of the ledger), or None if there is no such bill."""
+    row = conn.execute("SELECT balance FROM billing WHERE bill_id = ?", (bill_id,)).fetchone()
+    return row[0] if row else None
+
+
+def bill_payments(conn, bill_id):
+    """Returns a bill's payments, oldest first, with the running balance after each."""
+    return conn.execute(BILL_PAYMENTS_QUERY, (bill_id,)).fetchall()
+
+
+def read_payments_csv(path):
+    """Reads a batch of payments from a CSV file with bill_id, amount and optional payment_date, method and reference columns.
+
+    Returns rows ready for post_payments(); raises ValueError naming the first line that cannot be used.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    payments = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {"bill_id", "amount"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"The file has no {', '.join(sorted(missing))} column.")
+        for row in reader:
+            try:
+                bill_id = int(row["bill_id"])
+                amount = float(row["amount"])
+                payment_date = (row.get("payment_date") or "").strip() or today
+                datetime.strptime(payment_date, "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise ValueError(f"Line {reader.line_num}: expected a bill ID, an amount and a YYYY-MM-DD date.") from None
+            payments.append((bill_id, amount, payment_date,
+                             (row.get("method") or "").strip() or None, (row.get("reference") or "").strip() or None))
+    return payments
@@ -0,0 +1,122 @@
+# pdf_report.py
+from datetime import datetime
+from itertools import chain, islice
+
+# reportlab is imported in write_report_pdf, so the application starts without it
+
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+FONT_SIZE = 8
+ROW_HEIGHT = 14            # Points per table row; every cell is cut to one line so rows never grow
+MARGIN = 36                # Half an inch all round
+PAGE_HEADER_HEIGHT = 48    # Title and "Generated on" line above each page's table
+WIDTH_SAMPLE_ROWS = 200    # Rows read before the first page to size the columns
+CELL_PADDING = 6           # Left plus right padding of a cell
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _fit(text, width, font, size, string_width):
+    """Cuts text to fit `width` points, ending it with '...' when shortened."""
+    if string_width(text, font, size) <= width:
+        return text
+    low, high = 0, len(text)  # Longest prefix that fits with the ellipsis, by bisection
+    while low < high:
+        middle = (low + high + 1) // 2
+        if string_width(text[:middle] + "...", font, size) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + "..."
+
+
+def column_widths(columns, sample_rows, available_width, string_width):
+    """Sizes the columns once from the headers and a sample of rows, scaled to fill available_width."""
+    widths = [string_width(_text(column), BOLD_FONT, FONT_SIZE) for column in columns]
+    for row in sample_rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], string_width(_text(value), FONT, FONT_SIZE))
+    # No single column may take more than a third of the page, or the rest end up unreadable
+    widths = [min(width + CELL_PADDING, available_width / 3) for width in widths]
+    scale = available_width / sum(widths)
+    return [width * scale for width in widths]
+
+
+def write_report_pdf(path, title, columns, rows, on_page=None):
+    """Writes a report to a PDF one page at a time and returns the number of pages.
+
+    rows may be any iterable (a spool, or a database cursor); only one page of rows is held at a
+    time. Each page gets its own table with the header row repeated, drawn straight onto the canvas.
+    on_page(page_number, row_count), if given, is called after every page.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.platypus import Table, TableStyle
+
+    page_width, page_height = letter
+    available_width = page_width - 2 * MARGIN
+    table_top = page_height - MARGIN - PAGE_HEADER_HEIGHT
+    rows_per_page = int((table_top - MARGIN) // ROW_HEIGHT) - 1  # Less the header row
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    widths = column_widths(columns, sample, available_width, stringWidth)
+    text_widths = [width - CELL_PADDING for width in widths]
+    header = [_fit(_text(column), width, BOLD_FONT, FONT_SIZE, stringWidth) for column, width in zip(columns, text_widths)]
+    rows = chain(sample, rows)
+
+    style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')), # Header background
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), # Header text color
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), BOLD_FONT),
+        ('FONTNAME', (0, 1), (-1, -1), FONT),
+        ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f0f0')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING / 2),
+        ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING / 2),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ])
+
+    canvas = Canvas(path, pagesize=letter)
+    canvas.setTitle(title)
+    page_number = 0
+    row_count = 0
+    while True:
+        page_rows = list(islice(rows, rows_per_page))
+        if not page_rows and page_number:
+            break
+        page_number += 1
+        row_count += len(page_rows)
+
+        canvas.setFont(BOLD_FONT, 16)
+        canvas.drawString(MARGIN, page_height - MARGIN - 16, title)
+        canvas.setFont(FONT, 9)
+        canvas.drawString(MARGIN, page_height - MARGIN - 32, f"Generated on: {generated}")
+        canvas.drawRightString(page_width - MARGIN, page_height - MARGIN - 32, f"Page {page_number}")
+
+        data = [header]
+        for row in page_rows:
+            data.append([_fit(_text(value), width, FONT, FONT_SIZE, stringWidth)
+                         for value, width in zip(row, text_widths)])
+        table = Table(data, colWidths=widths, rowHeights=ROW_HEIGHT)
+        table.setStyle(style)
+        _, table_height = table.wrapOn(canvas, available_width, table_top - MARGIN)
+        table.drawOn(canvas, MARGIN, table_top - table_height)
+        canvas.showPage()
+
+        if on_page:
+            on_page(page_number, row_count)
+        if not page_rows:
+            break # An empty report still gets a page with its title and headers
+    canvas.save()
+    return page_number
@@ -0,0 +1,224 @@
+# query_executor.py
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, CENTER, TclError
+
+from database import get_db
+
+CHUNK_SIZE = 500          # Rows per fetchmany() handed back to the Tk thread
+POLL_INTERVAL_MS = 25     # How often the Tk thread checks for finished chunks
+MAX_CHUNKS_PER_POLL = 4   # Chunks delivered per poll, so a big result cannot stall redraws
+
+
+class ProgressOverlay:
+    """A small 'Loading...' label and progress bar drawn over a frame while a query runs."""
+
+    def __init__(self, parent, text):
+        self.text = text
+        self.frame = ttk.Frame(parent, padding=10, relief='ridge')
+        self.label = ttk.Label(self.frame, text=text, font=('Arial', 10, 'italic'))
+        self.label.pack()
+        self.bar = ttk.Progressbar(self.frame, mode='indeterminate', length=180)
+        self.bar.pack(pady=(5, 0))
+        self.frame.place(relx=0.5, rely=0.5, anchor=CENTER)
+        self.bar.start(15)
+
+    def update(self, row_count):
+        try:
+            self.label.config(text=f"{self.text} {row_count:,} rows")
+        except TclError:
+            pass  # The screen was destroyed underneath us
+
+    def close(self):
+        try:
+            self.bar.stop()
+            self.frame.destroy()
+        except TclError:
+            pass
+
+
+class QueryJob:
+    """A submitted query; cancel() stops it whether it is queued, running or has results waiting."""
+
+    def __init__(self, sql, params, chunk_size, on_chunk, on_done, on_error, func=None, owner=None):
+        self.sql = sql
+        self.params = tuple(params)
+        self.func = func
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.owner = owner  # Widget whose screen the results are for; see QueryExecutor.cancel_owned()
+        self.progress = None
+        self.row_count = 0
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                # Aborts the statement the worker is stepping with an 'interrupted' OperationalError
+                self._conn.interrupt()
+        if self.progress is not None:
+            self.progress.close()
+            self.progress = None
+
+
+class QueryExecutor:
+    """Runs read queries on worker threads with pooled read connections and delivers the rows to the Tk thread."""
+
+    def __init__(self, master, db=None, workers=2, poll_interval=POLL_INTERVAL_MS):
+        self.master = master
+        self.db = db
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self._results = queue.Queue()
+        self._jobs = set()
+        self._poll_id = None
+
+    def submit(self, sql, params=(), on_chunk=None, on_done=None, on_error=None,
+               chunk_size=CHUNK_SIZE, progress_parent=None, progress_text="Loading...", owner=None):
+        """Queues a query. on_chunk(rows) runs per chunk, then on_done(row_count) or on_error(exception), all on the Tk thread.
+
+        owner is the widget the results are delivered into (default: progress_parent).
+        """
+        job = QueryJob(sql, params, chunk_size, on_chunk, on_done, on_error, owner=owner or progress_parent)
+        return self._start(job, progress_parent, progress_text)
+
+    def call(self, func, on_done=None, on_error=None, progress_parent=None, progress_text="Loading...", owner=None):
+        """Queues func(conn) for lookups that need more than one query; on_done(result) runs on the Tk thread."""
+        job = QueryJob(None, (), None, None, on_done, on_error, func=func, owner=owner or progress_parent)
+        return self._start(job, progress_parent, progress_text)
+
+    def _start(self, job, progress_parent, progress_text):
+        if progress_parent is not None:
+            job.progress = ProgressOverlay(progress_parent, progress_text)
+        self._jobs.add(job)
+        self._pool.submit(self._run, job)
+        self._schedule_poll()
+        return job
+
+    def cancel_all(self):
+        """Cancels every queued and running job, e.g. when the application closes."""
+        for job in list(self._jobs):
+            job.cancel()
+
+    def cancel_owned(self, widget):
+        """Cancels the jobs whose owner is widget or inside it, e.g. before a screen's frame is destroyed."""
+        path = str(widget)
+        for job in list(self._jobs):
+            owner = str(job.owner) if job.owner is not None else None
+            if owner is not None and (owner == path or owner.startswith(path + '.')):
+                job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._poll_id is not None:
+            try:
+                self.master.after_cancel(self._poll_id)
+            except TclError:
+                pass
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job):
+        """Worker thread: streams the result of one job into the results queue."""
+        if job.cancelled:
+            self._results.put((job, 'cancelled', None))
+            return
+        try:
+            with (self.db or get_db()).read() as conn:
+                with job._lock:
+                    if job.cancelled:
+                        self._results.put((job, 'cancelled', None))
+                        return
+                    job._conn = conn
+                result = None
+                try:
+                    if job.func is not None:
+                        result = job.func(conn)
+                    else:
+                        cursor = conn.execute(job.sql, job.params)
+                        while not job.cancelled:
+                            rows = cursor.fetchmany(job.chunk_size)
+                            if not rows:
+                                break
+                            self._results.put((job, 'chunk', rows))
+                        cursor.close()
+                finally:
+                    with job._lock:
+                        job._conn = None
+            self._results.put((job, 'cancelled' if job.cancelled else 'done', result))
+        except sqlite3.OperationalError as e:
+            self._results.put((job, 'cancelled' if job.cancelled else 'error', e))
+        except Exception as e:
+            self._results.put((job, 'error', e))
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.master.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """Tk thread: hands finished chunks to their callbacks."""
+        self._poll_id = None
+        for _ in range(MAX_CHUNKS_PER_POLL):
+            try:
+                job, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._dispatch(job, kind, payload)
+        if self._jobs or not self._results.empty():
+            self._schedule_poll()
+
+    def _dispatch(self, job, kind, payload):
+        if kind != 'chunk':
+            self._jobs.discard(job)
+            if job.progress is not None:
+                job.progress.close()
+                job.progress = None
+        if job.cancelled:
+            return
+
+        try:
+            if kind == 'chunk':
+                job.row_count += len(payload)
+                if job.progress is not None:
+                    job.progress.update(job.row_count)
+                if job.on_chunk:
+                    job.on_chunk(payload)
+            elif kind == 'done':
+                if job.on_done:
+                    job.on_done(payload if job.func is not None else job.row_count)
+            elif kind == 'error':
+                if job.on_error:
+                    job.on_error(payload)
+                else:
+                    print(f"Error running background query: {payload}")
+        except Exception as e:
+            # A failing callback must not stop delivery for the other jobs
+            print(f"Error handling background query result: {e}")
+
+
+_executor = None
+
+
+def get_executor(master=None):
+    """Returns the application-wide QueryExecutor; the first call must pass the Tk root."""
+    global _executor
+    if _executor is None:
+        if master is None:
+            raise RuntimeError("The query executor has not been started.")
+        _executor = QueryExecutor(master)
+    return _executor
+
+
+def shutdown_executor():
+    """Cancels outstanding work and stops the application-wide QueryExecutor."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
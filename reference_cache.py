@@ -0,0 +1,84 @@
+# reference_cache.py
+import threading
+
+from database import get_db
+
+# The pick-list rows each reference list is built from, in display order
+REFERENCE_QUERIES = {
+    'patients': "SELECT patient_id, name FROM patients ORDER BY name ASC",
+    'doctors': "SELECT doctor_id, name, specialization FROM doctors ORDER BY name ASC",
+}
+
+
+class ReferenceCache:
+    """Application-wide patient and doctor id/name lists for the pick lists, reloaded only after they change.
+
+    PRAGMA data_version tells cheaply whether anything was committed since the last check; only then
+    is table_versions (migration 5) read to see whether patients or doctors were among the changes.
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self._lock = threading.Lock()
+        self._manager = None     # The DatabaseManager the cached lists came from
+        self._data_version = None
+        self._table_versions = {}
+        self._rows = {}    # table -> rows from REFERENCE_QUERIES
+        self._maps = {}    # (table, label format) -> {"label": id}
+
+    def patient_map(self):
+        """Returns {"<id> - <name>": patient_id} in name order; shared, so callers must not modify it."""
+        return self._map('patients', lambda pid, name: f"{pid} - {name}")
+
+    def doctor_map(self, with_specialization=False):
+        """Returns {"<id> - <name>": doctor_id}, or with " (<specialization>)" appended, in name order."""
+        if with_specialization:
+            return self._map('doctors+spec', lambda did, name, spec: f"{did} - {name} ({spec})")
+        return self._map('doctors', lambda did, name, spec: f"{did} - {name}")
+
+    def _map(self, key, label):
+        table = key.split('+')[0]
+        with self._lock:
+            self._refresh()
+            if key not in self._maps:
+                if table not in self._rows:
+                    with (self.db or get_db()).read() as conn:
+                        self._rows[table] = conn.execute(REFERENCE_QUERIES[table]).fetchall()
+                self._maps[key] = {label(*row): row[0] for row in self._rows[table]}
+            return self._maps[key]
+
+    def _refresh(self):
+        """Drops the lists whose table changed since they were loaded."""
+        db = self.db or get_db()
+        if db is not self._manager:
+            # The database was closed and reopened; its data_version restarts from scratch
+            self._manager = db
+            self._data_version = None
+            self._table_versions = {}
+            self._rows.clear()
+            self._maps.clear()
+        data_version = db.data_version()
+        if data_version == self._data_version:
+            return  # Nothing committed anywhere since the last check
+        with db.read() as conn:
+            versions = dict(conn.execute("SELECT table_name, version FROM table_versions"))
+        for table in REFERENCE_QUERIES:
+            if versions.get(table) != self._table_versions.get(table) or table not in versions:
+                self._rows.pop(table, None)
+                for key in [key for key in self._maps if key.split('+')[0] == table]:
+                    del self._maps[key]
+        self._table_versions = versions
+        self._data_version = data_version
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_reference_cache():
+    """Returns the application-wide ReferenceCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReferenceCache()
+        return _cache
@@ -0,0 +1,126 @@
+# report_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+from report_queries import REPORTS
+from report_spool import ReportSpool
+
+REPORT_CACHE_DIR = "report_cache"
+REPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024   # Least recently used reports are deleted beyond this
+INDEX_FILE = "index.json"
+
+
+def cache_key(db_name, report_type, params, table_versions):
+    """Hashes what a report's rows depend on: the database, the report, its parameters and its tables' counters.
+
+    table_versions (migrations 5-7) are bumped by triggers on every write and, unlike
+    PRAGMA data_version, survive restarts, so a saved report stays valid until its tables change.
+    """
+    identity = {
+        "database": os.path.abspath(db_name),
+        "report": report_type,
+        "params": params or {},
+        "versions": {table: table_versions.get(table) for table in REPORTS[report_type].tables},
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+
+class ReportCache:
+    """Finished report spools kept on disk, so a report regenerated with unchanged data opens instantly.
+
+    The index (key -> file, size, row blocks, last use) is a JSON file next to the spools. Keys
+    include the table counters, so writes invalidate entries simply by never matching them again;
+    those entries age out with the least recently used once the cache outgrows max_bytes.
+    """
+
+    def __init__(self, directory=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+
+    def get(self, key, columns, title):
+        """Returns a ReportSpool reading the cached rows, or None."""
+        with self._lock:
+            entry = self._entries().get(key)
+            if entry is None:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            try:
+                spool = ReportSpool(columns, title, path=path, blocks=entry["blocks"])
+            except OSError:
+                del self._index[key]   # Deleted from under us
+                self._save_index()
+                return None
+            entry["last_used"] = time.time()
+            self._save_index()
+            return spool
+
+    def put(self, key, spool):
+        """Saves a complete spool under `key` (worker thread) and evicts old entries past the size limit."""
+        with self._lock:
+            entries = self._entries()
+            os.makedirs(self.directory, exist_ok=True)
+            file_name = f"{key}.spool"
+            path = os.path.join(self.directory, file_name)
+            blocks = spool.copy_to(path + ".tmp")
+            os.replace(path + ".tmp", path)
+            entries[key] = {"file": file_name, "size": os.path.getsize(path), "blocks": blocks, "last_used": time.time()}
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries()):
+                self._remove(key)
+            self._save_index()
+
+    def _entries(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}   # No cache yet, or an unreadable index: start afresh
+        return self._index
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._index[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._index.pop(key)
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except OSError:
+            pass  # Already gone, or still open on Windows; it no longer counts either way
+
+    def _save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(self._index, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error saving report cache index: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache():
+    """Returns the application-wide ReportCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReportCache()
+        return _cache
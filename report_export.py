@@ -0,0 +1,118 @@
+# report_export.py
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from itertools import islice
+
+from pdf_report import write_report_pdf
+
+# numpy (for .npz) is imported in write_npz, the only place it is used
+
+EXPORT_CHUNK_ROWS = 5000   # Rows converted to column arrays at a time for .npz
+
+# Format name shown in the Reports screen -> file extension
+EXPORT_FORMATS = {
+    "CSV": ".csv",
+    "JSONL": ".jsonl",
+    "NumPy columns (.npz)": ".npz",
+}
+
+
+def column_key(column):
+    """Turns a column heading into a field name, e.g. "Patient Name" -> "patient_name"."""
+    return re.sub(r'[^0-9a-z]+', '_', column.lower()).strip('_')
+
+
+def export_file_name(title, extension, now=None):
+    """e.g. "appointments_report_20250714_093015.csv"."""
+    return f"{column_key(title)}_{(now or datetime.now()):%Y%m%d_%H%M%S}{extension}"
+
+
+def write_csv(path, columns, rows):
+    """Writes a header line and then each row as it is read; returns the number of rows."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_jsonl(path, columns, rows):
+    """Writes one JSON object per line, keyed by column_key(); returns the number of rows."""
+    keys = [column_key(column) for column in columns]
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def _column_array(np, values):
+    # Whole numbers become int64, other numbers float64 (None -> NaN), anything else text (None -> "")
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return np.array(values, dtype=np.int64)
+    if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(["" if v is None else str(v) for v in values], dtype=np.str_)
+
+
+def write_npz(path, columns, rows):
+    """Writes a compressed .npz with one typed array per column, keyed by column_key(); returns the number of rows.
+
+    Rows are read in chunks and turned into column arrays as they come, so no list of row tuples
+    is built. Load with numpy.load(path)["patient_name"].
+    """
+    import numpy as np
+
+    keys = [column_key(column) for column in columns]
+    chunks = [[] for _ in keys]
+    rows = iter(rows)
+    count = 0
+    while True:
+        block = list(islice(rows, EXPORT_CHUNK_ROWS))
+        if not block:
+            break
+        count += len(block)
+        for i, values in enumerate(zip(*block)):
+            chunks[i].append(_column_array(np, values))
+
+    arrays = {}
+    for key, parts in zip(keys, chunks):
+        if not parts:
+            arrays[key] = np.array([], dtype=np.str_)
+        elif len({part.dtype.kind for part in parts}) > 1 and any(part.dtype.kind == 'U' for part in parts):
+            # Numbers in some chunks and text in others: keep the whole column as text
+            arrays[key] = np.concatenate([part.astype(np.str_) for part in parts])
+        else:
+            arrays[key] = np.concatenate(parts)
+    np.savez_compressed(path, **arrays)
+    return count
+
+
+WRITERS = {
+    ".csv": write_csv,
+    ".jsonl": write_jsonl,
+    ".npz": write_npz,
+}
+
+
+def write_report_file(path, title, columns, rows, extension):
+    """Writes rows to `path` in the format for `extension` (including .pdf); returns the number of rows or pages.
+
+    A failed or cancelled write deletes its partial file; a half-written export is worse than none.
+    """
+    try:
+        if extension == ".pdf":
+            return write_report_pdf(path, title, columns, rows)
+        return WRITERS[extension](path, columns, rows)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
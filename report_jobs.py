@@ -0,0 +1,181 @@
+# report_jobs.py
+import itertools
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import get_db
+from report_export import write_report_file
+
+REPORT_WORKERS = 2   # Report files written at the same time; further jobs wait in the queue
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+class ReportJob:
+    """One report file to write; a worker updates the progress fields while the Tk thread reads them."""
+
+    def __init__(self, job_id, title, columns, sql, params, path, extension, builder=None):
+        self.job_id = job_id
+        self.title = title
+        self.columns = tuple(columns)
+        self.sql = sql
+        self.params = tuple(params)
+        self.builder = builder     # Computed reports: function(conn, *params) -> rows, used instead of sql
+        self.path = path
+        self.extension = extension
+        self.status = "Queued"     # Queued, Counting, Running, Done, Failed or Cancelled
+        self.rows_total = None     # From a COUNT(*) before writing, for the progress and ETA
+        self.rows_done = 0
+        self.started = None
+        self.finished = None
+        self.result = None         # Rows written (pages for a PDF)
+        self.error = None
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("Queued", "Counting", "Running")
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None:
+                self._conn.interrupt()  # Stops a COUNT(*) or a step of the report query
+
+    def progress(self):
+        """Fraction of the rows written so far, or None before the count is known."""
+        if self.status == "Done":
+            return 1.0
+        if not self.rows_total:
+            return None
+        return min(self.rows_done / self.rows_total, 1.0)
+
+    def eta_seconds(self):
+        """Estimated seconds left, from the rate so far; None until there is a rate to go on."""
+        if self.status != "Running" or not self.rows_total or not self.rows_done:
+            return None
+        elapsed = time.perf_counter() - self.started
+        return elapsed / self.rows_done * (self.rows_total - self.rows_done)
+
+
+class ReportJobQueue:
+    """Writes report files on worker threads with read-only pooled connections, independently of any screen.
+
+    Jobs keep running when the user leaves the Reports screen; screens read jobs() to show them.
+    """
+
+    def __init__(self, db=None, workers=REPORT_WORKERS):
+        self.db = db
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._ids = itertools.count(1)
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, title, columns, sql, params, path, extension, builder=None):
+        """Queues a report file and returns its ReportJob."""
+        job = ReportJob(next(self._ids), title, columns, sql, params, path, extension, builder)
+        with self._lock:
+            self._jobs.append(job)
+        self._pool.submit(self._run, job)
+        return job
+
+    def jobs(self):
+        """Returns every job still listed, oldest first."""
+        with self._lock:
+            return list(self._jobs)
+
+    def active_count(self):
+        return sum(1 for job in self.jobs() if job.active)
+
+    def clear_finished(self):
+        """Drops finished, failed and cancelled jobs from the list (their files are kept)."""
+        with self._lock:
+            self._jobs = [job for job in self._jobs if job.active]
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _rows(self, job, rows):
+        for row in rows:
+            if job.cancelled:
+                raise ReportCancelled()
+            job.rows_done += 1
+            yield row
+
+    def _run(self, job):
+        """Worker thread: counts the rows, then streams the query into the output file."""
+        try:
+            with (self.db or get_db()).read() as conn:
+                with job._lock:
+                    if job.cancelled:
+                        raise ReportCancelled()
+                    job._conn = conn
+                try:
+                    if job.builder is not None:
+                        job.status = "Counting"
+                        rows = job.builder(conn, *job.params)
+                        job.rows_total = len(rows)
+                        job.started = time.perf_counter()
+                        job.status = "Running"
+                        job.result = write_report_file(job.path, job.title, job.columns,
+                                                       self._rows(job, rows), job.extension)
+                    else:
+                        job.status = "Counting"
+                        job.rows_total = conn.execute(f"SELECT COUNT(*) FROM ({job.sql})", job.params).fetchone()[0]
+                        job.started = time.perf_counter()
+                        job.status = "Running"
+                        cursor = conn.execute(job.sql, job.params)
+                        try:
+                            job.result = write_report_file(job.path, job.title, job.columns,
+                                                           self._rows(job, cursor), job.extension)
+                        finally:
+                            cursor.close()
+                finally:
+                    with job._lock:
+                        job._conn = None
+            job.status = "Done"
+        except ReportCancelled:
+            job.status = "Cancelled"
+        except sqlite3.OperationalError as e:
+            # cancel() interrupting the query surfaces as an OperationalError
+            if job.cancelled:
+                job.status = "Cancelled"
+            else:
+                job.status = "Failed"
+                job.error = e
+                print(f"DB Error writing {job.title} to {job.path}: {e}")
+        except Exception as e:
+            job.status = "Failed"
+            job.error = e
+            print(f"Error writing {job.title} to {job.path}: {e}")
+        job.finished = time.perf_counter()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_report_queue():
+    """Returns the application-wide ReportJobQueue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReportJobQueue()
+        return _queue
+
+
+def shutdown_report_queue():
+    """Cancels running report jobs and stops the application-wide ReportJobQueue."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
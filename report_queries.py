@@ -0,0 +1,242 @@
+# report_queries.py
+from dataclasses import dataclass
+
+
+def _analytics():
+    # analytics imports numpy; the trend reports load it when they first run (on a worker thread)
+    import analytics
+    return analytics
+
+
+@dataclass
+class ReportDefinition:
+    """What a report shows: its columns, the text used when it is empty or fails, and the tables it reads."""
+    title: str
+    columns: tuple
+    description: str    # Used in error messages, e.g. "Error fetching patient report"
+    empty_text: str
+    tables: tuple       # table_versions counters a cached copy depends on
+    builder: object = None   # function(conn, *params) -> rows, for reports computed in Python rather than by one query
+
+
+REPORTS = {
+    "Appointments Report": ReportDefinition(
+        "Appointments Report",
+        ("ID", "Patient Name", "Doctor Name", "Date", "Time", "Purpose", "Status"),
+        "appointments report", "No appointments found for the selected criteria.",
+        ("appointments", "patients", "doctors")),
+    "Patient List": ReportDefinition(
+        "Patient List",
+        ("ID", "Name", "DoB", "Gender", "Phone", "Email", "Address", "Admission Date"),
+        "patient report", "No patients found.", ("patients",)),
+    "Doctor List": ReportDefinition(
+        "Doctor List",
+        ("ID", "Name", "Specialization", "Department", "Phone", "Email", "License No."),
+        "doctor report", "No doctors found.", ("doctors",)),
+    "Billing Summary": ReportDefinition(
+        "Billing Summary",
+        ("Bill ID", "Patient Name", "Service", "Amount", "Bill Date", "Due Date", "Status"),
+        "billing summary", "No billing records found.", ("billing", "patients")),
+    "Receivables Aging": ReportDefinition(
+        "Receivables Aging",
+        ("ID", "Patient Name", "Phone", "Bills", "Current", "1-30 Days", "31-60 Days", "61-90 Days",
+         "Over 90 Days", "Total"),
+        "receivables aging report", "No outstanding bills as of the last aging run.", ("ar_aging", "patients")),
+    # Analytic reports: one grouped query each over the selected date range
+    "Doctor Workload per Week": ReportDefinition(
+        "Doctor Workload per Week",
+        ("Week Of", "Doctor", "Appointments", "Completed", "Cancelled", "Share of Week (%)"),
+        "doctor workload report", "No appointments in the selected dates.",
+        ("appointments", "doctors")),
+    "No-show and Cancellation Rates": ReportDefinition(
+        "No-show and Cancellation Rates",
+        ("Doctor", "Specialization", "Appointments", "Completed", "Cancelled", "No-shows",
+         "Cancellation Rate (%)", "No-show Rate (%)"),
+        "no-show and cancellation report", "No past appointments in the selected dates.",
+        ("appointments", "doctors")),
+    "Revenue by Service": ReportDefinition(
+        "Revenue by Service",
+        ("Service", "Bills", "Billed (Ksh)", "Paid (Ksh)", "Outstanding (Ksh)", "Share of Revenue (%)"),
+        "revenue by service report", "No bills in the selected dates.", ("billing",)),
+    "Appointment Lead Times": ReportDefinition(
+        "Appointment Lead Times",
+        ("Lead Time", "Appointments", "Share (%)", "Cumulative (%)", "Average Days"),
+        "appointment lead time report", "No appointments with a booking date in the selected dates.",
+        ("appointments",)),
+    "Bill Settlement Times": ReportDefinition(
+        "Bill Settlement Times",
+        ("Month", "Paid Bills", "Paid (Ksh)", "Average Days", "Within 7 Days (%)", "Within 30 Days (%)"),
+        "bill settlement report", "No bills with a payment date in the selected dates.", ("billing",)),
+    # Computed with NumPy from the daily summary tables (see analytics.py)
+    "Revenue Trends": ReportDefinition(
+        "Revenue Trends",
+        ("Month", "Billed (Ksh)", "Paid (Ksh)", "3-Month Average (Ksh)", "Change on Last Year (%)",
+         "Median Day (Ksh)", "90th Percentile Day (Ksh)"),
+        "revenue trends report", "No bills in the selected dates.", ("billing",),
+        builder=lambda conn, start_date, end_date: _analytics().revenue_trend_rows(conn, start_date, end_date)),
+    "Appointment Trends": ReportDefinition(
+        "Appointment Trends",
+        ("Month", "Appointments", "Completed", "Cancelled", "Cancellation Rate (%)", "3-Month Average",
+         "Change on Last Year (%)", "Busiest Day"),
+        "appointment trends report", "No appointments in the selected dates.", ("appointments",),
+        builder=lambda conn, start_date, end_date: _analytics().appointment_trend_rows(conn, start_date, end_date)),
+}
+
+ANALYTIC_REPORTS = ("Doctor Workload per Week", "No-show and Cancellation Rates", "Revenue by Service",
+                    "Appointment Lead Times", "Bill Settlement Times", "Revenue Trends", "Appointment Trends")
+
+APPOINTMENTS_REPORT_QUERY = '''
+    SELECT a.appointment_id, p.name, d.name, a.appointment_date, a.appointment_time, a.purpose, a.status
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.patient_id
+    JOIN doctors d ON a.doctor_id = d.doctor_id
+    WHERE a.appointment_date BETWEEN ? AND ?
+'''
+
+PATIENTS_REPORT_QUERY = "SELECT patient_id, name, date_of_birth, gender, phone, email, address, admission_date FROM patients ORDER BY name ASC"
+
+DOCTORS_REPORT_QUERY = "SELECT doctor_id, name, specialization, department, phone, email, license_number FROM doctors ORDER BY name ASC"
+
+BILLING_REPORT_QUERY = '''
+    SELECT b.bill_id, p.name, b.service_description, b.amount, b.bill_date, b.due_date, b.status
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    ORDER BY b.bill_date DESC
+'''
+
+# Reads the snapshot built once a day by ar_aging.py, not the billing table
+RECEIVABLES_AGING_REPORT_QUERY = '''
+    SELECT p.patient_id, p.name, p.phone, s.bill_count,
+           ROUND(s.current_amount, 2), ROUND(s.days_1_30, 2), ROUND(s.days_31_60, 2),
+           ROUND(s.days_61_90, 2), ROUND(s.days_over_90, 2), ROUND(s.total, 2)
+    FROM ar_aging_snapshot s
+    JOIN patients p ON p.patient_id = s.patient_id
+    ORDER BY s.days_over_90 DESC, s.days_61_90 DESC, s.total DESC
+'''
+
+# Workload reads stats_weekly_appointments (migration 8): weeks start on Monday, and a week that
+# overlaps the date range is counted in full.
+WORKLOAD_REPORT_QUERY = '''
+    SELECT w.week, d.name,
+           SUM(w.appointment_count) AS appointments,
+           SUM(CASE WHEN w.status = 'Completed' THEN w.appointment_count ELSE 0 END),
+           SUM(CASE WHEN w.status = 'Cancelled' THEN w.appointment_count ELSE 0 END),
+           ROUND(100.0 * SUM(w.appointment_count) / SUM(SUM(w.appointment_count)) OVER (PARTITION BY w.week), 1)
+    FROM stats_weekly_appointments w
+    JOIN doctors d ON d.doctor_id = w.doctor_id
+    WHERE w.week BETWEEN date(?, '-6 days', 'weekday 1') AND ? AND w.appointment_count > 0
+    GROUP BY w.week, w.doctor_id
+    ORDER BY w.week, appointments DESC, d.name
+'''
+
+# No-show rates read stats_daily_appointments (migration 2), one count per day, doctor and status.
+# A no-show is an appointment still 'Scheduled' after its day has passed. Rates are out of the
+# appointments that are due: scheduled ones from today on have not had the chance to happen yet.
+NO_SHOW_REPORT_QUERY = '''
+    WITH per_doctor AS (
+        SELECT s.doctor_id,
+               SUM(CASE WHEN s.status != 'Scheduled' OR s.day < ?3 THEN s.appointment_count ELSE 0 END) AS due,
+               SUM(CASE WHEN s.status = 'Completed' THEN s.appointment_count ELSE 0 END) AS completed,
+               SUM(CASE WHEN s.status = 'Cancelled' THEN s.appointment_count ELSE 0 END) AS cancelled,
+               SUM(CASE WHEN s.status = 'Scheduled' AND s.day < ?3 THEN s.appointment_count ELSE 0 END) AS no_shows
+        FROM stats_daily_appointments s
+        WHERE s.day BETWEEN ?1 AND ?2
+        GROUP BY s.doctor_id
+    )
+    SELECT d.name, d.specialization, pd.due, pd.completed, pd.cancelled, pd.no_shows,
+           ROUND(100.0 * pd.cancelled / pd.due, 1), ROUND(100.0 * pd.no_shows / pd.due, 1)
+    FROM per_doctor pd
+    JOIN doctors d ON d.doctor_id = pd.doctor_id
+    WHERE pd.due > 0
+    ORDER BY 1.0 * (pd.cancelled + pd.no_shows) / pd.due DESC, d.name
+'''
+
+# The other three read the summary tables from migration 8, at most a few dozen rows per day
+REVENUE_REPORT_QUERY = '''
+    SELECT service_description, SUM(bill_count),
+           ROUND(SUM(billed_amount), 2),
+           ROUND(SUM(paid_amount), 2),
+           ROUND(SUM(billed_amount) - SUM(paid_amount), 2),
+           ROUND(100.0 * SUM(billed_amount) / SUM(SUM(billed_amount)) OVER (), 1)
+    FROM stats_daily_service
+    WHERE day BETWEEN ? AND ? AND bill_count > 0
+    GROUP BY service_description
+    ORDER BY SUM(billed_amount) DESC
+'''
+
+# Days from booking to the appointment, in buckets; appointments booked before booked_date was
+# recorded are not counted. lead_days is capped at 31, which is the "Over 30 days" bucket.
+LEAD_TIME_REPORT_QUERY = '''
+    WITH bucketed AS (
+        SELECT CASE WHEN lead_days = 0 THEN 0 WHEN lead_days <= 2 THEN 1 WHEN lead_days <= 7 THEN 2
+                    WHEN lead_days <= 14 THEN 3 WHEN lead_days <= 30 THEN 4 ELSE 5 END AS bucket,
+               appointment_count, total_days
+        FROM stats_daily_lead_times
+        WHERE day BETWEEN ? AND ? AND appointment_count > 0
+    )
+    SELECT CASE bucket WHEN 0 THEN 'Same day' WHEN 1 THEN '1-2 days' WHEN 2 THEN '3-7 days'
+                       WHEN 3 THEN '8-14 days' WHEN 4 THEN '15-30 days' ELSE 'Over 30 days' END,
+           SUM(appointment_count),
+           ROUND(100.0 * SUM(appointment_count) / SUM(SUM(appointment_count)) OVER (), 1),
+           ROUND(100.0 * SUM(SUM(appointment_count)) OVER (ORDER BY bucket) / SUM(SUM(appointment_count)) OVER (), 1),
+           ROUND(SUM(total_days) / SUM(appointment_count), 1)
+    FROM bucketed
+    GROUP BY bucket
+    ORDER BY bucket
+'''
+
+# Days from bill to payment by month billed, for bills paid since paid_date was recorded
+SETTLEMENT_REPORT_QUERY = '''
+    SELECT substr(day, 1, 7) AS month, SUM(paid_bills), ROUND(SUM(paid_amount), 2),
+           ROUND(SUM(total_days) / SUM(paid_bills), 1),
+           ROUND(100.0 * SUM(within_7_days) / SUM(paid_bills), 1),
+           ROUND(100.0 * SUM(within_30_days) / SUM(paid_bills), 1)
+    FROM stats_daily_settlement
+    WHERE day BETWEEN ? AND ? AND paid_bills > 0
+    GROUP BY month
+    ORDER BY month
+'''
+
+ANALYTIC_REPORT_QUERIES = {
+    "Doctor Workload per Week": WORKLOAD_REPORT_QUERY,
+    "Revenue by Service": REVENUE_REPORT_QUERY,
+    "Appointment Lead Times": LEAD_TIME_REPORT_QUERY,
+    "Bill Settlement Times": SETTLEMENT_REPORT_QUERY,
+}
+
+
+def report_query(report_type, start_date=None, end_date=None, status="All", today=None):
+    """Returns (sql, params) for a report.
+
+    The appointments and analytic reports take the date range; status applies to the appointments
+    report and today (YYYY-MM-DD) to the no-show report. Reports with a builder have no SQL: their
+    sql is None and the params are passed to the builder.
+    """
+    if report_type == "Appointments Report":
+        query = APPOINTMENTS_REPORT_QUERY
+        params = [start_date, end_date]
+        if status != "All":
+            query += " AND a.status = ?"
+            params.append(status)
+        query += " ORDER BY a.appointment_date ASC, a.appointment_time ASC"
+        return query, tuple(params)
+    if report_type == "Patient List":
+        return PATIENTS_REPORT_QUERY, ()
+    if report_type == "Doctor List":
+        return DOCTORS_REPORT_QUERY, ()
+    if report_type == "Billing Summary":
+        return BILLING_REPORT_QUERY, ()
+    if report_type == "Receivables Aging":
+        return RECEIVABLES_AGING_REPORT_QUERY, ()
+    if report_type == "No-show and Cancellation Rates":
+        return NO_SHOW_REPORT_QUERY, (start_date, end_date, today)
+    if REPORTS.get(report_type) is not None and REPORTS[report_type].builder is not None:
+        return None, (start_date, end_date)
+    if report_type in ANALYTIC_REPORT_QUERIES:
+        return ANALYTIC_REPORT_QUERIES[report_type], (start_date, end_date)
+    raise ValueError(f"Unknown report type: {report_type}")
+
+
+def first_page_query(sql, params, page_rows):
+    """Returns (sql, params) reading only the first page_rows rows of a report query."""
+    return f"{sql} LIMIT ?", tuple(params) + (page_rows,)
@@ -0,0 +1,82 @@
+# report_spool.py
+import pickle
+import shutil
+import tempfile
+import threading
+
+SPOOL_CHUNK_ROWS = 500   # Rows per fetchmany() and per pickled block in the spool file
+
+
+class ReportSpool:
+    """The rows of a generated report, written to a temporary file in blocks as they are fetched.
+
+    Only the offset of each block is kept in memory, so a report of any size costs about one
+    block of memory to generate, page through or export.
+    """
+
+    def __init__(self, columns, title, path=None, blocks=None):
+        # With a path, reads a complete spool saved earlier by copy_to() (see report_cache.py)
+        self.columns = tuple(columns)
+        self.title = title
+        self._blocks = [tuple(block) for block in blocks or ()]   # (file offset, index of the block's first row, row count)
+        self.row_count = sum(block[2] for block in self._blocks)
+        self.complete = path is not None   # Set once the query has been read to the end
+        self._file = open(path, 'rb') if path is not None else tempfile.TemporaryFile(prefix="hms_report_")
+        self._lock = threading.Lock()
+
+    def write(self, rows):
+        """Appends a block of rows (worker thread)."""
+        with self._lock:
+            self._file.seek(0, 2)
+            self._blocks.append((self._file.tell(), self.row_count, len(rows)))
+            pickle.dump([tuple(row) for row in rows], self._file, pickle.HIGHEST_PROTOCOL)
+            self.row_count += len(rows)
+
+    def _read_block(self, index):
+        with self._lock:
+            self._file.seek(self._blocks[index][0])
+            return pickle.load(self._file)
+
+    def rows(self):
+        """Yields every spooled row in order, reading one block at a time."""
+        for index in range(len(self._blocks)):
+            yield from self._read_block(index)
+
+    def read_rows(self, start, count):
+        """Returns up to `count` rows starting at row index `start`."""
+        result = []
+        for index, (_, first, block_rows) in enumerate(self._blocks):
+            if first + block_rows <= start:
+                continue
+            if first >= start + count:
+                break
+            block = self._read_block(index)
+            result.extend(block[max(start - first, 0):start + count - first])
+        return result
+
+    def copy_to(self, path):
+        """Saves the spooled rows to `path` and returns the block index a ReportSpool needs to read them back."""
+        with self._lock:
+            self._file.seek(0)
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(self._file, f)
+            return list(self._blocks)
+
+    def close(self):
+        """Deletes the temporary file (or closes a saved one)."""
+        with self._lock:
+            self._file.close()
+            self._blocks = []
+
+
+def spool_query(conn, sql, params, spool, chunk_size=SPOOL_CHUNK_ROWS):
+    """Streams a query into a spool with fetchmany() and returns the number of rows (worker thread)."""
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        spool.write(rows)
+    cursor.close()
+    spool.complete = True
+    return spool.row_count
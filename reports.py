@@ -1,26 +1,76 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Frame, Label, Button, Scrollbar, VERTICAL, CENTER, RIGHT, Y, BOTH, END, LEFT, X
 from tkinter import filedialog # Import filedialog for saving file
+import os
+import shutil
 import sqlite3
 from datetime import datetime
 
-# Import for PDF generation
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.lib.units import inch # For setting widths if needed
+from database import get_db
+from query_executor import get_executor
+from report_cache import cache_key, get_report_cache
+from report_export import EXPORT_FORMATS, export_file_name
+from report_jobs import get_report_queue
+from report_queries import ANALYTIC_REPORTS, REPORTS, report_query, first_page_query
+from report_spool import ReportSpool, spool_query
+from settings import get_setting
+
+REPORT_PAGE_ROWS = 500 # Rows shown at a time; the whole report is kept in a temporary spool file
+JOB_LIST_REFRESH_MS = 500 # How often the Report Jobs list redraws progress while the screen exists
+
+
+def spool_and_cache(conn, sql, params, spool, key):
+    """Worker thread: streams a report into its spool, then saves the spool in the report cache."""
+    row_count = spool_query(conn, sql, params, spool)
+    if key is not None:
+        try:
+            get_report_cache().put(key, spool)
+        except (OSError, ValueError) as e:
+            # The report itself is fine; it just has to be generated again next time
+            print(f"Error caching {spool.title}: {e}")
+    return row_count
+
+
+def build_and_cache(conn, builder, params, spool, key):
+    """Worker thread: writes a computed report's rows into its spool, then saves the spool in the report cache."""
+    rows = builder(conn, *params)
+    for start in range(0, len(rows), REPORT_PAGE_ROWS):
+        spool.write(rows[start:start + REPORT_PAGE_ROWS])
+    spool.complete = True
+    if key is not None:
+        try:
+            get_report_cache().put(key, spool)
+        except (OSError, ValueError) as e:
+            print(f"Error caching {spool.title}: {e}")
+    return spool.row_count
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
 
 class Reports:
-    def __init__(self, master_frame, conn, c):
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
-        # Store the currently displayed report data and columns for PDF generation
-        self.current_report_data = []
+        # The generated report's rows live in a spool file (for paging and PDF generation), not in memory
+        self.report_spool = None
         self.current_report_columns = []
         self.current_report_title = ""
+        self.report_job = None # Background query for the first page of the report being generated
+        self.spool_job = None # Background query writing the whole report to the spool
+        self.job_list_id = None # Pending after() redraw of the Report Jobs list
+        self.report_tree = None
+        self.page_index = 0
+        self.report_from_cache = False
+        self.current_report_query = None
+        self.current_report_builder = None
 
         # Clear any existing widgets in the parent frame
         for widget in self.master_frame.winfo_children():
@@ -28,6 +78,9 @@ class Reports:
 
         self.create_reports_ui()
 
+    def refresh(self):
+        """Nothing to reload: a generated report shows the data as of when it was run, until it is generated again."""
+
     def create_reports_ui(self):
         self.main_frame = Frame(self.master_frame, bg='#f8f8f8')
         self.main_frame.pack(fill=BOTH, expand=True, padx=15, pady=15)
@@ -44,12 +97,13 @@ class Reports:
         ttk.Label(self.control_frame, text="Select Report Type:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
         self.report_type_var = tk.StringVar()
         self.report_type_combo = ttk.Combobox(self.control_frame, textvariable=self.report_type_var,
-                                              values=["Appointments Report", "Patient List", "Doctor List", "Billing Summary"])
+                                              values=["Appointments Report", "Patient List", "Doctor List", "Billing Summary",
+                                                      "Receivables Aging", *ANALYTIC_REPORTS])
         self.report_type_combo.grid(row=0, column=1, padx=5, pady=5, sticky='ew')
         self.report_type_combo.set("Appointments Report") # Default selection
         self.report_type_combo.bind("<<ComboboxSelected>>", self.on_report_type_change)
 
-        # Filters for Appointments Report (initially visible)
+        # Date filters for the Appointments Report and the analytic reports (initially visible)
         self.appointment_filters_frame = ttk.Frame(self.control_frame)
         self.appointment_filters_frame.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky='ew')
         self.create_appointment_filters(self.appointment_filters_frame)
@@ -64,6 +118,26 @@ class Reports:
         self.download_pdf_button.pack(side=LEFT, padx=5)
         # --- End of Download PDF button ---
 
+        # Bulk exports re-run the report query and stream it straight to a file
+        self.export_format_var = tk.StringVar(value="CSV")
+        self.export_format_combo = ttk.Combobox(button_frame, textvariable=self.export_format_var, values=list(EXPORT_FORMATS),
+                                                state="readonly", width=20)
+        self.export_format_combo.pack(side=LEFT, padx=(15, 5))
+        self.export_button = ttk.Button(button_frame, text="Export...", command=self.export_report, state=tk.DISABLED)
+        self.export_button.pack(side=LEFT, padx=5)
+
+        # Report Jobs list at the bottom, then the page bar; packed first so the report cannot squeeze them out
+        self.create_jobs_panel()
+
+        self.page_frame = ttk.Frame(self.main_frame)
+        self.page_frame.pack(side=tk.BOTTOM, fill=X, padx=10)
+        self.page_label = ttk.Label(self.page_frame, text="")
+        self.page_label.pack(side=LEFT, padx=5)
+        self.next_page_button = ttk.Button(self.page_frame, text="Next Page", command=lambda: self.show_page(self.page_index + 1), state=tk.DISABLED)
+        self.next_page_button.pack(side=RIGHT, padx=5)
+        self.prev_page_button = ttk.Button(self.page_frame, text="Previous Page", command=lambda: self.show_page(self.page_index - 1), state=tk.DISABLED)
+        self.prev_page_button.pack(side=RIGHT, padx=5)
+
         # Display Frame for Reports
         self.report_display_frame = ttk.Frame(self.main_frame, relief=tk.GROOVE, borderwidth=1)
         self.report_display_frame.pack(fill=BOTH, expand=True, padx=10, pady=10)
@@ -85,7 +159,8 @@ class Reports:
         self.end_date_entry.insert(0, datetime.now().strftime("%Y-%m-%d")) # Default to today
 
         # Status
-        ttk.Label(parent_frame, text="Status:").grid(row=2, column=0, padx=5, pady=2, sticky='w')
+        self.status_label = ttk.Label(parent_frame, text="Status:")
+        self.status_label.grid(row=2, column=0, padx=5, pady=2, sticky='w')
         self.status_var = tk.StringVar()
         self.status_combo = ttk.Combobox(parent_frame, textvariable=self.status_var,
                                          values=["All", "Scheduled", "Completed", "Cancelled"])
@@ -97,70 +172,226 @@ class Reports:
     def on_report_type_change(self, event=None):
         # Hide/show filter frames based on selection
         selected_type = self.report_type_var.get()
-        if selected_type == "Appointments Report":
+        if selected_type == "Appointments Report" or selected_type in ANALYTIC_REPORTS:
             self.appointment_filters_frame.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky='ew')
+            # Status only filters the Appointments Report
+            if selected_type == "Appointments Report":
+                self.status_label.grid()
+                self.status_combo.grid()
+            else:
+                self.status_label.grid_remove()
+                self.status_combo.grid_remove()
         else:
             self.appointment_filters_frame.grid_forget() # Hide filters
 
         # Clear display area when report type changes
+        self.cancel_report()
         self.clear_report_display()
-        # Disable PDF button when report type changes (until new report is generated)
-        self.download_pdf_button.config(state=tk.DISABLED)
+        # Disable PDF and export buttons when report type changes (until new report is generated)
+        self.set_download_state(tk.DISABLED)
 
     def generate_selected_report(self):
+        # A report still running from the previous click is abandoned
+        self.cancel_report()
         self.clear_report_display()
         report_type = self.report_type_var.get()
 
         # Clear previous report data
-        self.current_report_data = []
         self.current_report_columns = []
         self.current_report_title = ""
-        self.download_pdf_button.config(state=tk.DISABLED) # Disable until data is loaded
-
+        self.current_report_query = None
+        self.current_report_builder = None
+        self.set_download_state(tk.DISABLED) # Disable until data is loaded
+
+        definition = REPORTS.get(report_type)
+        if definition is not None:
+            self.current_report_title = definition.title
+            self.current_report_columns = definition.columns
         if report_type == "Appointments Report":
-            self.current_report_title = "Appointments Report"
-            self.current_report_columns = ("ID", "Patient Name", "Doctor Name", "Date", "Time", "Purpose", "Status")
             self.load_appointments_report()
         elif report_type == "Patient List":
-            self.current_report_title = "Patient List"
-            self.current_report_columns = ("ID", "Name", "DoB", "Gender", "Phone", "Email", "Address", "Admission Date")
             self.load_patients_report()
         elif report_type == "Doctor List":
-            self.current_report_title = "Doctor List"
-            self.current_report_columns = ("ID", "Name", "Specialization", "Department", "Phone", "Email", "License No.")
             self.load_doctors_report()
         elif report_type == "Billing Summary":
-            self.current_report_title = "Billing Summary"
-            self.current_report_columns = ("Bill ID", "Patient Name", "Service", "Amount", "Bill Date", "Due Date", "Status")
             self.load_billing_summary()
+        elif report_type == "Receivables Aging":
+            self.load_receivables_aging()
+        elif report_type in ANALYTIC_REPORTS:
+            self.load_analytic_report(report_type)
         else:
             ttk.Label(self.report_display_frame, text="Please select a report type.", font=('Arial', 14)).pack(pady=50)
 
-        # Enable PDF button if data was successfully loaded
-        if self.current_report_data:
-            self.download_pdf_button.config(state=tk.NORMAL)
+        # The PDF button is enabled by run_report_query once the whole report is spooled
+
 
+    def set_download_state(self, state):
+        self.download_pdf_button.config(state=state)
+        self.export_button.config(state=state)
+
+    def cancel_report(self):
+        """Stops the queries of the current report and deletes its spool file."""
+        for job in (self.report_job, self.spool_job):
+            if job is not None:
+                job.cancel()
+        self.report_job = self.spool_job = None
+        if self.report_spool is not None:
+            self.report_spool.close()
+            self.report_spool = None
 
     def clear_report_display(self):
         for widget in self.report_display_frame.winfo_children():
             widget.destroy()
+        self.report_tree = None
+        self.page_index = 0
+        self.report_from_cache = False
+        self.page_label.config(text="")
+        self.prev_page_button.config(state=tk.DISABLED)
+        self.next_page_button.config(state=tk.DISABLED)
+
+    def run_report_query(self, tree, report_type, params=None):
+        """Shows the first page of a report at once and streams the whole result into a spool file.
+
+        Two background jobs run: a LIMITed query for the first page, and one that reads the full
+        result with fetchmany() straight into the spool, so memory stays flat whatever the date range.
+        A report whose tables have not changed since it was last generated opens from the report cache.
+        """
+        definition = REPORTS[report_type]
+        params = params or {}
+        query, query_params = report_query(report_type, **params)
+        empty_values = [""] * len(definition.columns)
+        empty_values[2] = definition.empty_text
+        self.current_report_query = (query, query_params)
+        self.current_report_builder = definition.builder
+        self.report_tree = tree
+
+        key = None
+        try:
+            db = get_db()
+            with db.read() as conn:
+                versions = dict(conn.execute("SELECT table_name, version FROM table_versions"))
+            key = cache_key(db.db_name, report_type, params, versions)
+            cached = get_report_cache().get(key, definition.columns, definition.title)
+        except sqlite3.Error as e:
+            print(f"Error checking the report cache: {e}")
+            cached = None
+        self.report_from_cache = cached is not None
+        if cached is not None:
+            self.report_spool = cached
+            if cached.row_count:
+                self.show_page(0)
+                self.set_download_state(tk.NORMAL)
+            else:
+                self.show_empty(tree, empty_values)
+            return
 
-    def load_appointments_report(self):
+        executor = get_executor(self.master_frame.winfo_toplevel())
+        spool = self.report_spool = ReportSpool(definition.columns, definition.title)
+
+        def first_page_loaded(rows):
+            self.report_job = None
+            if rows:
+                self.show_rows(rows)
+                if not spool.complete:
+                    self.page_label.config(text=f"Showing rows 1-{len(rows):,}; reading the rest of the report...")
+            else:
+                self.show_empty(tree, empty_values)
+
+        def spooled(row_count):
+            self.spool_job = None
+            if row_count:
+                # Enable PDF and export buttons now that data was successfully loaded
+                self.set_download_state(tk.NORMAL)
+                self.update_page_bar()
+
+        def failed(e):
+            self.cancel_report()
+            if isinstance(e, sqlite3.Error):
+                messagebox.showerror("Database Error", f"Error fetching {definition.description}: {e}")
+                print(f"Error fetching {definition.description}: {e}")
+            else:
+                messagebox.showerror("Error", f"An unexpected error occurred: {e}")
+                print(f"An unexpected error occurred: {e}")
+
+        if definition.builder is not None:
+            # Computed reports are a few dozen rows: build them whole, then show the first page
+            def built(row_count):
+                self.spool_job = None
+                if row_count:
+                    self.show_page(0)
+                    self.set_download_state(tk.NORMAL)
+                else:
+                    self.show_empty(tree, empty_values)
+
+            self.spool_job = executor.call(
+                lambda conn: build_and_cache(conn, definition.builder, query_params, spool, key),
+                on_done=built, on_error=failed,
+                progress_parent=self.report_display_frame, progress_text=f"Generating {definition.title}...")
+            return
+
+        self.report_job = executor.call(
+            lambda conn: conn.execute(*first_page_query(query, query_params, REPORT_PAGE_ROWS)).fetchall(),
+            on_done=first_page_loaded, on_error=failed,
+            progress_parent=self.report_display_frame, progress_text=f"Generating {definition.title}...")
+        self.spool_job = executor.call(
+            lambda conn: spool_and_cache(conn, query, query_params, spool, key),
+            on_done=spooled, on_error=failed, owner=self.report_display_frame)
+
+    def show_empty(self, tree, empty_values):
+        tree.insert("", END, values=empty_values)
+        tree.item(tree.get_children()[0], tags=('no_data',))
+        tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+
+    def show_rows(self, rows):
+        self.report_tree.delete(*self.report_tree.get_children())
+        for row in rows:
+            self.report_tree.insert("", END, values=row)
+        self.report_tree.yview_moveto(0)
+
+    def show_page(self, page_index):
+        """Shows one page of the spooled report."""
+        if self.report_spool is None or not self.report_spool.complete:
+            return
+        if self.report_job is not None:
+            self.report_job.cancel() # The first page would arrive over the page asked for
+            self.report_job = None
+        self.page_index = page_index
+        self.show_rows(self.report_spool.read_rows(page_index * REPORT_PAGE_ROWS, REPORT_PAGE_ROWS))
+        self.update_page_bar()
+
+    def update_page_bar(self):
+        total = self.report_spool.row_count
+        first = self.page_index * REPORT_PAGE_ROWS
+        last = min(first + REPORT_PAGE_ROWS, total)
+        cached = " (unchanged since last generated)" if self.report_from_cache else ""
+        self.page_label.config(text=f"Showing rows {first + 1:,}-{last:,} of {total:,}{cached}")
+        self.prev_page_button.config(state=tk.NORMAL if first > 0 else tk.DISABLED)
+        self.next_page_button.config(state=tk.NORMAL if last < total else tk.DISABLED)
+
+    def read_date_range(self):
+        """Returns the (start_date, end_date) filters as stored dates, or None after showing an error."""
         start_date = self.start_date_entry.get()
         end_date = self.end_date_entry.get()
-        status = self.status_var.get()
 
         if not start_date or not end_date:
             messagebox.showerror("Input Error", "Please enter both Start Date and End Date.")
-            return
+            return None
 
-        # Basic date validation (can be enhanced)
+        # Basic date validation; reformatting turns e.g. "2025-7-1" into the "2025-07-01" the dates are stored as
         try:
-            datetime.strptime(start_date, "%Y-%m-%d")
-            datetime.strptime(end_date, "%Y-%m-%d")
+            start_date = datetime.strptime(start_date.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+            end_date = datetime.strptime(end_date.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
         except ValueError:
             messagebox.showerror("Input Error", "Date format must be YYYY-MM-DD.")
+            return None
+        return start_date, end_date
+
+    def load_appointments_report(self):
+        date_range = self.read_date_range()
+        if date_range is None:
             return
+        start_date, end_date = date_range
+        status = self.status_var.get()
 
         columns = self.current_report_columns # Use class attribute for consistency
         tree = ttk.Treeview(self.report_display_frame, columns=columns, show="headings")
@@ -179,43 +410,8 @@ class Reports:
         scrollbar.pack(side=RIGHT, fill=Y)
         tree.pack(fill=BOTH, expand=True)
 
-        query = '''
-            SELECT a.appointment_id, p.name, d.name, a.appointment_date, a.appointment_time, a.purpose, a.status
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.patient_id
-            JOIN doctors d ON a.doctor_id = d.doctor_id
-            WHERE a.appointment_date BETWEEN ? AND ?
-        '''
-        params = [start_date, end_date]
-
-        if status != "All":
-            query += " AND a.status = ?"
-            params.append(status)
-
-        query += " ORDER BY a.appointment_date ASC, a.appointment_time ASC"
-
-        try:
-            self.c.execute(query, tuple(params))
-            rows = self.c.fetchall()
-
-            if rows:
-                self.current_report_data = rows # Store data
-                for row in rows:
-                    tree.insert("", END, values=row)
-            else:
-                self.current_report_data = [] # No data
-                tree.insert("", END, values=("", "", "No appointments found for the selected criteria.", "", "", "", ""))
-                tree.item(tree.get_children()[0], tags=('no_data',))
-                tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
-
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error fetching appointments report: {e}")
-            print(f"Error fetching appointments report: {e}")
-            self.current_report_data = [] # Clear on error
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-            print(f"An unexpected error occurred: {e}")
-            self.current_report_data = [] # Clear on error
+        self.run_report_query(tree, "Appointments Report",
+                              {'start_date': start_date, 'end_date': end_date, 'status': status})
 
 
     def load_patients_report(self):
@@ -235,28 +431,7 @@ class Reports:
         scrollbar.pack(side=RIGHT, fill=Y)
         tree.pack(fill=BOTH, expand=True)
 
-        try:
-            self.c.execute("SELECT patient_id, name, date_of_birth, gender, phone, email, address, admission_date FROM patients ORDER BY name ASC")
-            rows = self.c.fetchall()
-
-            if rows:
-                self.current_report_data = rows # Store data
-                for row in rows:
-                    tree.insert("", END, values=row)
-            else:
-                self.current_report_data = [] # No data
-                tree.insert("", END, values=("", "", "No patients found.", "", "", "", "", ""))
-                tree.item(tree.get_children()[0], tags=('no_data',))
-                tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
-
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error fetching patient report: {e}")
-            print(f"Error fetching patient report: {e}")
-            self.current_report_data = [] # Clear on error
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-            print(f"An unexpected error occurred: {e}")
-            self.current_report_data = [] # Clear on error
+        self.run_report_query(tree, "Patient List")
 
     def load_doctors_report(self):
         columns = self.current_report_columns # Use class attribute for consistency
@@ -275,28 +450,7 @@ class Reports:
         scrollbar.pack(side=RIGHT, fill=Y)
         tree.pack(fill=BOTH, expand=True)
 
-        try:
-            self.c.execute("SELECT doctor_id, name, specialization, department, phone, email, license_number FROM doctors ORDER BY name ASC")
-            rows = self.c.fetchall()
-
-            if rows:
-                self.current_report_data = rows # Store data
-                for row in rows:
-                    tree.insert("", END, values=row)
-            else:
-                self.current_report_data = [] # No data
-                tree.insert("", END, values=("", "", "No doctors found.", "", "", "", ""))
-                tree.item(tree.get_children()[0], tags=('no_data',))
-                tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
-
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error fetching doctor report: {e}")
-            print(f"Error fetching doctor report: {e}")
-            self.current_report_data = [] # Clear on error
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-            print(f"An unexpected error occurred: {e}")
-            self.current_report_data = [] # Clear on error
+        self.run_report_query(tree, "Doctor List")
 
     def load_billing_summary(self):
         columns = self.current_report_columns # Use class attribute for consistency
@@ -315,36 +469,164 @@ class Reports:
         scrollbar.pack(side=RIGHT, fill=Y)
         tree.pack(fill=BOTH, expand=True)
 
-        try:
-            self.c.execute('''
-                SELECT b.bill_id, p.name, b.service_description, b.amount, b.bill_date, b.due_date, b.status
-                FROM billing b
-                JOIN patients p ON b.patient_id = p.patient_id
-                ORDER BY b.bill_date DESC
-            ''')
-            rows = self.c.fetchall()
+        self.run_report_query(tree, "Billing Summary")
 
-            if rows:
-                self.current_report_data = rows # Store data
-                for row in rows:
-                    tree.insert("", END, values=row)
+    def load_receivables_aging(self):
+        """Outstanding amounts per patient by days past due, from the latest aging snapshot."""
+        columns = self.current_report_columns
+        tree = ttk.Treeview(self.report_display_frame, columns=columns, show="headings")
+
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor=CENTER, width=90)
+            if col == "Patient Name":
+                tree.column(col, width=150)
+            if col in ["ID", "Bills"]:
+                tree.column(col, width=60)
+
+        scrollbar = ttk.Scrollbar(self.report_display_frame, orient=VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        tree.pack(fill=BOTH, expand=True)
+
+        self.run_report_query(tree, "Receivables Aging")
+
+    def load_analytic_report(self, report_type):
+        """Doctor workload, no-show rates, revenue by service, lead times or settlement times over the date range."""
+        date_range = self.read_date_range()
+        if date_range is None:
+            return
+        start_date, end_date = date_range
+
+        columns = self.current_report_columns
+        tree = ttk.Treeview(self.report_display_frame, columns=columns, show="headings")
+
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, anchor=CENTER, width=100)
+            if col in ["Doctor", "Specialization", "Service", "Lead Time"]:
+                tree.column(col, width=150)
+
+        scrollbar = ttk.Scrollbar(self.report_display_frame, orient=VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        tree.pack(fill=BOTH, expand=True)
+
+        params = {'start_date': start_date, 'end_date': end_date}
+        if report_type == "No-show and Cancellation Rates":
+            # Part of the cache key too: yesterday's scheduled appointments are today's no-shows
+            params['today'] = datetime.now().strftime("%Y-%m-%d")
+        self.run_report_query(tree, report_type, params)
+
+    def create_jobs_panel(self):
+        """Lists queued, running and finished report files with their progress."""
+        jobs_frame = ttk.LabelFrame(self.main_frame, text="Report Jobs", padding=(5, 5))
+        jobs_frame.pack(side=tk.BOTTOM, fill=X, padx=10, pady=(5, 0))
+
+        columns = ("Report", "Format", "Status", "Progress", "ETA", "Output")
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show="headings", height=4, selectmode="browse")
+        for col in columns:
+            self.jobs_tree.heading(col, text=col)
+            self.jobs_tree.column(col, anchor=CENTER, width=90)
+        self.jobs_tree.column("Report", width=140)
+        self.jobs_tree.column("Progress", width=170)
+        self.jobs_tree.column("Output", anchor='w', width=300)
+        self.jobs_tree.pack(side=LEFT, fill=X, expand=True)
+
+        job_buttons = ttk.Frame(jobs_frame)
+        job_buttons.pack(side=RIGHT, padx=(10, 0))
+        ttk.Button(job_buttons, text="Cancel Job", command=self.cancel_selected_job).pack(fill=X, pady=2)
+        ttk.Button(job_buttons, text="Save Copy...", command=self.save_job_output).pack(fill=X, pady=2)
+        ttk.Button(job_buttons, text="Clear Finished", command=get_report_queue().clear_finished).pack(fill=X, pady=2)
+
+        self.main_frame.bind("<Destroy>", lambda e: self.stop_job_list())
+        self.update_job_list()
+
+    def job_values(self, job):
+        progress = job.progress()
+        if job.status == "Counting":
+            progress_text = "Counting rows..."
+        elif progress is None:
+            progress_text = ""
+        else:
+            progress_text = f"{progress:.0%} ({job.rows_done:,} of {job.rows_total:,} rows)"
+
+        eta = job.eta_seconds()
+        if eta is not None:
+            eta_text = format_duration(eta)
+        elif job.status == "Done" and job.started is not None:
+            eta_text = f"took {format_duration(job.finished - job.started)}"
+        else:
+            eta_text = ""
+
+        output = f"Error: {job.error}" if job.error is not None else job.path
+        return (job.title, job.extension.lstrip('.').upper(), job.status, progress_text, eta_text, output)
+
+    def update_job_list(self):
+        """Redraws the Report Jobs list from the queue and schedules the next redraw."""
+        self.job_list_id = None
+        listed = set(self.jobs_tree.get_children())
+        for job in get_report_queue().jobs():
+            iid = str(job.job_id)
+            if iid in listed:
+                self.jobs_tree.item(iid, values=self.job_values(job))
+                listed.discard(iid)
             else:
-                self.current_report_data = [] # No data
-                tree.insert("", END, values=("", "", "No billing records found.", "", "", "", ""))
-                tree.item(tree.get_children()[0], tags=('no_data',))
-                tree.tag_configure('no_data', foreground='gray', font=('Arial', 10, 'italic'))
+                self.jobs_tree.insert("", END, iid=iid, values=self.job_values(job))
+        if listed:
+            self.jobs_tree.delete(*listed) # Cleared from the queue
+        self.job_list_id = self.main_frame.after(JOB_LIST_REFRESH_MS, self.update_job_list)
+
+    def stop_job_list(self):
+        # The jobs themselves keep running; only the redraws stop with the screen
+        if self.job_list_id is not None:
+            self.main_frame.after_cancel(self.job_list_id)
+            self.job_list_id = None
+
+    def selected_job(self):
+        selection = self.jobs_tree.selection()
+        if not selection:
+            messagebox.showwarning("No Job Selected", "Please select a report job first.")
+            return None
+        for job in get_report_queue().jobs():
+            if str(job.job_id) == selection[0]:
+                return job
+        return None
+
+    def cancel_selected_job(self):
+        job = self.selected_job()
+        if job is not None and job.active:
+            job.cancel()
+
+    def save_job_output(self):
+        """Copies a finished report file to a location of the user's choice."""
+        job = self.selected_job()
+        if job is None:
+            return
+        if job.status != "Done":
+            messagebox.showwarning("Report Not Ready", f"This report is {job.status.lower()}; only finished reports can be saved.")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=job.extension,
+            initialfile=os.path.basename(job.path),
+            title=f"Save {job.title}"
+        )
+        if not file_path or os.path.abspath(file_path) == os.path.abspath(job.path):
+            return
+        try:
+            shutil.copyfile(job.path, file_path)
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Could not save report: {e}")
+            print(f"Error copying {job.path} to {file_path}: {e}")
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error fetching billing summary: {e}")
-            print(f"Error fetching billing summary: {e}")
-            self.current_report_data = [] # Clear on error
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-            print(f"An unexpected error occurred: {e}")
-            self.current_report_data = [] # Clear on error
+    def queue_report_file(self, path, extension):
+        """Queues the current report, with the filters it was generated with, to be written to `path`."""
+        query, params = self.current_report_query
+        get_report_queue().submit(self.current_report_title, self.current_report_columns, query, params, path, extension,
+                                  builder=self.current_report_builder)
 
     def download_report_pdf(self):
-        if not self.current_report_data or not self.current_report_columns:
+        if self.current_report_query is None:
             messagebox.showwarning("No Report Data", "Please generate a report first before trying to download.")
             return
 
@@ -358,47 +640,23 @@ class Reports:
         if not file_path:
             return # User cancelled
 
+        # Written page by page from the database by the report job queue; progress shows under Report Jobs
+        self.queue_report_file(file_path, ".pdf")
+
+    def export_report(self):
+        """Exports the current report as CSV, JSONL or .npz into a chosen folder (default: the report_save_path setting)."""
+        if self.current_report_query is None:
+            messagebox.showwarning("No Report Data", "Please generate a report first before trying to export.")
+            return
+        extension = EXPORT_FORMATS[self.export_format_var.get()]
+        directory = filedialog.askdirectory(initialdir=get_setting("report_save_path"), mustexist=False,
+                                            title=f"Export {self.current_report_title} to folder")
+        if not directory:
+            return # User cancelled
+
         try:
-            doc = SimpleDocTemplate(file_path, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = []
-
-            # Add title
-            story.append(Paragraph(f"<b>{self.current_report_title}</b>", styles['h1']))
-            story.append(Spacer(1, 0.2 * inch))
-
-            # Add current date and time
-            story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-            story.append(Spacer(1, 0.2 * inch))
-
-            # Prepare data for the table
-            data = [list(self.current_report_columns)] # Headers
-            for row in self.current_report_data:
-                data.append([str(item) for item in row]) # Ensure all items are strings
-
-            # Create the table
-            table = Table(data)
-
-            # Add style to the table
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')), # Header background
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), # Header text color
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f0f0')), # Alternating row colors
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('BOX', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 3),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ]))
-
-            story.append(table)
-
-            doc.build(story)
-            messagebox.showinfo("PDF Generated", f"Report saved successfully to:\n{file_path}")
-
-        except Exception as e:
-            messagebox.showerror("PDF Error", f"Failed to generate PDF: {e}")
-            print(f"Error generating PDF: {e}")
\ No newline at end of file
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not create folder {directory}: {e}")
+            return
+        self.queue_report_file(os.path.join(directory, export_file_name(self.current_report_title, extension)), extension)
@@ -0,0 +1,89 @@
+# screen_manager.py
+from collections import OrderedDict
+from tkinter import ttk, BOTH
+
+import startup_timer
+from database import get_db
+from query_executor import get_executor
+from settings import get_setting
+
+
+class ScreenManager:
+    """Keeps constructed screens alive between navigations and shows them again without rebuilding them.
+
+    Each screen gets its own frame inside the content area; leaving a screen only pack_forget()s it.
+    A screen shown again after the database changed since it last loaded has its refresh() method
+    called (or is rebuilt if it has none), and the least recently used screens are destroyed once
+    too many are open.
+    """
+
+    def __init__(self, content_frame, db, limit=None):
+        self.content_frame = content_frame
+        self.db = db
+        self.limit = limit               # None reads the cached_screens_limit setting on each navigation
+        self.current = None
+        self._screens = OrderedDict()    # (module, class) -> {'frame', 'screen', 'version'}, oldest first
+                                         # version: data_version() when the screen last started loading
+
+    def show(self, module_name, class_name):
+        """Shows a screen, constructing it on first use. Import and constructor errors propagate."""
+        key = (module_name, class_name)
+        self._hide_current()
+
+        entry = self._screens.get(key)
+        if entry is None:
+            self._evict(self._limit() - 1)
+            screen_class = getattr(startup_timer.timed_import(module_name), class_name)
+            entry = self._build(screen_class)
+            self._screens[key] = entry
+        else:
+            entry['frame'].pack(fill=BOTH, expand=True)
+            if entry['version'] != get_db().data_version():
+                self._refresh(entry)
+        self._screens.move_to_end(key)
+        self.current = key
+        return entry['screen']
+
+    def _limit(self):
+        limit = self.limit if self.limit is not None else get_setting("cached_screens_limit")
+        return max(int(limit), 1)
+
+    def _build(self, screen_class):
+        frame = ttk.Frame(self.content_frame, style='Main.TFrame')
+        frame.pack(fill=BOTH, expand=True)
+        # Read before the screen loads: anything committed from here on, including the screen's own
+        # writes and those of windows and background jobs, makes it refresh the next time it is shown
+        version = get_db().data_version()
+        try:
+            screen = screen_class(frame, self.db)
+        except Exception:
+            frame.destroy()
+            raise
+        return {'frame': frame, 'screen': screen, 'version': version}
+
+    def _refresh(self, entry):
+        refresh = getattr(entry['screen'], 'refresh', None)
+        if callable(refresh):
+            entry['version'] = get_db().data_version()
+            refresh()
+        else:
+            # No cheaper way to bring it up to date: rebuild it in a fresh frame
+            screen_class = type(entry['screen'])
+            self._destroy(entry)
+            entry.update(self._build(screen_class))
+
+    def _hide_current(self):
+        entry = self._screens.get(self.current)
+        if entry is not None:
+            entry['frame'].pack_forget()
+        self.current = None
+
+    def _evict(self, keep):
+        while len(self._screens) > keep:
+            _, entry = self._screens.popitem(last=False)
+            self._destroy(entry)
+
+    def _destroy(self, entry):
+        # Rows still on their way would be delivered into destroyed widgets; other screens' loads carry on
+        get_executor().cancel_owned(entry['frame'])
+        entry['frame'].destroy()
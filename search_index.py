@@ -0,0 +1,248 @@
+# search_index.py
+import re
+import unicodedata
+
+# Most results a ranked search returns; the best matches come first, so more is rarely useful
+SEARCH_RESULT_LIMIT = 200
+
+# bm25 column weights for medical_records_fts (diagnosis, treatment, prescription, notes, patient_name, doctor_name)
+MEDICAL_RECORD_WEIGHTS = (5.0, 3.0, 3.0, 1.0, 4.0, 2.0)
+
+# Ranks inside the subquery so only the top hits are joined to their patient and doctor.
+# Treatment, prescription and notes follow the displayed columns so record_matches can refine a result.
+MEDICAL_RECORD_SEARCH_QUERY = f'''
+    SELECT mr.record_id, p.name, d.name, mr.record_date, mr.diagnosis, mr.treatment, mr.prescription, mr.notes
+    FROM (SELECT rowid AS record_id, bm25(medical_records_fts, {", ".join(str(w) for w in MEDICAL_RECORD_WEIGHTS)}) AS score
+          FROM medical_records_fts
+          WHERE medical_records_fts MATCH ?
+          ORDER BY score
+          LIMIT ?) f
+    JOIN medical_records mr ON mr.record_id = f.record_id
+    JOIN patients p ON mr.patient_id = p.patient_id
+    JOIN doctors d ON mr.doctor_id = d.doctor_id
+    ORDER BY f.score
+'''
+
+_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_match_query(search_text):
+    """Turns what the user typed into an FTS5 MATCH expression, or returns None if nothing is searchable.
+
+    "Quoted text" becomes a phrase, every other word a prefix term ('hyper' matches 'hypertension'),
+    and all terms must match. Punctuation is dropped, so the result is never an FTS5 syntax error.
+    """
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(search_text or ""):
+        if phrase:
+            words = _WORD_PATTERN.findall(phrase)
+            if words:
+                terms.append(_quote(" ".join(words)))
+        else:
+            terms.extend(_quote(w) + "*" for w in _WORD_PATTERN.findall(word))
+    return " AND ".join(terms) if terms else None
+
+
+def medical_record_search(search_text, limit=SEARCH_RESULT_LIMIT):
+    """Returns (sql, params) for the best-ranked medical records matching search_text, or None if there is nothing to search."""
+    match = build_match_query(search_text)
+    if match is None:
+        return None
+    return MEDICAL_RECORD_SEARCH_QUERY, (match, limit)
+
+
+def search_medical_records(conn, search_text, limit=SEARCH_RESULT_LIMIT):
+    """Returns the best-ranked medical record rows matching search_text."""
+    search = medical_record_search(search_text, limit)
+    if search is None:
+        return []
+    return conn.execute(*search).fetchall()
+
+
+def _tokens(text):
+    # Close to FTS5's unicode61 tokenizer with remove_diacritics: lower-case words, accents stripped
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return _WORD_PATTERN.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def _contains_phrase(tokens, words):
+    return any(tokens[i:i + len(words)] == words for i in range(len(tokens) - len(words) + 1))
+
+
+def record_matches(search_text, row):
+    """Whether a search_medical_records row matches search_text the way build_match_query reads it."""
+    fields = [_tokens(value) for value in (row[1], row[2], row[4], row[5], row[6], row[7])]
+    for phrase, word in _TERM_PATTERN.findall(search_text or ""):
+        if phrase:
+            words = _tokens(phrase)
+            if words and not any(_contains_phrase(tokens, words) for tokens in fields):
+                return False
+        else:
+            for prefix in _tokens(word):
+                if not any(token.startswith(prefix) for tokens in fields for token in tokens):
+                    return False
+    return True
+
+
+# --- Patient lookup (patients_lookup trigram index, migration 4) ---
+
+PATIENT_LOOKUP_LIMIT = 50      # Rows shown for a front-desk search
+LOOKUP_CANDIDATE_LIMIT = 500   # Index hits read per query before ranking in Python
+FUZZY_MIN_SCORE = 0.45         # Weakest name_similarity still shown as a fuzzy match
+
+# Rows carry the email after the displayed columns so cached results can be refined in memory
+PATIENT_LOOKUP_QUERY = '''
+    SELECT p.patient_id, p.name, p.gender, p.phone, p.date_of_birth, p.email
+    FROM patients_lookup l
+    JOIN patients p ON p.patient_id = l.rowid
+    WHERE patients_lookup MATCH ?
+    LIMIT ?
+'''
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def name_similarity(search_text, name):
+    """Scores 0..1 how well a typed name matches a patient name, tolerating typos and word order.
+
+    Each typed word is compared with every word of the name by trigram overlap (Dice coefficient);
+    the best score per typed word is averaged.
+    """
+    typed_words = search_text.lower().split()
+    name_grams = [_ngrams(f" {word} ", 3) for word in (name or "").lower().split()]
+    if not typed_words or not name_grams:
+        return 0.0
+    total = 0.0
+    for word in typed_words:
+        grams = _ngrams(f" {word} ", 3)
+        total += max(2 * len(grams & other) / (len(grams) + len(other)) for other in name_grams)
+    return total / len(typed_words)
+
+
+def _exact_rank(term, row):
+    name = (row[1] or "").lower()
+    if name.startswith(term):
+        return 0
+    if any(word.startswith(term) for word in name.split()):
+        return 1
+    if term in name:
+        return 2
+    return 3  # Matched on phone or email
+
+
+def lookup_patients(conn, search_text, limit=PATIENT_LOOKUP_LIMIT):
+    """Returns up to `limit` patient rows for a front-desk search, best matches first.
+
+    An exact patient ID comes first, then rows containing the text in their name, phone or email
+    (name-prefix matches ahead of the rest), then, for alphabetic searches, fuzzy name matches.
+    """
+    term = " ".join((search_text or "").lower().split())
+    if not term:
+        return []
+    results = []
+    seen = set()
+
+    def add(rows):
+        for row in rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                results.append(row)
+
+    if term.isdigit():
+        add(conn.execute("SELECT patient_id, name, gender, phone, date_of_birth, email FROM patients WHERE patient_id = ?",
+                         (int(term),)))
+
+    if len(term) >= 3:
+        rows = conn.execute(PATIENT_LOOKUP_QUERY, (_quote(term), LOOKUP_CANDIDATE_LIMIT)).fetchall()
+    else:
+        # Too short for a trigram; read it as a name prefix, seeking idx_patients_name for the usual casings
+        rows = []
+        for prefix in {term, term.capitalize(), term.upper()}:
+            rows.extend(conn.execute(
+                "SELECT patient_id, name, gender, phone, date_of_birth, email FROM patients WHERE name >= ? AND name < ? LIMIT ?",
+                (prefix, prefix + "\U0010ffff", LOOKUP_CANDIDATE_LIMIT)))
+    rows.sort(key=lambda row: (_exact_rank(term, row), row[1] or ""))
+    add(rows)
+
+    if len(results) < limit and len(term) >= 4 and term.replace(" ", "").isalpha():
+        # Any shared 4-character run of the name makes a candidate; one typo leaves most runs intact
+        match = "name : (" + " OR ".join(_quote(gram) for gram in sorted(_ngrams(term, 4))) + ")"
+        scored = []
+        for row in conn.execute(PATIENT_LOOKUP_QUERY, (match, LOOKUP_CANDIDATE_LIMIT)):
+            if row[0] not in seen:
+                score = name_similarity(term, row[1])
+                if score >= FUZZY_MIN_SCORE:
+                    scored.append((-score, row[1] or "", row))
+        scored.sort(key=lambda item: item[:2])
+        add(row for _, _, row in scored)
+
+    return results[:limit]
+
+
+def patient_matches(search_text, row):
+    """Whether a lookup_patients row contains search_text in its name, phone or email."""
+    term = " ".join(search_text.lower().split())
+    return any(term in (value or "").lower() for value in (row[1], row[3], row[5]))
+
+
+def patient_refinable(search_text):
+    """Whether lookup_patients' rows for search_text include every row containing any longer term.
+
+    Not so for digits (also read as a patient ID) or for names shorter than a trigram (prefix seeks only).
+    """
+    term = search_text.strip()
+    return len(term) >= 3 and not term.isdigit()
+
+
+# --- Doctor and bill search (plain LIKE scans; both lists are searched as the user types) ---
+
+DOCTOR_SEARCH_QUERY = '''
+    SELECT doctor_id, name, specialization, department, phone, email, license_number
+    FROM doctors
+    WHERE name LIKE ? OR specialization LIKE ? OR department LIKE ? OR license_number LIKE ?
+    ORDER BY name, doctor_id
+    LIMIT ?
+'''
+
+# The service description follows the displayed columns so bill_matches can refine a result
+BILL_SEARCH_QUERY = '''
+    SELECT b.bill_id, p.name, b.amount, b.balance, b.bill_date, b.due_date, b.status, b.service_description
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    WHERE p.name LIKE ? OR b.service_description LIKE ? OR b.status LIKE ?
+    ORDER BY b.bill_date DESC, b.bill_id DESC
+    LIMIT ?
+'''
+
+
+def _contains(search_text, values):
+    # LIKE is case-insensitive for ASCII only; lower() is a close enough match for refining results
+    term = search_text.lower()
+    return any(term in str(value).lower() for value in values if value is not None)
+
+
+def search_doctors(conn, search_text, limit=SEARCH_RESULT_LIMIT):
+    """Returns doctors whose name, specialization, department or license number contains search_text."""
+    pattern = f"%{search_text}%"
+    return conn.execute(DOCTOR_SEARCH_QUERY, (pattern, pattern, pattern, pattern, limit)).fetchall()
+
+
+def doctor_matches(search_text, row):
+    return _contains(search_text, (row[1], row[2], row[3], row[6]))
+
+
+def search_bills(conn, search_text, limit=SEARCH_RESULT_LIMIT):
+    """Returns bills, newest first, whose patient name, service description or status contains search_text."""
+    pattern = f"%{search_text}%"
+    return conn.execute(BILL_SEARCH_QUERY, (pattern, pattern, pattern, limit)).fetchall()
+
+
+def bill_matches(search_text, row):
+    return _contains(search_text, (row[1], row[6], row[7]))
@@ -2,13 +2,58 @@ import tkinter as tk
 from tkinter import ttk, messagebox, Frame, Label, Button, BOTH, X, W, E, filedialog
 import sqlite3
 import shutil
+import os
+import json
 from datetime import datetime
 
+from database import close_db
+
+SETTINGS_FILE = "app_settings.json"
+
+# Keys as written by Settings.save_settings, with the values used when nothing has been saved yet
+DEFAULT_SETTINGS = {
+    "notifications_enabled": True,
+    "notification_frequency": "Daily",
+    "app_language": "English",
+    "audit_logging_enabled": False,
+    "log_max_size_mb": 100,
+    "default_startup_module": "Dashboard",
+    "row_highlighting_enabled": True,
+    "report_save_path": "./reports",
+    "auto_save_interval_minutes": 5,
+    "display_record_limit": 50,
+    "cached_screens_limit": 5,
+    "global_font_size": 10,
+    "notifications_enabled_master": True,
+    "auto_backup_enabled": False,
+    "app_language_global": "English",
+    "startup_page": "Dashboard",
+    "dark_mode_enabled": False,
+}
+
+
+def load_app_settings():
+    """Returns the saved application settings merged over DEFAULT_SETTINGS."""
+    settings_data = dict(DEFAULT_SETTINGS)
+    try:
+        with open(SETTINGS_FILE, "r") as f:
+            settings_data.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading settings: {e}, using default settings.")
+    return settings_data
+
+
+def get_setting(key):
+    """Returns a single saved setting (or its default) for use outside the Settings screen."""
+    return load_app_settings().get(key, DEFAULT_SETTINGS.get(key))
+
+
 class Settings:
-    def __init__(self, master_frame, conn, c):
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn
-        self.c = c
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the parent frame
         for widget in self.master_frame.winfo_children():
@@ -25,6 +70,7 @@ class Settings:
         self.report_path = tk.StringVar(value="./reports")
         self.auto_save_interval = tk.IntVar(value=5) # In minutes
         self.display_record_limit = tk.IntVar(value=50) # Number of records to display in tables
+        self.cached_screens_limit = tk.IntVar(value=5) # Screens kept alive between navigations
         self.font_size = tk.IntVar(value=10) # Default font size for most text
         self.notifications_var = tk.BooleanVar(value=True) # Duplicated from above, keeping for consistency with user code
         self.backup_var = tk.BooleanVar(value=False) # For auto backup
@@ -39,6 +85,8 @@ class Settings:
 
         self.create_settings_ui()
 
+    def refresh(self):
+        """Nothing to reload: settings live in app_settings.json, not in the database."""
 
     def setup_themes(self):
         """Defines custom light and dark themes based on existing ttk themes."""
@@ -105,7 +153,7 @@ class Settings:
 
         # Database Path Display
         ttk.Label(general_settings_frame, text="Database Path:", font=('Arial', 10, 'bold')).grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        db_path = self.conn.database if self.conn and hasattr(self.conn, 'database') else "Not connected"
+        db_path = os.path.abspath(self.db.db_name) if self.db else "Not connected"
         ttk.Label(general_settings_frame, text=db_path, font=('Arial', 10), foreground='blue').grid(row=0, column=1, padx=5, pady=5, sticky='ew')
 
         # Application Theme (Dropdown for available system themes + custom theme status)
@@ -173,6 +221,14 @@ class Settings:
         self.report_path_entry.grid(row=2, column=1, padx=5, pady=5, sticky='ew')
         ttk.Button(display_perf_frame, text="Browse", command=self.browse_report_path, width=8).grid(row=2, column=2, padx=(5,0), pady=5, sticky='w')
 
+        # Rows fetched per page by the patient, doctor, appointment and billing lists
+        ttk.Label(display_perf_frame, text="Records per Page:", font=('Arial', 10, 'bold')).grid(row=3, column=0, padx=5, pady=5, sticky='w')
+        ttk.Spinbox(display_perf_frame, from_=10, to=1000, increment=10, textvariable=self.display_record_limit).grid(row=3, column=1, padx=5, pady=5, sticky='ew')
+
+        # Screens kept in memory so switching back to them is instant (least recently used are dropped first)
+        ttk.Label(display_perf_frame, text="Screens Kept Open:", font=('Arial', 10, 'bold')).grid(row=4, column=0, padx=5, pady=5, sticky='w')
+        ttk.Spinbox(display_perf_frame, from_=1, to=12, increment=1, textvariable=self.cached_screens_limit).grid(row=4, column=1, padx=5, pady=5, sticky='ew')
+
 
         # --- Advanced Preferences Section ---
         extra_frame = ttk.LabelFrame(self.main_frame, text="Advanced Preferences", padding=(15, 10))
@@ -221,34 +277,25 @@ class Settings:
 
 
     def load_current_settings(self):
-        # In a full application, this method would load settings from a configuration file (e.g., JSON, INI)
-        # For this demo, values are initialized with defaults.
-        # Example of loading from a hypothetical JSON file:
-        # import json
-        # try:
-        #     with open("app_settings.json", "r") as f:
-        #         settings_data = json.load(f)
-        #     self.notifications_enabled.set(settings_data.get("notifications_enabled", True))
-        #     self.notification_frequency.set(settings_data.get("notification_frequency", "Daily"))
-        #     self.app_language.set(settings_data.get("app_language", "English"))
-        #     self.audit_logging_enabled.set(settings_data.get("audit_logging_enabled", False))
-        #     self.log_max_size.set(settings_data.get("log_max_size_mb", 100))
-        #     self.default_startup_module.set(settings_data.get("default_startup_module", "Dashboard"))
-        #     self.row_highlighting.set(settings_data.get("row_highlighting_enabled", True))
-        #     self.report_path.set(settings_data.get("report_save_path", "./reports"))
-        #     self.auto_save_interval.set(settings_data.get("auto_save_interval_minutes", 5))
-        #     self.display_record_limit.set(settings_data.get("display_record_limit", 50))
-        #     self.font_size.set(settings_data.get("global_font_size", 10))
-        #     self.notifications_var.set(settings_data.get("notifications_enabled_master", True)) # Master switch
-        #     self.backup_var.set(settings_data.get("auto_backup_enabled", False))
-        #     self.language_var.set(settings_data.get("app_language_global", "English")) # Global language
-        #     self.startup_page.set(settings_data.get("startup_page", "Dashboard"))
-        #     self.dark_mode.set(settings_data.get("dark_mode_enabled", False))
-        # except FileNotFoundError:
-        #     print("Settings file not found, using default settings.")
-        # except Exception as e:
-        #     print(f"Error loading settings: {e}, using default settings.")
-        pass # Placeholder for actual loading logic
+        """Loads saved settings from SETTINGS_FILE, falling back to the defaults."""
+        settings_data = load_app_settings()
+        self.notifications_enabled.set(settings_data["notifications_enabled"])
+        self.notification_frequency.set(settings_data["notification_frequency"])
+        self.app_language.set(settings_data["app_language"])
+        self.audit_logging_enabled.set(settings_data["audit_logging_enabled"])
+        self.log_max_size.set(settings_data["log_max_size_mb"])
+        self.default_startup_module.set(settings_data["default_startup_module"])
+        self.row_highlighting.set(settings_data["row_highlighting_enabled"])
+        self.report_path.set(settings_data["report_save_path"])
+        self.auto_save_interval.set(settings_data["auto_save_interval_minutes"])
+        self.display_record_limit.set(settings_data["display_record_limit"])
+        self.cached_screens_limit.set(settings_data["cached_screens_limit"])
+        self.font_size.set(settings_data["global_font_size"])
+        self.notifications_var.set(settings_data["notifications_enabled_master"]) # Master switch
+        self.backup_var.set(settings_data["auto_backup_enabled"])
+        self.language_var.set(settings_data["app_language_global"]) # Global language
+        self.startup_page.set(settings_data["startup_page"])
+        self.dark_mode.set(settings_data["dark_mode_enabled"])
 
     def reset_all_defaults(self):
         """Resets all settings variables to their initial default values and updates the UI."""
@@ -263,6 +310,7 @@ class Settings:
             self.report_path.set("./reports")
             self.auto_save_interval.set(5)
             self.display_record_limit.set(50)
+            self.cached_screens_limit.set(5)
             self.font_size.set(10)
             self.notifications_var.set(True)
             self.backup_var.set(False)
@@ -300,7 +348,7 @@ class Settings:
 
     def backup_database(self):
         # Ensure the database connection is available
-        if not self.conn:
+        if not self.db:
             messagebox.showerror("Backup Error", "Database connection not established.")
             return
 
@@ -318,7 +366,8 @@ class Settings:
             backup_conn = sqlite3.connect(backup_file)
             with backup_conn:
                 # Use the built-in SQLite backup API
-                self.conn.backup(backup_conn)
+                with self.db.read() as conn:
+                    conn.backup(backup_conn)
             backup_conn.close()
             messagebox.showinfo("Backup Successful", f"Database backed up to:\n{backup_file}")
         except Exception as e:
@@ -337,14 +386,16 @@ class Settings:
             return # User cancelled
 
         try:
-            # Close the current database connection first before attempting to overwrite
-            if self.conn:
-                self.conn.close()
-                print("Original database connection closed for restore.")
+            # Close every pooled connection first; the last close checkpoints the WAL file
+            close_db()
+            print("Original database connections closed for restore.")
 
             # Overwrite the active hospital.db with the selected backup file
-            # self.conn.database holds the path 'hospital.db' which is set in main_menu.py
             shutil.copyfile(restore_file, "hospital.db") # Assuming 'hospital.db' is the current database file name
+            # Drop any leftover WAL/shared-memory files so they are not replayed over the restored copy
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists("hospital.db" + suffix):
+                    os.remove("hospital.db" + suffix)
             messagebox.showinfo("Restore Initiated", "Database restored successfully. The application will now close. Please restart it to load the restored database.")
             self.master_frame.winfo_toplevel().destroy() # Close the main Tkinter window
         except Exception as e:
@@ -380,6 +431,7 @@ class Settings:
             "report_save_path": self.report_path.get(),
             "auto_save_interval_minutes": self.auto_save_interval.get(),
             "display_record_limit": self.display_record_limit.get(),
+            "cached_screens_limit": self.cached_screens_limit.get(),
             "global_font_size": self.font_size.get(),
             "notifications_enabled_master": self.notifications_var.get(),
             "auto_backup_enabled": self.backup_var.get(),
@@ -388,11 +440,10 @@ class Settings:
             "dark_mode_enabled": self.dark_mode.get()
         }
 
-        # In a real application, you would save `settings_data` to a persistent file (e.g., JSON, INI, custom)
-        # For this demo, we'll just print them to the console and show a confirmation.
-        print("\n--- Current Settings Saved (Demo) ---")
-        for key, value in settings_data.items():
-            print(f"{key}: {value}")
-        print("-------------------------------------\n")
-
-        messagebox.showinfo("Settings Saved", "Current settings have been 'saved' (not permanently for this demo).")
\ No newline at end of file
+        try:
+            with open(SETTINGS_FILE, "w") as f:
+                json.dump(settings_data, f, indent=4)
+            messagebox.showinfo("Settings Saved", "Current settings have been saved.")
+        except Exception as e:
+            messagebox.showerror("Save Error", f"Failed to save settings: {e}")
+            print(f"Error saving settings: {e}")
\ No newline at end of file
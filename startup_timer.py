@@ -0,0 +1,58 @@
+# startup_timer.py
+import importlib
+import os
+import sys
+import time
+
+# Cold start (first application import) to the first painted window; slower starts print a warning
+STARTUP_BUDGET_MS = 1500
+
+# Set HMS_STARTUP_REPORT=1 or pass --startup-report to print the breakdown on every start.
+# For a per-module breakdown of everything imported, run: python -X importtime main_menu.py
+REPORT_ENABLED = os.environ.get("HMS_STARTUP_REPORT") == "1" or "--startup-report" in sys.argv
+
+_started = time.perf_counter()
+_last = _started
+_steps = []          # (label, milliseconds) in the order they happened
+_reported = False
+
+
+def mark(label):
+    """Records the time spent since the previous mark under `label`."""
+    global _last
+    now = time.perf_counter()
+    _steps.append((label, (now - _last) * 1000))
+    _last = now
+
+
+def timed_import(module_name):
+    """Imports a module by name, recording how long the first import took."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    mark("(other work)")  # Keeps the time since the last mark out of the import figure
+    module = importlib.import_module(module_name)
+    mark(f"import {module_name}")
+    return module
+
+
+def elapsed_ms():
+    return (time.perf_counter() - _started) * 1000
+
+
+def report(budget_ms=STARTUP_BUDGET_MS):
+    """Prints the startup breakdown once, if enabled or if the start went over budget."""
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    total = elapsed_ms()
+    over_budget = total > budget_ms
+    if not (REPORT_ENABLED or over_budget):
+        return
+
+    print(f"Startup: {total:.0f} ms to first paint (budget {budget_ms} ms)")
+    for label, ms in _steps:
+        if ms >= 0.5 or REPORT_ENABLED:
+            print(f"  {ms:8.1f} ms  {label}")
+    if over_budget:
+        print("Warning: startup exceeded its time budget; run with -X importtime to find slow imports.")
@@ -5,10 +5,9 @@ import sqlite3
 from datetime import datetime
 
 class UpdateAppointments: # Renamed from Application for clarity
-    def __init__(self, master_frame, conn, c): # Accept master_frame, conn, and c
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn  # Use the shared connection
-        self.c = c        # Use the shared cursor
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame (content_frame)
         for widget in self.master_frame.winfo_children():
@@ -78,12 +77,10 @@ class UpdateAppointments: # Renamed from Application for clarity
     def load_patients_and_doctors(self):
         """Loads patient and doctor data for comboboxes."""
         try:
-            self.c.execute("SELECT patient_id, name FROM patients ORDER BY name ASC")
-            patients = self.c.fetchall()
+            with self.db.read() as conn:
+                patients = conn.execute("SELECT patient_id, name FROM patients ORDER BY name ASC").fetchall()
+                doctors = conn.execute("SELECT doctor_id, name, specialization FROM doctors ORDER BY name ASC").fetchall()
             self.patient_map = {f"{pid} - {name}": pid for pid, name in patients}
-
-            self.c.execute("SELECT doctor_id, name, specialization FROM doctors ORDER BY name ASC")
-            doctors = self.c.fetchall()
             self.doctor_map = {f"{did} - {name} ({spec})": did for did, name, spec in doctors}
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Error loading patient/doctor data: {e}\nEnsure 'patients' and 'doctors' tables exist.")
@@ -113,7 +110,7 @@ class UpdateAppointments: # Renamed from Application for clarity
                            JOIN doctors d ON a.doctor_id = d.doctor_id
                            WHERE a.appointment_id = ?
                            ORDER BY a.scheduled_time DESC'''
-                self.c.execute(query, (appt_id,))
+                params = (appt_id,)
             except ValueError:
                 # If not numeric, search by patient name
                 query = '''SELECT a.appointment_id, p.name, d.name,
@@ -123,9 +120,10 @@ class UpdateAppointments: # Renamed from Application for clarity
                            JOIN doctors d ON a.doctor_id = d.doctor_id
                            WHERE p.name LIKE ?
                            ORDER BY a.scheduled_time DESC'''
-                self.c.execute(query, (f"%{search_term}%",))
+                params = (f"%{search_term}%",)
 
-            rows = self.c.fetchall()
+            with self.db.read() as conn:
+                rows = conn.execute(query, params).fetchall()
 
             if rows:
                 for row in rows:
@@ -148,13 +146,13 @@ class UpdateAppointments: # Renamed from Application for clarity
             self.current_appointment_id = values[0] # The appointment_id
 
             # Fetch complete appointment data using JOINs to get original IDs
-            self.c.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, d.specialization,
-                           a.scheduled_time, a.status, a.reason
-                           FROM appointments a
-                           JOIN patients p ON a.patient_id = p.patient_id
-                           JOIN doctors d ON a.doctor_id = d.doctor_id
-                           WHERE a.appointment_id=?''', (self.current_appointment_id,))
-            appt_data = self.c.fetchone()
+            with self.db.read() as conn:
+                appt_data = conn.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, d.specialization,
+                               a.scheduled_time, a.status, a.reason
+                               FROM appointments a
+                               JOIN patients p ON a.patient_id = p.patient_id
+                               JOIN doctors d ON a.doctor_id = d.doctor_id
+                               WHERE a.appointment_id=?''', (self.current_appointment_id,)).fetchone()
 
             if appt_data:
                 self.populate_update_form(appt_data)
@@ -271,12 +269,12 @@ class UpdateAppointments: # Renamed from Application for clarity
             return
 
         try:
-            self.c.execute('''UPDATE appointments SET
-                          patient_id=?, doctor_id=?, scheduled_time=?, status=?, reason=?
-                          WHERE appointment_id=?''',
-                          (patient_id, doctor_id, scheduled_datetime_str, status, purpose,
-                           self.current_appointment_id))
-            self.conn.commit()
+            with self.db.write() as conn:
+                conn.execute('''UPDATE appointments SET
+                              patient_id=?, doctor_id=?, scheduled_time=?, status=?, reason=?
+                              WHERE appointment_id=?''',
+                              (patient_id, doctor_id, scheduled_datetime_str, status, purpose,
+                               self.current_appointment_id))
             messagebox.showinfo("Success", "Appointment updated successfully.")
             self.search_appointments() # Refresh the search results
             self.clear_update_form()
@@ -293,8 +291,8 @@ class UpdateAppointments: # Renamed from Application for clarity
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this appointment? This action cannot be undone."):
             try:
-                self.c.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
                 messagebox.showinfo("Success", "Appointment deleted successfully.")
                 self.search_appointments() # Refresh the search results
                 self.clear_update_form()
@@ -3,12 +3,12 @@ from tkinter import *
 from tkinter import ttk, messagebox
 import sqlite3
 from datetime import datetime
+from reference_cache import get_reference_cache
 
 class UpdateAppointments:
-    def __init__(self, master_frame, conn, c): # Accept master_frame, conn, and c
+    def __init__(self, master_frame, db):
         self.master_frame = master_frame
-        self.conn = conn  # Use the shared connection
-        self.c = c        # Use the shared cursor
+        self.db = db  # DatabaseManager: read() for lookups, write() for every change
 
         # Clear any existing widgets in the master_frame (content_frame)
         for widget in self.master_frame.winfo_children():
@@ -75,13 +75,9 @@ class UpdateAppointments:
 
     def load_patients_and_doctors(self):
         try:
-            self.c.execute("SELECT patient_id, name FROM patients ORDER BY name ASC")
-            patients = self.c.fetchall()
-            self.patient_map = {f"{pid} - {name}": pid for pid, name in patients}
-
-            self.c.execute("SELECT doctor_id, name, specialization FROM doctors ORDER BY name ASC")
-            doctors = self.c.fetchall()
-            self.doctor_map = {f"{did} - {name} ({spec})": did for did, name, spec in doctors}
+            # Shared by every screen and only re-read after patients or doctors change
+            self.patient_map = get_reference_cache().patient_map()
+            self.doctor_map = get_reference_cache().doctor_map(with_specialization=True)
         except sqlite3.OperationalError as e:
             messagebox.showerror("Database Error", f"Error loading patient/doctor data: {e}\nEnsure 'patients' and 'doctors' tables exist.")
             print(f"Error loading patient/doctor data: {e}")
@@ -109,7 +105,7 @@ class UpdateAppointments:
                            JOIN doctors d ON a.doctor_id = d.doctor_id
                            WHERE a.appointment_id = ?
                            ORDER BY a.scheduled_time DESC'''
-                self.c.execute(query, (appt_id,))
+                params = (appt_id,)
             except ValueError:
                 query = '''SELECT a.appointment_id, p.name, d.name,
                            strftime('%Y-%m-%d', a.scheduled_time), strftime('%H:%M', a.scheduled_time), a.status, a.reason
@@ -118,9 +114,10 @@ class UpdateAppointments:
                            JOIN doctors d ON a.doctor_id = d.doctor_id
                            WHERE p.name LIKE ?
                            ORDER BY a.scheduled_time DESC'''
-                self.c.execute(query, (f"%{search_term}%",))
+                params = (f"%{search_term}%",)
 
-            rows = self.c.fetchall()
+            with self.db.read() as conn:
+                rows = conn.execute(query, params).fetchall()
 
             if rows:
                 for row in rows:
@@ -141,13 +138,13 @@ class UpdateAppointments:
             values = self.tree.item(selected_item)['values']
             self.current_appointment_id = values[0]
 
-            self.c.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, d.specialization,
-                           a.scheduled_time, a.status, a.reason
-                           FROM appointments a
-                           JOIN patients p ON a.patient_id = p.patient_id
-                           JOIN doctors d ON a.doctor_id = d.doctor_id
-                           WHERE a.appointment_id=?''', (self.current_appointment_id,))
-            appt_data = self.c.fetchone()
+            with self.db.read() as conn:
+                appt_data = conn.execute('''SELECT a.patient_id, p.name, a.doctor_id, d.name, d.specialization,
+                               a.scheduled_time, a.status, a.reason
+                               FROM appointments a
+                               JOIN patients p ON a.patient_id = p.patient_id
+                               JOIN doctors d ON a.doctor_id = d.doctor_id
+                               WHERE a.appointment_id=?''', (self.current_appointment_id,)).fetchone()
 
             if appt_data:
                 self.populate_update_form(appt_data)
@@ -249,15 +246,15 @@ class UpdateAppointments:
             return
 
         try:
-            self.c.execute('''UPDATE appointments SET
-                          patient_id=?, doctor_id=?, scheduled_time=?, status=?, reason=?
-                          WHERE appointment_id=?''',
-                          (patient_id, doctor_id, scheduled_datetime_str, status, purpose,
-                           self.current_appointment_id))
-            if self.c.rowcount == 0:
+            with self.db.write() as conn:
+                updated = conn.execute('''UPDATE appointments SET
+                              patient_id=?, doctor_id=?, scheduled_time=?, status=?, reason=?
+                              WHERE appointment_id=?''',
+                              (patient_id, doctor_id, scheduled_datetime_str, status, purpose,
+                               self.current_appointment_id)).rowcount
+            if updated == 0:
                 messagebox.showwarning("Update Warning", "No appointment record was updated. The record might have been deleted by another user or does not exist.")
             else:
-                self.conn.commit()
                 messagebox.showinfo("Success", "Appointment updated successfully.")
                 self.search_appointments()
                 self.clear_update_form()
@@ -273,8 +270,8 @@ class UpdateAppointments:
 
         if messagebox.askyesno("Confirm Deletion", "Are you sure you want to delete this appointment? This action cannot be undone."):
             try:
-                self.c.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
-                self.conn.commit()
+                with self.db.write() as conn:
+                    conn.execute("DELETE FROM appointments WHERE appointment_id=?", (self.current_appointment_id,))
                 messagebox.showinfo("Success", "Appointment deleted successfully.")
                 self.search_appointments()
                 self.clear_update_form()
@@ -0,0 +1,132 @@
+# write_queue.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import TclError
+
+from database import get_db
+from query_executor import ProgressOverlay, POLL_INTERVAL_MS
+
+
+class WriteJob:
+    """A queued background write and the Tk-thread callbacks that receive its outcome."""
+
+    def __init__(self, func, on_done, on_error, immediate):
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.immediate = immediate
+        self.progress = None
+
+
+class WriteQueue:
+    """Runs background writes one at a time, each inside DatabaseManager.write(), on a dedicated thread.
+
+    Unlike the QueryExecutor, nothing here is cancelled when the user navigates: a write that has
+    been queued runs to its commit or rollback, and its on_done or on_error always runs on the Tk
+    thread. Callbacks must check that their widgets still exist before touching them.
+    """
+
+    def __init__(self, master, db=None, poll_interval=POLL_INTERVAL_MS):
+        self.master = master
+        self.db = db
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write")
+        self._results = queue.Queue()
+        self._pending = 0
+        self._poll_id = None
+
+    def submit(self, func, on_done=None, on_error=None, progress_parent=None, progress_text="Saving...",
+               immediate=False):
+        """Queues func(conn) to run in one write transaction; on_done(result) or on_error(exception) runs on the Tk thread.
+
+        immediate=True begins the transaction before func's first statement, for work that reads what it then writes.
+        """
+        job = WriteJob(func, on_done, on_error, immediate)
+        if progress_parent is not None:
+            job.progress = ProgressOverlay(progress_parent, progress_text)
+        self._pending += 1
+        self._pool.submit(self._run, job)
+        self._schedule_poll()
+        return job
+
+    @property
+    def pending(self):
+        """Writes queued or running whose outcome has not been delivered yet."""
+        return self._pending
+
+    def shutdown(self):
+        """Waits for queued writes to commit or roll back; their callbacks are no longer delivered."""
+        if self._poll_id is not None:
+            try:
+                self.master.after_cancel(self._poll_id)
+            except TclError:
+                pass
+            self._poll_id = None
+        self._pool.shutdown(wait=True)
+
+    def _run(self, job):
+        """Write thread: runs one job and queues its outcome for the Tk thread."""
+        try:
+            with (self.db or get_db()).write(immediate=job.immediate) as conn:
+                result = job.func(conn)
+            self._results.put((job, 'done', result))
+        except Exception as e:
+            self._results.put((job, 'error', e))
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.master.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """Tk thread: delivers finished writes to their callbacks."""
+        self._poll_id = None
+        while True:
+            try:
+                job, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._dispatch(job, kind, payload)
+        if self._pending:
+            self._schedule_poll()
+
+    def _dispatch(self, job, kind, payload):
+        if job.progress is not None:
+            job.progress.close()
+            job.progress = None
+        try:
+            if kind == 'done':
+                if job.on_done:
+                    job.on_done(payload)
+            elif job.on_error:
+                job.on_error(payload)
+            else:
+                print(f"Error running background write: {payload}")
+        except Exception as e:
+            # A failing callback must not stop delivery for the other jobs
+            print(f"Error handling background write result: {e}")
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue(master=None):
+    """Returns the application-wide WriteQueue; the first call must pass the Tk root."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            if master is None:
+                raise RuntimeError("The write queue has not been started.")
+            _write_queue = WriteQueue(master)
+        return _write_queue
+
+
+def shutdown_write_queue():
+    """Lets queued writes finish and stops the application-wide WriteQueue."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.shutdown()
+            _write_queue = None